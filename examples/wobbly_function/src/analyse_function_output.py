@@ -1,31 +1,32 @@
 #! /usr/bin/env python3
 
-'''concatenate last rows of .csv files under output/ into one file: csv_output.csv'''
+'''append the rows of the new .csv files into one file: csv_output_<step>.csv, collected files are moved to output/'''
 
-from file_parsing_tools import turn_folder_into_csv_output_file
+from qcgpilotnetsquid.utils.aggregate import aggregate_results
+from file_parsing_tools import SQLDatabaseParser
 from argparse import ArgumentParser
-import os
-import shutil
 
 
 if __name__ == "__main__":
-    # Create directory
     parser = ArgumentParser()
     parser.add_argument('--step', required=False, type=str, 
                         help='Optimization step')
+    parser.add_argument('--database', required=False, type=str,
+                        help='Result database where the jobs inserted their results')
     args = parser.parse_args()
-    
-    if not os.path.exists('output'):
-        os.mkdir('output')
-    
-    current_path = os.getcwd()
-    new_path = current_path + '/output'
-    for f in os.listdir('.'):
-        ext = os.path.splitext(f)[-1].lower()
-        if ext == '.csv':
-            shutil.move(current_path+'/'+f, new_path+'/'+f)
 
-    turn_folder_into_csv_output_file(folder_name="output",
-                                     csv_output_filename="csv_output_" + args.step + ".csv",
-                                     file_extension="csv")
+    csv_output_filename = "csv_output_" + args.step + ".csv"
+    if args.database is not None:
+        # results of the jobs of the step, read with an indexed query, added to
+        # the rows already collected (streamed or cached results)
+        fileparser = SQLDatabaseParser(step=int(args.step))
+        fileparser.parse_file(args.database)
+        fileparser.to_csv_output_file(csv_filename=csv_output_filename, append=True)
+
+    # Only the files not collected yet (e.g. by the workflow while the jobs
+    # were running) are added
+    aggregate_results(workdir='.',
+                      csv_output_filename=csv_output_filename,
+                      archive="output",
+                      file_extension="csv")
     #cp csv file to csvdirectory
@@ -5,7 +5,9 @@ Tools for reading in a folder of data files and produce a single csv file.
 import sys
 import os
 import csv
+import fcntl
 from abc import ABCMeta
+from qcgpilotnetsquid.utils.resultstore import ResultStore
 
 
 CSV_DELIMITER = ","
@@ -58,19 +60,29 @@ class FileParser(metaclass=ABCMeta):
             if filename.endswith(self.FILE_EXTENSION):
                 self.parse_file(filename=os.path.join(folder_name, filename))
 
-    def to_csv_output_file(self, csv_filename):
+    def to_csv_output_file(self, csv_filename, append=False):
         """
         Writes the content of `self.values` directly to file
-        by iterating over the elements.
+        by iterating over the elements. With append, the rows are added to
+        the file under the lock used by
+        :obj:`~qcgpilotnetsquid.utils.aggregate.aggregate_results`, keeping
+        the rows already collected in it.
         """
         # FIXME 
         #if os.path.exists(csv_filename):
         #    os.remove(csv_filename)
         #    print("Remove  *csv file")
-        with open(csv_filename, mode='w') as csv_file:
-            csv_writer = csv.writer(csv_file, delimiter=CSV_DELIMITER)
-            for element in self.values:
-                csv_writer.writerow(element)
+        with open(csv_filename, mode='a' if append else 'w') as csv_file:
+            if append:
+                fcntl.flock(csv_file, fcntl.LOCK_EX)
+            try:
+                csv_writer = csv.writer(csv_file, delimiter=CSV_DELIMITER)
+                for element in self.values:
+                    csv_writer.writerow(element)
+                csv_file.flush()
+            finally:
+                if append:
+                    fcntl.flock(csv_file, fcntl.LOCK_UN)
 
 
 class CSVFileParser(FileParser):
@@ -92,16 +104,37 @@ class CSVFileParser(FileParser):
 
 class SQLDatabaseParser(FileParser):
     """
-    FileParser for SQL files.
+    FileParser for SQL files: result databases of an optimization
+    (see :obj:`~qcgpilotnetsquid.utils.resultstore.ResultStore`), where the
+    jobs insert their results instead of writing csv files.
     For more information, see the documentation of the base class
     :obj:`~netsquid_optimization.analysistools.file_parsing_tools.FileParser`.
+
+    Parameters
+    ----------
+    step : int or None
+        Optimization step whose results are read, all steps if None
     """
 
     FILE_EXTENSION = "db"
 
-    def _parser_file(self, filename):
-        #TODO
-        pass
+    def __init__(self, step=None):
+        super().__init__()
+        self.step = step
+
+    def _parse_file(self, filename):
+        store = ResultStore(filename)
+        try:
+            if self.step is None:
+                steps = store.steps()
+            else:
+                steps = [self.step]
+            rows = []
+            for step in steps:
+                rows += [list(row) for row in store.get(step, cached=False)]
+        finally:
+            store.close()
+        return rows
 
 
 FILE_PARSERS = [CSVFileParser, SQLDatabaseParser]
@@ -1,18 +1,289 @@
+import copy
 import json
 import os
 import shutil
 from argparse import ArgumentParser
 from qcg.pilotjob.api.manager import LocalManager
 from qcg.pilotjob.api.job import Jobs
-from qcgpilotnetsquid.utils.createpoints import create_datapoints
+from qcgpilotnetsquid.utils.createpoints import available_results
+from qcgpilotnetsquid.utils.createpoints import iter_datapoints
+from qcgpilotnetsquid.utils.createpoints import pad_results
+from qcgpilotnetsquid.utils.createpoints import run_param_to_sim_param
 from qcgpilotnetsquid.utils.dirstructureNLBlueprint import create_dir_structure
 from qcgpilotnetsquid.utils.qcgpilot import copyfiles
 from qcgpilotnetsquid.utils.qcgpilot import commandline_qcgpilot
+from qcgpilotnetsquid.utils.qcgpilot import commandline_module_qcgpilot
+from qcgpilotnetsquid.utils.qcgpilot import commandline_database_qcgpilot
+from qcgpilotnetsquid.utils.qcgpilot import write_chunks
+from qcgpilotnetsquid.utils.qcgpilot import write_paramfiles
+from qcgpilotnetsquid.utils.qcgpilot import JobsFinished
+from qcgpilotnetsquid.utils.qcgpilot import parallel_workflows
+from qcgpilotnetsquid.utils.qcgpilot import run_workflows
+from qcgpilotnetsquid.utils.qcgpilot import free_cores
+from qcgpilotnetsquid.utils.qcgpilot import job_walltime
+from qcgpilotnetsquid.utils.qcgpilot import wave_points_per_job
+from qcgpilotnetsquid.utils.qcgpilot import wave_population_size
+from qcgpilotnetsquid.utils.resultstore import read_csvfile
+from qcgpilotnetsquid.utils.aggregate import aggregate_results
 from qcgpilotnetsquid.utils.inputparams import InputParamsOpt
+from qcgpilotnetsquid.utils.inputparams import InputParamsSingle
+from qcgpilotnetsquid.utils.parameters import str2bool
+from qcgpilotnetsquid.utils.resultcache import ResultCache
+from qcgpilotnetsquid.utils.resultstore import JOB_RESULTS_FILE
+from qcgpilotnetsquid.utils.resultstore import RESULTS_FILE
+from qcgpilotnetsquid.utils.resultstore import ResultStore
+from qcgpilotnetsquid.utils.rng import random_streams
+
+def open_result_cache(simparameters):
+    """
+    Open the result cache shared by all optimizations of the project, if
+    enabled in the input file (system: result_cache)
+
+    Parameters
+    ----------
+        simparameters: class InputParam()
+            Simulation parameters read from input file
+    Returns
+    -------
+        cache: class ResultCache() or None
+    """
+    if not str2bool(str(simparameters.system.get('result_cache', False))):
+        return None
+    cachefile = os.path.dirname(simparameters.rundir.rstrip("/")) + "/result_cache.db"
+    return ResultCache(cachefile, simparameters.general, simparameters.system.get('cache_decimals', 10))
+
+
+def result_database(simparameters):
+    """
+    Result database where the jobs insert their results instead of writing
+    csvfiles, if enabled in the input file (system: result_database). It is
+    not the result store of the workflow, which is filled from the csvfiles
+
+    Parameters
+    ----------
+        simparameters: class InputParam()
+            Simulation parameters read from input file
+    Returns
+    -------
+        database: str or None
+    """
+    if not str2bool(str(simparameters.system.get('result_database', False))):
+        return None
+    return simparameters.rundir + JOB_RESULTS_FILE
+
+
+def analysis_args(simparameters, step):
+    """
+    Arguments of the analysis program of an optimization step
+
+    Parameters
+    ----------
+        simparameters: class InputParam()
+            Simulation parameters read from input file
+        step: int
+            Optimization step
+    Returns
+    -------
+        args: list
+    """
+    args = [simparameters.general['analysis_program'], "--step", step]
+    database = result_database(simparameters)
+    if database is not None:
+        args += ["--database", database]
+    return args
+
+
+def stream_aggregation(simparameters, workdir, step):
+    """
+    Function collecting the results of the finished jobs of a step into its
+    csvfile while the step runs, if enabled in the input file
+    (system: stream_aggregation); the analysis job then only collects the
+    remaining results
+
+    Parameters
+    ----------
+        simparameters: class InputParam()
+            Simulation parameters read from input file
+        workdir: str
+            Directory where the jobs of the step are run
+        step: int
+            Optimization step
+    Returns
+    -------
+        callback: callable or None
+    """
+    if not str2bool(str(simparameters.system.get('stream_aggregation', False))):
+        return None
+    csvfile = simparameters.general["csvfileprefix"] + "_" + str(step) + ".csv"
+    return lambda: aggregate_results(workdir, csvfile)
+
+
+def job_slots(simparameters, manager):
+    """
+    Number of jobs that can start now on the free cores of the allocation
+
+    Parameters
+    ----------
+        simparameters: class InputParam()
+            Simulation parameters read from input file
+        manager: qcgpilot object LocalManager()
+            Manager of the qcgpilot workflow
+    Returns
+    -------
+        slots: int
+    """
+    return max(1, free_cores(manager) // int(simparameters.system['ncores']))
+
+
+def adapt_population_size(simparameters, manager, opt, job_time=None):
+    """
+    Adapt the population size of the next generation to the allocation, if
+    enabled in the input file (system: adaptive_population): the population
+    fills the free cores in whole waves of jobs, or in the number of waves
+    matching system: target_step_time when the walltime of a job is known.
+    The population is at most MAX_POPULATION_FACTOR times the population_size
+    of the input file, in runmode module the chunks are made smaller if a wave
+    would be larger
+
+    Parameters
+    ----------
+        simparameters: class InputParam()
+            Simulation parameters read from input file
+        manager: qcgpilot object LocalManager()
+            Manager of the qcgpilot workflow
+        opt: int
+            optimization number
+        job_time: float
+            Measured walltime of a job of the previous step, in seconds
+    """
+    if not str2bool(str(simparameters.system.get('adaptive_population', False))):
+        return
+    if simparameters.run["type"] != "optimization":
+        return
+    parameters = simparameters.run['algorithm'][opt].get('parameters', {})
+    if 'population_size' not in parameters:
+        return
+    points_per_job = 1
+    if simparameters.general["runmode"] == "module":
+        points_per_job = simparameters.system.get('chunk_size', 100)
+    target_time = simparameters.system.get('target_step_time')
+    if target_time is not None:
+        target_time = float(target_time)
+    slots = job_slots(simparameters, manager)
+    if simparameters.general["runmode"] == "module":
+        simparameters.chunk_size = wave_points_per_job(int(parameters['population_size']), slots, points_per_job)
+    simparameters.population_size = wave_population_size(int(parameters['population_size']), slots,
+                                                         points_per_job, job_time, target_time)
+    print("population size {} for {} job slots".format(simparameters.population_size, slots))
+
+
+def job_seeds(simparameters, step, workers):
+    """
+    Seeds of the independent random streams of the jobs of a step, if enabled
+    in the input file (system: job_seeds), see qcgpilotnetsquid.utils.rng
+
+    Parameters
+    ----------
+        simparameters: class InputParam()
+            Simulation parameters read from input file
+        step: int
+            Optimization step
+        workers: list of int
+            Counter values of the jobs
+    Returns
+    -------
+        seeds: list of int or None
+    """
+    if not str2bool(str(simparameters.system.get('job_seeds', False))):
+        return None
+    return random_streams(simparameters).worker_seeds(step, "jobs", workers)
+
+
+def add_simulation_jobs(jobs, simparameters, datapoints, step, workdir, after=None, offset=0):
+    """
+    Add the jobs to run the data points of an optimization step: one job per
+    data point, or one job per chunk of data points in runmode module
+
+    Parameters
+    ----------
+        jobs: qcgpilot object Jobs()
+            Jobs to be submitted
+        simparameters: class InputParam()
+            Simulation parameters read from input file
+        datapoints: list of arrays
+            Data points to run
+        step: int
+            Optimization step
+        workdir: str
+            Directory where the jobs are run
+        after: list of str
+            Names of the jobs that have to finish before these jobs start
+        offset: int
+            Counter value of the first data point, when the data points of a
+            step are added in several chunks
+    Returns
+    -------
+        names: list of str
+            Names of the jobs added
+    """
+    names = []
+    instructions = []
+    workers = []
+    if len(datapoints) == 0:
+        return names
+    database = result_database(simparameters)
+    if simparameters.general["runmode"] == "module":
+        chunk_size = simparameters.chunk_size or simparameters.system.get('chunk_size', 100)
+        for k, pointsfile in write_chunks(datapoints, chunk_size, workdir, step, offset):
+            names.append(simparameters.general['name_project'] + "_" + str(step) + "_c" + str(k) + simparameters.flag)
+            workers.append(k)
+            instruction = commandline_module_qcgpilot(k, pointsfile, step, simparameters.general,
+                                                      simparameters.param)
+            if database is not None:
+                instruction += commandline_database_qcgpilot(k, step, database)
+            instructions.append(instruction)
+    else:
+        if simparameters.general["runmode"] == "files":
+            write_paramfiles(datapoints, simparameters.general, workdir, offset,
+                             threads=simparameters.system.get('template_threads'))
+        # Add one job per datapoint in optimization step
+        for j, point in enumerate(datapoints, offset):
+            names.append(simparameters.general['name_project'] + "_" + str(step) + "_" + str(j) + simparameters.flag)
+            workers.append(j)
+            instruction = list(commandline_qcgpilot(j, point, step, simparameters.general))
+            if database is not None:
+                instruction += commandline_database_qcgpilot(j, step, database)
+            instructions.append(instruction)
+
+    seeds = job_seeds(simparameters, step, workers)
+    if seeds is not None:
+        instructions = [instruction + ["--seed", str(seed)] for instruction, seed in zip(instructions, seeds)]
+
+    for name, instruction in zip(names, instructions):
+        if after is None:
+            jobs.add(
+                    name = name,
+                    exec = 'python3',
+                    args = instruction,
+                    numCores = simparameters.system['ncores'],
+                    wd = workdir
+            )
+        else:
+            jobs.add(
+                    name = name,
+                    exec = 'python3',
+                    args = instruction,
+                    numCores = simparameters.system['ncores'],
+                    wd = workdir,
+                    after = after
+            )
+    return names
+
 
 def optimization_workflow(simparameters, manager, opt):
     """
-    Define optimization workflow
+    Define optimization workflow, as a generator yielding the JobsFinished
+    conditions it waits for (see run_workflows)
 
     Parameters
     ----------
@@ -23,11 +294,19 @@ def optimization_workflow(simparameters, manager, opt):
         opt: int
             optimization number
     """
+    if 'pipeline_fraction' in simparameters.system.keys():
+        yield from pipelined_optimization_workflow(simparameters, manager, opt)
+        return
+
+    cache = open_result_cache(simparameters)
+    simparameters.resultstore = ResultStore(simparameters.rundir + RESULTS_FILE)
+    simparameters.population_size = None
+    simparameters.chunk_size = None
+    job_time = None
+
     # Optimization workflow
     for step in range(0, simparameters.optsteps):
         print("step : {}\n--------".format(step))
-        jobs = Jobs()
-        names = []
         workdir = simparameters.rundir + "opt_step_" + str(step) +"/"
         if not os.path.exists(workdir):
             os.mkdir(workdir)
@@ -35,40 +314,34 @@ def optimization_workflow(simparameters, manager, opt):
         # copy files needed to run simulations from projectdir to workdir
         print("Copying files needed from projectdir to workdir...")
         copyfiles(workdir, simparameters)
-        print("Creating data points to run...")
-        datapoints = create_datapoints(simparameters, step, opt)
 
-        print("Adding jobs to submit...")
-        # Add one job per datapoint in optimization step
-        for j, point in enumerate(datapoints):
-            names.append(simparameters.general['name_project'] + "_" + str(step) + "_" + str(j) + simparameters.flag)
+        if step > 0:
+            adapt_population_size(simparameters, manager, opt, job_time)
 
-            instruction = commandline_qcgpilot(j, point, step, simparameters.general)
-            #print("run arguments qcgpilot: {}".format(instruction))
+        # Jobs are submitted chunk by chunk while the data points are created
+        print("Creating data points and submitting jobs...")
+        names = []
+        npoints = 0
+        for datapoints in iter_datapoints(simparameters, step, opt):
+            if cache is not None:
+                datapoints = cache.filter_datapoints(datapoints, workdir, step)
+            jobs = Jobs()
             if step == 0:
-                jobs.add(
-                        name = simparameters.general['name_project']+ "_" + str(step) + "_" + str(j) + simparameters.flag,
-                        exec = 'python3',
-                        args = instruction,
-                        numCores = simparameters.system['ncores'],
-                        wd = workdir
-                )
-
+                added = add_simulation_jobs(jobs, simparameters, datapoints, step, workdir, offset=npoints)
             else:
-                jobs.add(
-                        name = simparameters.general['name_project']+ "_" + str(step)+ "_" + str(j) + simparameters.flag,
-                        exec = 'python3',
-                        args = instruction,
-                        numCores = simparameters.system['ncores'],
-                        wd = workdir,
-                        after = [analysis]
-                )
+                added = add_simulation_jobs(jobs, simparameters, datapoints, step, workdir, after=[analysis],
+                                            offset=npoints)
+            npoints += len(datapoints)
+            if added:
+                manager.submit(jobs)
+                names += added
 
         # Add analysis job
+        jobs = Jobs()
         jobs.add(
             name = simparameters.general['name_project'] + '_analysis_' + str(step) + simparameters.flag,
             exec = 'python3',
-            args = [simparameters.general['analysis_program'],"--step", step],
+            args = analysis_args(simparameters, step),
             numCores = simparameters.system['ncores'],
             after = names,
             wd = workdir
@@ -76,54 +349,257 @@ def optimization_workflow(simparameters, manager, opt):
 
         print("Submitting jobs...")
         job_ids = manager.submit(jobs)
-        manager.wait4(job_ids)
+        aggregate = stream_aggregation(simparameters, workdir, step)
+        if aggregate is not None and names:
+            yield JobsFinished(names, callback=aggregate)
+        yield JobsFinished(names + job_ids)
+        # walltime of the jobs of the step, without the time waiting for
+        # the analysis or for the jobs of other optimizations
+        job_time = job_walltime(manager, names)
 
         # if csvfiledir define, copy opt_step csv to dir
         csvfile = simparameters.general["csvfileprefix"] + "_" + str(step) + ".csv"
+        if not os.path.exists(workdir + csvfile):
+            # no job of the step succeeded, the next steps have no data
+            print("No results in {}, the jobs of step {} failed: optimization stopped".format(workdir, step))
+            simparameters.optsteps = step
+            return
         if step < simparameters.optsteps:
             if simparameters.csvfiledir is not None:
                 shutil.copyfile(workdir + csvfile, simparameters.csvfiledir + csvfile)
+        if cache is not None:
+            cache.add_csvfile(workdir + csvfile)
+        simparameters.resultstore.append_csvfile(step, workdir + csvfile)
 
         analysis = simparameters.general['name_project'] + '_analysis_' + str(step) + simparameters.flag
         print ("Jobs finished\n")
         del names
 
 
-def main(inputfile, projectdir):
-    """ Workflow to run several optimizations after each other NLBlueprint
+def pipelined_optimization_workflow(simparameters, manager, opt):
+    """
+    Define steady-state optimization workflow: the data points of step N+1 are
+    created and submitted as soon as a fraction (system: pipeline_fraction) of
+    the jobs of step N has finished, without waiting for the slowest jobs and
+    the analysis of step N. Generator yielding the JobsFinished conditions it
+    waits for (see run_workflows)
+
     Parameters
     ----------
-        inputfile: str
-            Input file name
-        projectdir: str
-            Path to src/ of simulations. Default is current directory
+        simparameters: class InputParam()
+            Simulation parameters read from input file
+        manager: qcgpilot object LocalManager()
+            Manager of the qcgpilto workflow
+        opt: int
+            optimization number
     """
-    if os.path.isfile(projectdir + "/" + inputfile):
-        f = open(inputfile, 'r')
-        data = json.load(f)
-    else:
-        ValueError("No valid input file")
-    print("projectdir1:{}".format(projectdir))
+    fraction = float(simparameters.system['pipeline_fraction'])
+    if fraction <= 0 or fraction > 1:
+        raise ValueError("pipeline_fraction should be in (0, 1]")
 
-    simparameters = InputParamsOpt(data, projectdir)
-    simparameters.print_info()
+    cache = open_result_cache(simparameters)
+    simparameters.resultstore = ResultStore(simparameters.rundir + RESULTS_FILE)
+    simparameters.population_size = None
+    simparameters.chunk_size = None
+    analyses = []
+    data = None
+    population = 0
+    job_time = None
+    for step in range(0, simparameters.optsteps):
+        print("step : {}\n--------".format(step))
+        workdir = simparameters.rundir + "opt_step_" + str(step) +"/"
+        if not os.path.exists(workdir):
+            os.mkdir(workdir)
 
-    print("\nInitializing qcgpilot...")
-    manager = LocalManager()
+        print("Copying files needed from projectdir to workdir...")
+        copyfiles(workdir, simparameters)
+        if step > 0:
+            adapt_population_size(simparameters, manager, opt, job_time)
+            # only part of the previous step has finished, the population
+            # keeps its size
+            data = pad_results(simparameters, step, opt, data, simparameters.population_size or population)
+        print("Creating data points and submitting jobs...")
+        names = []
+        npoints = 0
+        population = 0
+        for datapoints in iter_datapoints(simparameters, step, opt, data=data):
+            population += len(datapoints)
+            if cache is not None:
+                datapoints = cache.filter_datapoints(datapoints, workdir, step)
+            jobs = Jobs()
+            added = add_simulation_jobs(jobs, simparameters, datapoints, step, workdir, offset=npoints)
+            npoints += len(datapoints)
+            if added:
+                manager.submit(jobs)
+                names += added
+
+        # The analysis still waits for all the jobs of the step, the next step does not
+        analysis = simparameters.general['name_project'] + '_analysis_' + str(step) + simparameters.flag
+        jobs = Jobs()
+        jobs.add(
+            name = analysis,
+            exec = 'python3',
+            args = analysis_args(simparameters, step),
+            numCores = simparameters.system['ncores'],
+            after = names,
+            wd = workdir
+        )
+
+        manager.submit(jobs)
+        analyses.append((step, workdir, analysis))
+
+        if step < simparameters.optsteps - 1:
+            finished = yield JobsFinished(names, fraction,
+                                          callback=stream_aggregation(simparameters, workdir, step))
+            print("{} of {} jobs finished, creating next step".format(len(finished), len(names)))
+            job_time = job_walltime(manager, finished)
+            data = available_results(simparameters, step)
+            if cache is not None:
+                cache.add(data)
+
+    yield JobsFinished([analysis for _step, _workdir, analysis in analyses])
+
+    # if csvfiledir define, copy opt_step csv to dir
+    for step, workdir, _analysis in analyses:
+        csvfile = simparameters.general["csvfileprefix"] + "_" + str(step) + ".csv"
+        if not os.path.exists(workdir + csvfile):
+            print("No results in {}, the jobs of step {} failed".format(workdir, step))
+            continue
+        if simparameters.csvfiledir is not None:
+            shutil.copyfile(workdir + csvfile, simparameters.csvfiledir + csvfile)
+        if cache is not None:
+            cache.add_csvfile(workdir + csvfile)
+        simparameters.resultstore.append_csvfile(step, workdir + csvfile)
+    print ("Jobs finished\n")
+
+
+def island_workflows(simparameters, manager, opt, islands):
+    """
+    Define the workflows of the islands of an optimization (GA parameter
+    islands): each island evolves its own population with its own steps and
+    jobs, in rundir/island<k>/, and receives migrants from the result stores
+    of its neighbours (see qcgpilotnetsquid.algorithms.islands)
+
+    Parameters
+    ----------
+        simparameters: class InputParam()
+            Simulation parameters read from input file
+        manager: qcgpilot object LocalManager()
+            Manager of the qcgpilot workflow
+        opt: int
+            optimization number
+        islands: int
+            Number of islands
+    Returns
+    -------
+        workflows: list of generators
+    """
+    rundirs = []
+    for island in range(islands):
+        rundir = simparameters.rundir + "island" + str(island) + "/"
+        if not os.path.exists(rundir):
+            os.mkdir(rundir)
+        rundirs.append(rundir)
+
+    workflows = []
+    for island, rundir in enumerate(rundirs):
+        islandparameters = copy.copy(simparameters)
+        # the algorithms change the parameters in place (data points, scale
+        # factors), every island has its own
+        islandparameters.param = copy.deepcopy(simparameters.param)
+        islandparameters.set_rundir(rundir)
+        islandparameters.set_dirCsvFile()
+        islandparameters.flag = simparameters.flag + "_" + str(island)
+        islandparameters.island = island
+        islandparameters.island_rundirs = rundirs
+        workflows.append(optimization_workflow(islandparameters, manager, opt))
+    return workflows
+
+
+def merge_island_results(simparameters, islands):
+    """
+    Write the results of the last step of all islands to the csvfile of the
+    last step in the rundir of the optimization, where a next optimization
+    restarts from
+
+    Parameters
+    ----------
+        simparameters: class InputParam()
+            Simulation parameters read from input file
+        islands: int
+            Number of islands
+    """
+    step = simparameters.optsteps - 1
+    csvfile = "opt_step_" + str(step) + "/" + simparameters.general["csvfileprefix"] + "_" + str(step) + ".csv"
+    workdir = simparameters.rundir + "opt_step_" + str(step) + "/"
+    if not os.path.exists(workdir):
+        os.mkdir(workdir)
+    with open(simparameters.rundir + csvfile, "w") as merged:
+        for island in range(islands):
+            islandcsvfile = simparameters.rundir + "island" + str(island) + "/" + csvfile
+            if not os.path.exists(islandcsvfile):
+                print("No results of the last step of island {}".format(island))
+                continue
+            for row in read_csvfile(islandcsvfile):
+                merged.write(",".join(str(value) for value in row) + "\n")
 
-    # Loop over optimizations 
-    for i, item in enumerate(simparameters.run["algorithm"]):
-        simparameters.init_opt_algorithm(item)
+
+def optimization_chains(algorithms):
+    """
+    Group the optimizations in chains: an optimization restarting from the
+    previous one (restart: true) belongs to its chain, the others start a new
+    chain independent of the rest
+
+    Parameters
+    ----------
+        algorithms: list of dict
+            Optimizations of the input file (run: algorithm)
+    Returns
+    -------
+        chains: list of list of int
+            Optimization numbers of each chain, in order
+    """
+    chains = []
+    for i, item in enumerate(algorithms):
+        if chains and item.get("restart", "false") == "true":
+            chains[-1].append(i)
+        else:
+            chains.append([i])
+    return chains
+
+
+def optimization_chain(data, projectdir, manager, chain):
+    """
+    Run the optimizations of a chain after each other, each one restarting
+    from the last step of the previous one. Generator yielding the
+    JobsFinished conditions it waits for (see run_workflows)
+
+    Parameters
+    ----------
+        data: dict
+            Input file
+        projectdir: str
+            Path to src/ of simulations
+        manager: qcgpilot object LocalManager()
+            Manager of the qcgpilot workflow
+        chain: list of int
+            Optimization numbers of the chain
+    """
+    # the state of the optimizations is kept in simparameters, one per chain
+    simparameters = InputParamsOpt(copy.deepcopy(data), projectdir)
+    previousrundir = None
+    for i in chain:
+        simparameters.init_opt_algorithm(simparameters.run["algorithm"][i])
         simparameters.print_info_algorithm()
         runname = "optimization" + str(i)
         rundir = create_dir_structure(simparameters, runname)
-        simparameters.set_rundir(rundir) 
+        simparameters.set_rundir(rundir)
         print("rundir: {}".format(simparameters.rundir))
         simparameters.set_dirCsvFile()
         print("csvfiledir: {}".format(simparameters.csvfiledir))
         print("optsteps: {}".format(simparameters.optsteps))
-            
-        if simparameters.restart:
+
+        if simparameters.restart and previousrundir is not None:
             restartfile = previousrundir + "opt_step_" + str(previousrunsteps - 1) + "/" + simparameters.general["csvfileprefix"] + "_" + str(previousrunsteps - 1 ) + ".csv"
             simparameters.set_restartCsvFile(restartfile)
             print("restartcsvfile: {}".format(simparameters.restartcsvfile))
@@ -131,12 +607,94 @@ def main(inputfile, projectdir):
         # Flag needed for qcgpilot naming issues
         simparameters.flag = str(i)
 
-        optimization_workflow(simparameters, manager, i)
+        islands = run_param_to_sim_param(simparameters.run, i).get('islands', 1)
+        if islands > 1:
+            yield from parallel_workflows(island_workflows(simparameters, manager, i, islands))
+            merge_island_results(simparameters, islands)
+        else:
+            yield from optimization_workflow(simparameters, manager, i)
+            if simparameters.optsteps == 0:
+                print("optimization workflow {} failed, the optimizations restarting from it are not run".format(i))
+                return
 
         print("optimization workflow {} finished".format(i))
         print("results in {}".format(simparameters.rundir))
         previousrundir = simparameters.rundir
         previousrunsteps = simparameters.optsteps
+
+
+def single_run(data, projectdir, manager):
+    """
+    Run the sweep of a single run: the grid of the parameters in one step or,
+    with run: sweep adaptive, the coarse grid followed by one step per
+    refinement level. Generator yielding the JobsFinished conditions it waits
+    for (see run_workflows)
+
+    Parameters
+    ----------
+        data: dict
+            Input file
+        projectdir: str
+            Path to src/ of simulations
+        manager: qcgpilot object LocalManager()
+            Manager of the qcgpilot workflow
+    """
+    simparameters = InputParamsSingle(copy.deepcopy(data), projectdir)
+    simparameters.print_info_algorithm()
+    rundir = create_dir_structure(simparameters, "single")
+    simparameters.set_rundir(rundir)
+    print("rundir: {}".format(simparameters.rundir))
+    simparameters.set_dirCsvFile()
+    print("csvfiledir: {}".format(simparameters.csvfiledir))
+    print("optsteps: {}".format(simparameters.optsteps))
+
+    yield from optimization_workflow(simparameters, manager, 0)
+    print("single run finished")
+    print("results in {}".format(simparameters.rundir))
+
+
+def main(inputfile, projectdir):
+    """ Workflow to run several optimizations NLBlueprint. Chains of
+    optimizations independent of each other (see optimization_chains) run
+    concurrently on the same allocation, unless disabled in the input file
+    (system: concurrent_optimizations). A single run (run: type single) runs
+    the sweep of the parameters instead (see single_run)
+    Parameters
+    ----------
+        inputfile: str
+            Input file name
+        projectdir: str
+            Path to src/ of simulations. Default is current directory
+    """
+    if os.path.isfile(projectdir + "/" + inputfile):
+        f = open(inputfile, 'r')
+        data = json.load(f)
+    else:
+        ValueError("No valid input file")
+    print("projectdir1:{}".format(projectdir))
+
+    print("\nInitializing qcgpilot...")
+    manager = LocalManager()
+
+    if data["run"]["type"] == "single":
+        InputParamsSingle(copy.deepcopy(data), projectdir).print_info()
+        run_workflows(manager, [single_run(data, projectdir, manager)])
+        print("\nSimulation finished")
+        manager.cleanup()
+        manager.finish()
+        return
+
+    simparameters = InputParamsOpt(copy.deepcopy(data), projectdir)
+    simparameters.print_info()
+
+    chains = optimization_chains(simparameters.run["algorithm"])
+    workflows = [optimization_chain(data, projectdir, manager, chain) for chain in chains]
+    if str2bool(str(simparameters.system.get('concurrent_optimizations', True))):
+        print("{} independent optimization chains: {}".format(len(chains), chains))
+        run_workflows(manager, workflows)
+    else:
+        for workflow in workflows:
+            run_workflows(manager, [workflow])
     print("\nSimulation finished")
     manager.cleanup()
     manager.finish()
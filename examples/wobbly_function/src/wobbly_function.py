@@ -1,14 +1,20 @@
 """
 Usage:
     python3 function.py -filebasename <folder-to-store-output>/<somefilebasename> -x 3 -y 5.5
+
+With --database <job_results.db> --step <step> --job <job> the output is inserted
+in the result database of the optimization instead of written to a csv file.
 """
 
 from argparse import ArgumentParser
 import csv
 import numpy as np
+from qcgpilotnetsquid.utils.resultstore import ResultStore
 
-def function(x, y):
-    '''Returns wobbly function value'''
+def function(x, y, filebasename=None, test=None):
+    '''Returns wobbly function value. The other arguments of the program are
+    accepted (runmode module passes programfixargs and programvariableargs)
+    but not used'''
 
     radius_squared = (x) ** 2 + (y) ** 2
     return radius_squared + np.sin(radius_squared)
@@ -21,14 +27,27 @@ if __name__ == "__main__":
     parser.add_argument('--x', type=float, default=1.0, required=False)
     parser.add_argument('--y', type=float,required=False, default=1.0)
     parser.add_argument('--test', type=float,required=False, default=1.0)
+    parser.add_argument('--database', type=str, required=False)
+    parser.add_argument('--step', type=int, required=False, default=0)
+    parser.add_argument('--job', type=int, required=False, default=0)
+    parser.add_argument('--seed', type=int, required=False)
     args = parser.parse_args()
     parameter_values = [args.x, args.y]
+    if args.seed is not None:
+        # seed of the random stream of the job (system: job_seeds)
+        np.random.seed(args.seed)
 
     # Run the "simulation"
     output_value = function(x=args.x, y=args.y)
 
-    # Store the output in a file
-    csv_filename = args.filebasename + ".csv"
-    with open(csv_filename, mode='w') as csv_file:
-        csv_writer = csv.writer(csv_file, delimiter=',')
-        csv_writer.writerow([output_value] + parameter_values)
+    if args.database is not None:
+        # Store the output in the result database
+        store = ResultStore(args.database)
+        store.insert(args.step, args.job, [output_value] + parameter_values)
+        store.close()
+    else:
+        # Store the output in a file
+        csv_filename = args.filebasename + ".csv"
+        with open(csv_filename, mode='w') as csv_file:
+            csv_writer = csv.writer(csv_file, delimiter=',')
+            csv_writer.writerow([output_value] + parameter_values)
@@ -0,0 +1,265 @@
+""" Registry of the optimization algorithms creating the data points of the
+optimization steps.
+
+An algorithm is registered by name (the name used in the input file) with the
+schema of its parameters block and the number of previous steps it needs. Its
+function is given as 'package.module:function' and only imported when the
+algorithm is used. The function is called as
+
+    function(data, set_param, sim_param, step, **context)
+
+with data the results (fitness followed by the parameter values) of the
+previous steps requested, oldest first, and the context arguments it declared:
+history (results of all the previous steps) and statedir (run directory of
+the optimization, where state between steps can be kept).
+
+Algorithms outside this package are registered with `register_algorithm` (as
+decorator) or `register`, or declared as entry points of the group
+'qcgpilotnetsquid.algorithms' pointing to an `Algorithm`, which are only
+loaded when their name is requested.
+"""
+import importlib
+import logging
+from importlib.metadata import entry_points
+from qcgpilotnetsquid.algorithms.islands import TOPOLOGIES
+
+ENTRY_POINT_GROUP = "qcgpilotnetsquid.algorithms"
+# History depth of the algorithms using the results of all previous steps
+ALL_STEPS = None
+CONTEXT = ("history", "statedir")
+
+
+class Option:
+    """Parameter of the parameters block of an algorithm.
+
+    Parameters
+    ----------
+    convert : callable
+        Converts the string read from the input file
+    required : bool
+        True if the parameter must be given
+    check : callable, optional
+        Returns False for invalid (converted) values
+    description : str
+        Valid values, used in the error message
+    key : str, optional
+        Key in sim_param, defaults to the name of the parameter. If the
+        converted value is a dict and key is False, it is merged in sim_param
+    """
+    def __init__(self, convert, required=False, check=None, description="valid", key=None):
+        self.convert = convert
+        self.required = required
+        self.check = check
+        self.description = description
+        self.key = key
+
+
+class Algorithm:
+    """Optimization algorithm creating the data points of a step.
+
+    Parameters
+    ----------
+    name : str
+        Name of the algorithm in the input file
+    function : str or callable
+        'package.module:function', imported on first use, or the function
+    parameters : dict
+        Schema of the parameters block, name -> `Option`
+    history : int, None or callable
+        Number of previous steps passed as data, ALL_STEPS (None) for all of
+        them, or a callable returning it from sim_param
+    context : tuple of str or callable
+        Context arguments of the function (see CONTEXT), or a callable
+        returning them from sim_param
+    """
+    def __init__(self, name, function, parameters=None, history=1, context=()):
+        self.name = name
+        self._function = function
+        self.parameters = parameters or {}
+        self.history = history
+        self.context = context
+
+    @property
+    def function(self):
+        if isinstance(self._function, str):
+            module, _, attribute = self._function.partition(":")
+            self._function = getattr(importlib.import_module(module), attribute)
+        return self._function
+
+    def parse_parameters(self, parameters):
+        """Converts and validates the parameters block of the input file.
+
+        Parameters
+        ----------
+        parameters : dict
+            Parameters block of the algorithm
+
+        Returns
+        -------
+        sim_param : dict
+            Values to add to sim_param
+        """
+        sim_param = {}
+        for name in parameters:
+            if name not in self.parameters:
+                logging.warning("Parameter {} is not used by the algorithm {}".format(name, self.name))
+        for name, option in self.parameters.items():
+            if name not in parameters:
+                if option.required:
+                    raise ValueError("{} is needed by the algorithm {}".format(name, self.name))
+                continue
+            value = option.convert(parameters[name])
+            if option.check is not None and not option.check(value):
+                raise ValueError("{} should be {}".format(name, option.description))
+            if option.key is False:
+                sim_param.update(value)
+            else:
+                sim_param[option.key or name] = value
+        return sim_param
+
+    def history_depth(self, sim_param):
+        """Number of previous steps needed, ALL_STEPS for all of them."""
+        if callable(self.history):
+            return self.history(sim_param)
+        return self.history
+
+    def context_arguments(self, sim_param):
+        """Names of the context arguments needed."""
+        context = self.context(sim_param) if callable(self.context) else self.context
+        for name in context:
+            if name not in CONTEXT:
+                raise ValueError("Unknown context argument {} of the algorithm {}".format(name, self.name))
+        return tuple(context)
+
+    def __call__(self, data, set_param, sim_param, step, **context):
+        return self.function(data, set_param, sim_param, step, **context)
+
+
+_REGISTRY = {}
+
+
+def register(algorithm):
+    """Registers an `Algorithm`, replacing the one with the same name."""
+    if not isinstance(algorithm, Algorithm):
+        raise TypeError("Only Algorithm objects can be registered")
+    _REGISTRY[algorithm.name] = algorithm
+    return algorithm
+
+
+def register_algorithm(name, parameters=None, history=1, context=()):
+    """Decorator registering a function as algorithm, see `Algorithm`."""
+    def decorator(function):
+        register(Algorithm(name, function, parameters, history, context))
+        return function
+    return decorator
+
+
+def get_algorithm(name):
+    """Registered algorithm, looked up in the entry points if not found.
+
+    Parameters
+    ----------
+    name : str
+        Name of the algorithm in the input file
+
+    Returns
+    -------
+    algorithm : `Algorithm`
+    """
+    if name not in _REGISTRY:
+        for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+            if entry_point.name == name:
+                register(entry_point.load())
+                break
+        else:
+            raise ValueError("Unknown algorithm {}, available: {}".format(name, ", ".join(available_algorithms())))
+    return _REGISTRY[name]
+
+
+def available_algorithms():
+    """Names of the registered algorithms and of the entry points."""
+    names = set(_REGISTRY)
+    names.update(entry_point.name for entry_point in entry_points(group=ENTRY_POINT_GROUP))
+    return sorted(names)
+
+
+# Algorithms of this package
+
+def _ga_order(order):
+    """Operators and parent selection of the GA from the order parameter."""
+    flags = {'c': {'c': True}, 'm': {'m': True},
+             'cr': {'c': True, 'roulette': True}, 'mr': {'m': True, 'roulette': True},
+             'cs': {'c': True, 'sus': True}, 'ms': {'m': True, 'sus': True},
+             'ct': {'c': True, 'tournament': True}, 'mt': {'m': True, 'tournament': True}}
+    return flags.get(order, {'c': True, 'roulette': False})
+
+
+def _surrogate(surrogate):
+    if surrogate not in ("gp", "false"):
+        raise ValueError("surrogate should be gp or false")
+    return surrogate == "gp"
+
+
+def _positive(value):
+    return value > 0
+
+
+def _at_least(minimum):
+    return lambda value: value >= minimum
+
+
+def _surrogate_history(sim_param):
+    return ("history",) if sim_param.get('surrogate') else ()
+
+
+_BATCH_PARAMETERS = {
+    'candidates': Option(int, check=_positive, description="positive"),
+    'kappa': Option(float, check=_at_least(0), description="non negative"),
+    'surrogate_max_points': Option(int, check=_positive, description="positive"),
+}
+
+register(Algorithm("random", "qcgpilotnetsquid.algorithms.randomdisplacement:random_displacement"))
+
+register(Algorithm("GA", "qcgpilotnetsquid.algorithms.ga:genetic_algorithm", {
+    'order': Option(_ga_order, required=True, key=False),
+    'probability_mutation': Option(float, required=True, key='proba_mutation'),
+    'probability_crossover': Option(float, required=True, key='proba_crossover'),
+    'number_best_candidates': Option(int, required=True),
+    'population_size': Option(int, required=True),
+    'global_scale_factor': Option(float),
+    'tournament_size': Option(int, check=_at_least(1), description="at least 1"),
+    'elite_count': Option(int, check=_at_least(0), description="non negative"),
+    'surrogate': Option(_surrogate),
+    'surrogate_oversampling': Option(float),
+    'surrogate_kappa': Option(float),
+    'surrogate_max_points': Option(int, check=_positive, description="positive"),
+    'islands': Option(int, check=_at_least(1), description="at least 1"),
+    'migration_interval': Option(int, check=_at_least(1), description="at least 1"),
+    'migration_size': Option(int, check=_at_least(0), description="non negative"),
+    'migration_topology': Option(str, check=lambda value: value in TOPOLOGIES,
+                                 description="one of " + ", ".join(TOPOLOGIES)),
+}, context=_surrogate_history))
+
+register(Algorithm("Gaussians", "qcgpilotnetsquid.algorithms.gaussianprocess:gaussian_process", dict(
+    _BATCH_PARAMETERS, population_size=Option(int, required=True, check=_positive, description="positive")),
+    history=ALL_STEPS))
+
+register(Algorithm("NM", "qcgpilotnetsquid.algorithms.neldermead:nelder_mead", {
+    'parallel_vertices': Option(int, check=_positive, description="positive"),
+}, history=ALL_STEPS))
+
+register(Algorithm("gradient", "qcgpilotnetsquid.algorithms.gradientbased:gradient_based", {
+    'fd_step': Option(float, check=_positive, description="positive"),
+    'step_size': Option(float, check=_positive, description="positive"),
+    'line_points': Option(int, check=_at_least(0), description="non negative"),
+}, history=ALL_STEPS))
+
+register(Algorithm("CMAES", "qcgpilotnetsquid.algorithms.cmaes:cma_es", {
+    'population_size': Option(int, check=_at_least(2), description="at least 2"),
+    'sigma0': Option(float, check=_positive, description="positive"),
+}, context=("statedir",)))
+
+register(Algorithm("adaptive_grid", "qcgpilotnetsquid.algorithms.adaptivegrid:adaptive_grid", {
+    'refine_fraction': Option(float, check=lambda value: 0 <= value <= 1, description="between 0 and 1"),
+    'optimum_fraction': Option(float, check=lambda value: 0 <= value <= 1, description="between 0 and 1"),
+}, history=ALL_STEPS))
@@ -0,0 +1,150 @@
+""" Adaptive refinement of the Cartesian grid of a sweep: only the cells where
+the result varies sharply or is close to the optimum are refined."""
+import itertools
+import logging
+import numpy as np
+from qcgpilotnetsquid.algorithms.batch import finish_points, results_array
+
+# Tolerance on the lattice coordinates of the data points
+LATTICE_TOLERANCE = 1e-6
+
+
+def grid_spacings(set_param):
+    """Transformation of the parameters to the coordinates where the initial
+    grid is uniform (log10 for the log distribution) and the spacing of the
+    initial grid in these coordinates.
+
+    Returns
+    -------
+    origin : array
+        Lower bounds of the ranges in the grid coordinates
+    spacing : array
+        Spacing of the initial grid, 0 for a parameter with a single value
+    logarithmic : array of bool
+        True for the parameters with a log distribution
+    discrete : array of bool
+        True for the discrete parameters
+    """
+    params = list(set_param.parameters.values())
+    logarithmic = np.array([param.distribution == 'log' for param in params])
+    discrete = np.array([param.data_type == 'discrete' for param in params])
+    for param in params:
+        if param.distribution not in ('uniform', 'log'):
+            raise ValueError("The adaptive grid needs parameters with a uniform or log distribution")
+        if param.distribution == 'log' and (param.range[0] <= 0 or param.range[1] <= 0):
+            raise ValueError("Logarithm of one of the range boundaries is not defined")
+    low = np.array([param.range[0] for param in params], dtype=float)
+    high = np.array([param.range[1] for param in params], dtype=float)
+    origin = np.where(logarithmic, np.log10(np.where(logarithmic, low, 1.0)), low)
+    end = np.where(logarithmic, np.log10(np.where(logarithmic, high, 1.0)), high)
+    intervals = np.array([max(param.number_points - 1, 0) for param in params], dtype=float)
+    spacing = np.where(intervals > 0, (end - origin)/np.maximum(intervals, 1), 0.0)
+    return origin, spacing, logarithmic, discrete
+
+
+def level_spacing(spacing, discrete, logarithmic, level):
+    """Spacing of the grid at a refinement level: halved at every level, except
+    for the discrete parameters once it would not be a whole number."""
+    refined = spacing.copy()
+    for i in range(len(spacing)):
+        for _ in range(level):
+            if discrete[i] and (logarithmic[i] or refined[i] % 2 != 0):
+                break
+            refined[i] /= 2
+    return refined
+
+
+def lattice_keys(coordinates, spacing):
+    """Integer coordinates of the data points on the lattice of the spacing,
+    None for the data points not on the lattice."""
+    active = spacing > 0
+    k = coordinates[:, active]/spacing[active]
+    on_lattice = np.all(np.abs(k - np.round(k)) < LATTICE_TOLERANCE, axis=1)
+    keys = np.round(k).astype(np.int64)
+    return [tuple(key) if ok else None for key, ok in zip(keys, on_lattice)]
+
+
+def adaptive_grid(data, set_param, sim_param, step):
+    """Refines the cells of the last refinement level of the grid.
+
+    The cells of level step - 1 are the boxes of the grid of that level whose
+    corners have all been evaluated (level 0 is the initial grid). The
+    refine_fraction of the cells with the largest variation of the result over
+    their corners are refined, and, if the run defines maximum, the
+    optimum_fraction of the cells with the best result. Refining a cell adds
+    the grid points of the next level (half the spacing) inside it. The state
+    is deduced from the data points evaluated, so no state is kept between
+    steps.
+
+    Parameters
+    ----------
+    data : list of arrays
+        Results of all previous steps (fitness followed by the parameter values)
+    set_param : :obj:`smartstopos.utils.parameters.set_parameters`
+        Set parameters explored, the initial grid is given by their range and
+        number_points
+    sim_param : dict
+        Simulation information read from the input file: refine_fraction,
+        optimum_fraction and maximum
+    step : int
+        Refinement step, the new data points are those of level step
+
+    Returns
+    -------
+    new_points : 2D array
+        New set of data points to be explored, one per row
+    """
+    data = results_array(data, set_param)
+    origin, spacing, logarithmic, discrete = grid_spacings(set_param)
+    coordinates = np.where(logarithmic, np.log10(np.where(logarithmic, data[:, 1:], 1.0)),
+                           data[:, 1:]) - origin
+    level = step - 1
+    current = level_spacing(spacing, discrete, logarithmic, level)
+    refined = level_spacing(spacing, discrete, logarithmic, level + 1)
+    active = spacing > 0
+    split = (refined < current)[active]
+
+    # results on the lattice of the current level
+    values = {}
+    for key, fitness in zip(lattice_keys(coordinates, current), data[:, 0]):
+        if key is not None:
+            values[key] = fitness
+    corners = list(itertools.product((0, 1), repeat=int(np.sum(active))))
+    cells, variation, best = [], [], []
+    for key in values:
+        corner_values = [values.get(tuple(np.add(key, corner))) for corner in corners]
+        if any(value is None for value in corner_values):
+            continue
+        cells.append(key)
+        variation.append(max(corner_values) - min(corner_values))
+        best.append(max(corner_values) if sim_param.get('maximum', True) else -min(corner_values))
+    if not cells:
+        logging.debug("No complete cell at refinement level {}".format(level))
+        return np.empty((0, len(spacing)))
+
+    number = int(np.ceil(sim_param.get('refine_fraction', 0.25)*len(cells)))
+    selected = set(np.argsort(-np.array(variation), kind='stable')[:number])
+    if 'maximum' in sim_param:
+        number = int(np.ceil(sim_param.get('optimum_fraction', 0.1)*len(cells)))
+        selected |= set(np.argsort(-np.array(best), kind='stable')[:number])
+
+    # grid points of the next level inside the selected cells, not evaluated yet
+    evaluated = set(lattice_keys(coordinates, refined))
+    offsets = [(0, 1, 2) if s else (0, 1) for s in split]
+    ratio = np.where(split, 2, 1)
+    new_keys = set()
+    for i in sorted(selected):
+        lower = np.array(cells[i])*ratio
+        for offset in itertools.product(*offsets):
+            key = tuple(lower + np.array(offset))
+            if key not in evaluated:
+                new_keys.add(key)
+    if not new_keys:
+        return np.empty((0, len(spacing)))
+
+    new_coordinates = np.tile(origin, (len(new_keys), 1))
+    new_coordinates[:, active] += np.array(sorted(new_keys))*refined[active]
+    new_points = np.where(logarithmic, 10**new_coordinates, new_coordinates)
+    logging.debug("Level {}: {} of {} cells refined, {} new data points"
+                  .format(level, len(selected), len(cells), len(new_keys)))
+    return finish_points(new_points, set_param, sim_param)
@@ -0,0 +1,88 @@
+""" Helpers shared by the algorithms proposing a batch of data points per
+optimization step."""
+import numpy as np
+from qcgpilotnetsquid.algorithms.bounds import apply_bounds, parameter_arrays
+from qcgpilotnetsquid.utils.parserconstraints import evaluate_constraints
+
+# Values smaller than this fraction of the range of their parameter are 0
+ZERO_TOLERANCE = 1e-12
+
+
+def results_array(data, set_param):
+    """Results as a 2D array (fitness followed by the parameter values), one
+    per row.
+
+    Parameters
+    ----------
+    data : list of arrays or 2D array
+        Results read from the csvfiles
+    set_param : :obj:`smartstopos.utils.parameters.set_parameters`
+        Set parameters explored
+    """
+    if not isinstance(data, (list, np.ndarray)):
+        raise TypeError("Data must be a list")
+    data = np.asarray(data, dtype=float).reshape(len(data), -1)
+    if data.shape[1] != len(set_param.parameters) + 1:
+        raise ValueError("The number of parameters is inconsistent")
+    return data[np.isfinite(data[:, 0])]
+
+
+def best_first(data, maximum):
+    """Indices of the results sorted by fitness, best first."""
+    if maximum:
+        return np.argsort(-data[:, 0], kind='stable')
+    return np.argsort(data[:, 0], kind='stable')
+
+
+def finish_points(points, set_param, sim_param):
+    """Brings the proposed data points in range, truncates the discrete
+    parameters and removes the data points not satisfying the constraints.
+    Values within rounding errors of 0 (relative to the range, e.g. after a
+    reflection through a centroid) are set to 0, so they are not written as
+    e.g. -2.2e-16 on the command line of the jobs.
+
+    Parameters
+    ----------
+    points : 2D array
+        Proposed data points, one per row
+    set_param : :obj:`smartstopos.utils.parameters.set_parameters`
+        Set parameters explored
+    sim_param : dict
+        Simulation information read from the input file
+
+    Returns
+    -------
+    points : 2D array
+    """
+    _scale, low, high, discrete = parameter_arrays(set_param)
+    points = apply_bounds(np.asarray(points, dtype=float).reshape(len(points), -1), low, high, "clip")
+    points[:, discrete] = np.trunc(points[:, discrete])
+    points[np.abs(points) < ZERO_TOLERANCE*(high - low)] = 0.0
+    return evaluate_constraints(sim_param, set_param, points)
+
+
+def unevaluated(points, data, decimals=10):
+    """Removes the data points already evaluated and the duplicates.
+
+    Parameters
+    ----------
+    points : 2D array
+        Proposed data points, one per row
+    data : 2D array
+        Results (fitness followed by the parameter values)
+    decimals : int
+        Number of decimals compared
+
+    Returns
+    -------
+    points : 2D array
+        The data points not evaluated yet, in the same order
+    """
+    evaluated = set(map(tuple, np.round(data[:, 1:], decimals) + 0.0))
+    keep = []
+    for i, point in enumerate(np.round(points, decimals) + 0.0):
+        key = tuple(point)
+        if key not in evaluated:
+            evaluated.add(key)
+            keep.append(i)
+    return points[keep]
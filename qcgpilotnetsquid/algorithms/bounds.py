@@ -0,0 +1,181 @@
+""" Bound handling of the random displacements of the algorithms.
+
+A parameter value is displaced by scale*U(-1, 1) (or by a normal step of
+standard deviation scale) and has to stay in the range of the parameter. All
+strategies are applied in one pass over the whole population:
+
+    resample: uniform on the part of [value - scale, value + scale] in range,
+        the distribution obtained by drawing until the value is in range
+    reflect: values out of range are mirrored at the bounds
+    clip: values out of range are moved to the nearest bound
+    wrap: values out of range re-enter at the opposite bound
+    truncnormal: normal displacement (standard deviation scale) truncated to
+        the range
+"""
+import numpy as np
+
+BOUND_STRATEGIES = ("resample", "reflect", "clip", "wrap", "truncnormal")
+
+
+def parameter_arrays(set_param):
+    """Scale factors, lower bounds, upper bounds and discrete flags of the
+    parameters, one entry per parameter.
+
+    Parameters
+    ----------
+    set_param : :obj:`smartstopos.utils.parameters.set_parameters`
+        Set parameters to be explored
+
+    Returns
+    -------
+    scale, low, high, discrete : arrays
+    """
+    params = list(set_param.parameters.values())
+    scale = np.array([param.scale_factor for param in params], dtype=float)
+    low = np.array([param.range[0] for param in params], dtype=float)
+    high = np.array([param.range[1] for param in params], dtype=float)
+    discrete = np.array([param.data_type == 'discrete' for param in params])
+    return scale, low, high, discrete
+
+
+def apply_bounds(values, low, high, strategy="clip"):
+    """Brings the values back in [low, high].
+
+    Parameters
+    ----------
+    values : array
+        Displaced values
+    low, high : float or array
+        Bounds, broadcast with values
+    strategy : str
+        reflect, clip or wrap
+
+    Returns
+    -------
+    values : array
+        Values in [low, high]
+    """
+    width = high - low
+    if strategy == "clip":
+        return np.clip(values, low, high)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if strategy == "reflect":
+            position = np.mod(values - low, 2*width)
+            values = low + np.where(position > width, 2*width - position, position)
+        elif strategy == "wrap":
+            values = low + np.mod(values - low, width)
+        else:
+            raise ValueError("Unknown bound strategy {}, choose between reflect, clip and wrap".format(strategy))
+    # a range of zero width has a single value
+    return np.where(width > 0, values, low)
+
+
+def displace(rng, centre, scale, low, high, strategy="resample"):
+    """Displaces the values randomly, keeping them in [low, high].
+
+    Parameters
+    ----------
+    rng : numpy.random.Generator
+        Random generator
+    centre : array
+        Values to displace
+    scale : float or array
+        Size of the displacements, broadcast with centre
+    low, high : float or array
+        Bounds, broadcast with centre
+    strategy : str
+        One of BOUND_STRATEGIES
+
+    Returns
+    -------
+    values : array
+        Displaced values in [low, high]
+    """
+    centre, scale, low, high = np.broadcast_arrays(np.asarray(centre, dtype=float), scale, low, high)
+    if strategy == "resample":
+        return _truncated_uniform(rng, centre, scale, low, high)
+    if strategy == "truncnormal":
+        return _truncated_normal(rng, centre, scale, low, high)
+    if strategy not in BOUND_STRATEGIES:
+        raise ValueError("Unknown bound strategy {}, choose between {}".format(strategy, ", ".join(BOUND_STRATEGIES)))
+    values = centre + scale*rng.uniform(-1, 1, centre.shape)
+    return apply_bounds(values, low, high, strategy)
+
+
+def _truncated_uniform(rng, centre, scale, low, high):
+    """Uniform on the intersection of [centre - scale, centre + scale] and
+    [low, high]. Values farther than scale out of range are moved to the
+    nearest bound."""
+    lower = np.maximum(low, centre - scale)
+    upper = np.minimum(high, centre + scale)
+    outside = lower > upper
+    lower = np.where(outside, np.clip(centre, low, high), lower)
+    upper = np.where(outside, lower, upper)
+    return lower + (upper - lower)*rng.random(centre.shape)
+
+
+def _truncated_normal(rng, centre, scale, low, high):
+    """Normal with mean centre and standard deviation scale truncated to
+    [low, high], sampled by inverting the cumulative distribution. The upper
+    tail is sampled as the mirrored lower tail, which keeps the precision far
+    from the mean."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        alpha = (low - centre)/scale
+        beta = (high - centre)/scale
+    mirrored = alpha > 0
+    a = np.where(mirrored, -beta, alpha)
+    b = np.where(mirrored, -alpha, beta)
+    cdf_a, cdf_b = _normal_cdf(a), _normal_cdf(b)
+    u = cdf_a + (cdf_b - cdf_a)*rng.random(centre.shape)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        step = np.clip(_normal_ppf(u), a, b)
+        # beyond the precision of the cumulative distribution the tail is
+        # exponential and the density on a narrow range is (almost) uniform
+        tail = ~(cdf_b > cdf_a)
+        step = np.where(tail, np.clip(b - rng.exponential(1.0, centre.shape)/np.abs(b), a, b), step)
+        narrow = b - a < 1e-3
+        step = np.where(narrow, a + (b - a)*rng.random(centre.shape), step)
+        values = centre + scale*np.where(mirrored, -step, step)
+    # no scale
+    degenerate = ~(scale > 0) | ~np.isfinite(values)
+    return np.where(degenerate, np.clip(centre, low, high), np.clip(values, low, high))
+
+
+def _normal_cdf(x):
+    """Standard normal cumulative distribution, with a relative error below
+    1.2e-7 also in the lower tail (complementary error function of
+    Numerical Recipes, erfcc)."""
+    z = np.abs(x)/np.sqrt(2)
+    t = 1/(1 + 0.5*z)
+    erfc = t*np.exp(-z*z - 1.26551223 + t*(1.00002368 + t*(0.37409196 + t*(0.09678418 + t*(-0.18628806
+               + t*(0.27886807 + t*(-1.13520398 + t*(1.48851587 + t*(-0.82215223 + t*0.17087277)))))))))
+    return np.where(x < 0, 0.5*erfc, 1 - 0.5*erfc)
+
+
+# Coefficients of the rational approximations of the normal quantile (Acklam)
+_PPF_A = (-3.969683028665376e+01, 2.209460984245205e+02, -2.759285104469687e+02,
+          1.383577518672690e+02, -3.066479806614716e+01, 2.506628277459239e+00)
+_PPF_B = (-5.447609879822406e+01, 1.615858368580409e+02, -1.556989798598866e+02,
+          6.680131188771972e+01, -1.328068155288572e+01)
+_PPF_C = (-7.784894002430293e-03, -3.223964580411365e-01, -2.400758277161838e+00,
+          -2.549732539343734e+00, 4.374664141464968e+00, 2.938163982698783e+00)
+_PPF_D = (7.784695709041462e-03, 3.224671290700398e-01, 2.445134137142996e+00,
+          3.754408661907416e+00)
+
+
+def _normal_ppf(p):
+    """Standard normal quantile (inverse cumulative distribution), relative
+    error below 1.2e-9."""
+    p = np.asarray(p, dtype=float)
+    a, b, c, d = _PPF_A, _PPF_B, _PPF_C, _PPF_D
+    with np.errstate(divide='ignore', invalid='ignore'):
+        q = p - 0.5
+        r = q*q
+        central = (((((a[0]*r + a[1])*r + a[2])*r + a[3])*r + a[4])*r + a[5])*q \
+            / (((((b[0]*r + b[1])*r + b[2])*r + b[3])*r + b[4])*r + 1)
+        tail_p = np.minimum(p, 1 - p)
+        s = np.sqrt(-2*np.log(tail_p))
+        tail = (((((c[0]*s + c[1])*s + c[2])*s + c[3])*s + c[4])*s + c[5]) \
+            / ((((d[0]*s + d[1])*s + d[2])*s + d[3])*s + 1)
+        tail = np.where(p > 0.5, -tail, tail)
+    return np.where(np.abs(q) <= 0.47575, central, tail)
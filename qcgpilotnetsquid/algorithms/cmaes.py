@@ -0,0 +1,185 @@
+""" Covariance matrix adaptation evolution strategy (CMA-ES)."""
+import logging
+import os
+import numpy as np
+from qcgpilotnetsquid.algorithms.batch import best_first, finish_points, results_array
+from qcgpilotnetsquid.algorithms.bounds import parameter_arrays
+from qcgpilotnetsquid.utils.rng import generator
+
+# Step size of the first generation, relative to the parameter ranges
+SIGMA0 = 0.3
+# Tries to sample data points satisfying the constraints
+MAX_RESAMPLING = 100
+
+
+def default_population_size(number_parameters):
+    """Population size recommended for CMA-ES."""
+    return 4 + int(3*np.log(number_parameters))
+
+
+def state_file(statedir, step):
+    """Path of the file with the state of CMA-ES after the step."""
+    return os.path.join(statedir, "cmaes_state_" + str(step) + ".npz")
+
+
+def initial_state(scaled, fitness, maximum, sigma0=SIGMA0):
+    """State of CMA-ES started from results: the mean is the weighted mean of the
+    best half of them and the covariance matrix the identity.
+
+    Parameters
+    ----------
+    scaled : 2D array
+        Parameter values of the results, scaled to [0, 1] by the ranges
+    fitness : array
+        Fitness of the results
+    maximum : bool
+        True if the fitness is maximized
+    sigma0 : float
+        Initial step size
+
+    Returns
+    -------
+    state : dict
+    """
+    number_parameters = scaled.shape[1]
+    order = best_first(np.column_stack((fitness, scaled)), maximum)
+    weights = _weights(len(order))
+    return {'mean': weights @ scaled[order[:len(weights)]],
+            'sigma': float(sigma0),
+            'C': np.eye(number_parameters),
+            'pc': np.zeros(number_parameters),
+            'ps': np.zeros(number_parameters),
+            'generation': 0}
+
+
+def _weights(number_results):
+    mu = max(1, number_results//2)
+    weights = np.log(mu + 0.5) - np.log(np.arange(1, mu + 1))
+    return weights/np.sum(weights)
+
+
+def update_state(state, scaled, fitness, maximum):
+    """Updates the mean, the step size and the covariance matrix with the
+    evaluated generation.
+
+    The data points actually evaluated (brought in range, truncated) are used,
+    not the sampled ones, so the update only depends on the results.
+
+    Parameters
+    ----------
+    state : dict
+        State the generation was sampled from
+    scaled : 2D array
+        Parameter values of the generation, scaled to [0, 1] by the ranges
+    fitness : array
+        Fitness of the generation
+    maximum : bool
+        True if the fitness is maximized
+
+    Returns
+    -------
+    state : dict
+        New state
+    """
+    n = scaled.shape[1]
+    weights = _weights(len(fitness))
+    mueff = 1/np.sum(weights**2)
+    cc = (4 + mueff/n)/(n + 4 + 2*mueff/n)
+    cs = (mueff + 2)/(n + mueff + 5)
+    c1 = 2/((n + 1.3)**2 + mueff)
+    cmu = min(1 - c1, 2*(mueff - 2 + 1/mueff)/((n + 2)**2 + mueff))
+    damps = 1 + 2*max(0, np.sqrt((mueff - 1)/(n + 1)) - 1) + cs
+    chi_n = np.sqrt(n)*(1 - 1/(4*n) + 1/(21*n**2))
+
+    mean, sigma, C = state['mean'], state['sigma'], state['C']
+    order = best_first(np.column_stack((fitness, scaled)), maximum)
+    steps = (scaled[order[:len(weights)]] - mean)/sigma
+    step_mean = weights @ steps
+
+    eigenvalues, B = np.linalg.eigh(C)
+    invsqrt_C = B @ np.diag(1/np.sqrt(np.maximum(eigenvalues, 1e-20))) @ B.T
+    ps = (1 - cs)*state['ps'] + np.sqrt(cs*(2 - cs)*mueff)*(invsqrt_C @ step_mean)
+    generation = state['generation'] + 1
+    hsig = (np.linalg.norm(ps)/np.sqrt(1 - (1 - cs)**(2*generation))/chi_n) < 1.4 + 2/(n + 1)
+    pc = (1 - cc)*state['pc'] + hsig*np.sqrt(cc*(2 - cc)*mueff)*step_mean
+    C = ((1 - c1 - cmu)*C + c1*(np.outer(pc, pc) + (1 - hsig)*cc*(2 - cc)*C)
+         + cmu*(steps.T*weights) @ steps)
+    C = (C + C.T)/2
+    new_sigma = sigma*np.exp(min(1.0, (cs/damps)*(np.linalg.norm(ps)/chi_n - 1)))
+    return {'mean': mean + sigma*step_mean,
+            'sigma': float(new_sigma),
+            'C': C,
+            'pc': pc,
+            'ps': ps,
+            'generation': generation}
+
+
+def sample(state, rng, number):
+    """Samples data points from the multivariate normal distribution of the
+    state (scaled coordinates)."""
+    eigenvalues, B = np.linalg.eigh(state['C'])
+    transform = B*np.sqrt(np.maximum(eigenvalues, 0))
+    z = rng.standard_normal((number, len(state['mean'])))
+    return state['mean'] + state['sigma']*z @ transform.T
+
+
+def cma_es(data, set_param, sim_param, step, statedir):
+    """Creates the next generation of CMA-ES from the results of the previous
+    one.
+
+    The state of the algorithm (mean, step size, covariance matrix and
+    evolution paths) is kept in scaled coordinates in a file per step in
+    statedir. If the state of the previous step is not found (first step,
+    restart, previous optimization with another algorithm), CMA-ES is started
+    from the results. Data points are brought in range, discrete parameters
+    truncated and data points not satisfying the constraints resampled.
+
+    Parameters
+    ----------
+    data : list of arrays
+        Results of the previous step (fitness followed by the parameter values)
+    set_param : :obj:`smartstopos.utils.parameters.set_parameters`
+        Set parameters explored
+    sim_param : dict
+        Simulation information read from the input file: population_size and
+        sigma0 (initial step size relative to the ranges)
+    step : int
+        Optimization step
+    statedir : str
+        Directory where the state is stored
+
+    Returns
+    -------
+    new_points : 2D array
+        New set of data points to be explored, one per row
+    """
+    data = results_array(data, set_param)
+    if len(data) == 0:
+        raise ValueError("No results to start CMA-ES from")
+    _scale, low, high, _discrete = parameter_arrays(set_param)
+    width = np.where(high > low, high - low, 1.0)
+    scaled = (data[:, 1:] - low)/width
+    number_parameters = len(low)
+    population_size = sim_param.get('population_size', default_population_size(number_parameters))
+
+    previous = state_file(statedir, step - 1)
+    if os.path.exists(previous):
+        with np.load(previous) as stored:
+            state = {key: stored[key] for key in stored.files}
+        state['sigma'] = float(state['sigma'])
+        state['generation'] = int(state['generation'])
+        state = update_state(state, scaled, data[:, 0], sim_param['maximum'])
+    else:
+        logging.info("No CMA-ES state found for step {}, starting from the results".format(step - 1))
+        state = initial_state(scaled, data[:, 0], sim_param['maximum'], sim_param.get('sigma0', SIGMA0))
+    np.savez(state_file(statedir, step), **state)
+
+    rng = generator(sim_param, step, "sampling")
+    new_points = np.empty((0, number_parameters))
+    for _ in range(MAX_RESAMPLING):
+        points = low + width*sample(state, rng, population_size - len(new_points))
+        new_points = np.concatenate((new_points, finish_points(points, set_param, sim_param)))
+        if len(new_points) >= population_size:
+            break
+    logging.debug("CMA-ES generation {}: step size {}".format(state['generation'], state['sigma']))
+    return new_points
@@ -1,136 +1,272 @@
 """ Implmentation of genetic algorithm for N-parameters."""
 import logging
-import random
-import copy
 from pprint import pformat
 from qcgpilotnetsquid.utils.parserconstraints import evaluate_constraints
+from qcgpilotnetsquid.algorithms.bounds import displace, parameter_arrays
+from qcgpilotnetsquid.algorithms.surrogate import screen
+from qcgpilotnetsquid.utils.rng import generator
 # from pprint import pprint
 import numpy as np
 
 
+def _generator(sim_param, rng, operator, step=0):
+    """Random generator of the operators: the given one, or the stream of the
+    operator at the step (see `qcgpilotnetsquid.utils.rng`)."""
+    if rng is not None:
+        return rng
+    return generator(sim_param, step, operator)
+
+
+def _as_population(data):
+    """Data points (list of arrays or 2D array) as a 2D array, one data point per row."""
+    if not isinstance(data, (list, np.ndarray)):
+        raise TypeError("Data must be a list or an array")
+    data = np.asarray(data, dtype=float)
+    if data.ndim < 2:
+        data = data.reshape(len(data), -1)
+    return data
+
+
+class SortedPopulation:
+    """Data points (without fitness) in order of fitness, best first.
+
+    Only the best data points (elites) are looked up with a partial
+    selection; the full ordering is computed the first time it is needed
+    (indexing or conversion to an array) and then kept.
+
+    Parameters
+    ----------
+    data : 2D array
+        Data points with the fitness in the first column
+    maximum : bool
+        True if the best data points have the highest fitness
+    """
+    def __init__(self, data, maximum):
+        self._data = data
+        self._maximum = maximum
+        self._order = None
+
+    def __len__(self):
+        return len(self._data)
+
+    def __getitem__(self, index):
+        return self.sorted()[index]
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self.sorted(), dtype=dtype)
+
+    def best(self, number=1):
+        """Indices (in the unsorted data) of the number best data points,
+        best first."""
+        if self._order is not None:
+            return self._order[:number]
+        return _sort_order(self._data[:, 0], self._maximum, number)
+
+    def first(self, number=1):
+        """The number best data points, as a 2D array."""
+        return self._data[self.best(number), 1:]
+
+    def others(self, number=1):
+        """All data points but the number best ones, not sorted."""
+        return np.delete(self._data[:, 1:], self.best(number), axis=0)
+
+    def sorted(self):
+        """All data points sorted, as a 2D array."""
+        if self._order is None:
+            self._order = _sort_order(self._data[:, 0], self._maximum)
+        return self._data[self._order, 1:]
+
+
+def _sort_order(fitness, maximum, number=None):
+    """Indices of the number (all by default) best data points, best first;
+    equal values keep their order, as with a stable sort. With number given,
+    only the selected data points are sorted (partial selection with
+    np.partition)."""
+    key = -fitness if maximum else fitness
+    if number is None or number >= len(key):
+        return np.argsort(key, kind='stable')
+    if number <= 0:
+        return np.array([], dtype=int)
+    threshold = np.partition(key, number - 1)[number - 1]
+    better = np.flatnonzero(key < threshold)
+    equal = np.flatnonzero(key == threshold)[:number - len(better)]
+    selected = np.concatenate((better, equal))
+    return selected[np.lexsort((selected, key[selected]))]
+
+
 def get_parents(data, sim_params):
     """Selects the N=number_best_candidates data points from the data based on their fitness.
 
     Parameters
     ----------
-    data : list
+    data : list or 2D array
         List of the data points read from output file of previous step.
     sim_params : dict
         Dictionary with the simulation details read from the input file.
 
     Returns
     -------
-    best_candidates: list (arrays)
-        Returns list of best_candidates.
-    fitness: list
-        The fitness values of the best_candidates (same order as best_candidates
-        list)
-    sorted_data: list (arrays)
-        List of all data points sorted. Sorting order depends on whether we are
+    best_candidates: 2D array
+        Returns the best_candidates, one per row.
+    fitness: array
+        The fitness values of the best_candidates (same order as best_candidates)
+    sorted_data: SortedPopulation
+        All data points sorted. Sorting order depends on whether we are
         looking for the maximum or minimum of a function.
     """
+    data = _as_population(data)
 
-    if not isinstance(data, list):
-        raise TypeError("Data most be a list")
+    # Only the best candidates are sorted, based on first column
+    number_best_candidates = sim_params['number_best_candidates']
+    selected = _sort_order(data[:, 0], sim_params['maximum'], number_best_candidates)
+    best_candidates = data[selected, 1:]
+    fitness = data[selected, 0]
 
-    # Sort data based on first column
-    if sim_params['maximum']:
-        data_sorted = np.array(sorted(data, key=lambda x: x[0], reverse=True))
+    logging.debug("{} parents have successfully been selected".format(number_best_candidates))
+    logging.debug(pformat(best_candidates))
+    return best_candidates, fitness, SortedPopulation(data, sim_params['maximum'])
+
+
+def _selection_probabilities(fitness, maximum):
+    """Cumulative selection probabilities of the data points for roulette
+    wheel selection: proportional to the fitness when maximizing, to its
+    inverse when minimizing. A fitness of 0 gets the weight of the extreme
+    fitness value instead."""
+    fitness = np.asarray(fitness, dtype=float)
+    if maximum:
+        weights = np.where(fitness == 0, np.amax(fitness), fitness)
     else:
-        data_sorted = np.array(sorted(data, key=lambda x: x[0]))
+        with np.errstate(divide='ignore'):
+            weights = np.where(fitness == 0, np.amin(fitness), 1/fitness)
+    cumul_selection_prob = np.cumsum(weights)
+    return cumul_selection_prob/cumul_selection_prob[-1]
 
-    best_candidates = []
-    fitness = []
 
-    sorted_population = []
+def get_parents_roulette(data, sim_params, rng=None):
+    """Selects N=number_best_candidates data points from data based on roulette wheel selection.
+
+    Parameters
+    ----------
+    data : list or 2D array
+        List of the data points (array) from output file.
+    sim_params : dict
+        Dictionary with the simulation details read from the input file.
+    rng: numpy.random.Generator
+        Random generator, by default the stream of the operator at step 0
+
+    Returns
+    -------
+    best_candidates : 2D array
+        Returns the best_candidates, one per row.
+    fitness : array
+        Returns the values of the objective (fitness) function for
+        the best_candidates.
+    sorted_population : SortedPopulation
+        All data points sorted. Sorting order depends on whether we are
+        looking for the maximum or minimum of a function.
+    """
+    data = _as_population(data)
+    rng = _generator(sim_params, rng, "selection")
     number_best_candidates = sim_params['number_best_candidates']
-    for item in data_sorted:
-        sorted_population.append(item[1:])
-        if len(best_candidates) < number_best_candidates:
-            best_candidates.append(item[1:])
-            fitness.append(item[0])
+
+    cumul_selection_prob = _selection_probabilities(data[:, 0], sim_params['maximum'])
+    selected = np.searchsorted(cumul_selection_prob, rng.random(number_best_candidates), side='right')
+    selected = np.minimum(selected, len(data) - 1)
+    best_candidates = data[selected, 1:]
+    fitness = data[selected, 0]
 
     logging.debug("{} parents have successfully been selected".format(number_best_candidates))
     logging.debug(pformat(best_candidates))
-    return best_candidates, fitness, sorted_population
+    return best_candidates, fitness, SortedPopulation(data, sim_params['maximum'])
 
 
-def get_parents_roulette(data, sim_params):
-    """Selects N=number_best_candidates data points from data based on roulette wheel selection.
+def get_parents_sus(data, sim_params, rng=None):
+    """Selects N=number_best_candidates data points from data based on
+    stochastic universal sampling: a roulette wheel with N equally spaced
+    pointers turned once, selecting each data point (almost) exactly as often
+    as expected from its selection probability.
 
     Parameters
     ----------
-    data : list
+    data : list or 2D array
         List of the data points (array) from output file.
     sim_params : dict
         Dictionary with the simulation details read from the input file.
+    rng: numpy.random.Generator
+        Random generator, by default the stream of the operator at step 0
 
     Returns
     -------
-    best_candidates : list (arrays)
-        Returns list of best_candidates.
-    fitness : list
-        Returns list with ordered values of the objective (fitness) function for
+    best_candidates : 2D array
+        Returns the best_candidates, one per row, in random order.
+    fitness : array
+        Returns the values of the objective (fitness) function for
         the best_candidates.
-    sorted_population : list (arrays)
-        List of all data points sorted. Sorting order depends on whether we are
+    sorted_population : SortedPopulation
+        All data points sorted. Sorting order depends on whether we are
         looking for the maximum or minimum of a function.
     """
+    data = _as_population(data)
+    rng = _generator(sim_params, rng, "selection")
+    number_best_candidates = sim_params['number_best_candidates']
 
-    if not isinstance(data, list):
-        raise TypeError("Data must be a list")
+    cumul_selection_prob = _selection_probabilities(data[:, 0], sim_params['maximum'])
+    pointers = (rng.random() + np.arange(number_best_candidates))/number_best_candidates
+    selected = np.searchsorted(cumul_selection_prob, pointers, side='right')
+    selected = rng.permutation(np.minimum(selected, len(data) - 1))
+    best_candidates = data[selected, 1:]
+    fitness = data[selected, 0]
 
-    # Sort data based on first column
+    logging.debug("{} parents have successfully been selected".format(number_best_candidates))
+    logging.debug(pformat(best_candidates))
+    return best_candidates, fitness, SortedPopulation(data, sim_params['maximum'])
+
+
+def get_parents_tournament(data, sim_params, rng=None):
+    """Selects N=number_best_candidates data points from data based on
+    tournament selection: each parent is the fittest of tournament_size data
+    points drawn at random (with replacement).
+
+    Parameters
+    ----------
+    data : list or 2D array
+        List of the data points (array) from output file.
+    sim_params : dict
+        Dictionary with the simulation details read from the input file.
+    rng: numpy.random.Generator
+        Random generator, by default the stream of the operator at step 0
+
+    Returns
+    -------
+    best_candidates : 2D array
+        Returns the best_candidates, one per row.
+    fitness : array
+        Returns the values of the objective (fitness) function for
+        the best_candidates.
+    sorted_population : SortedPopulation
+        All data points sorted. Sorting order depends on whether we are
+        looking for the maximum or minimum of a function.
+    """
+    data = _as_population(data)
+    rng = _generator(sim_params, rng, "selection")
+    number_best_candidates = sim_params['number_best_candidates']
+    tournament_size = sim_params.get('tournament_size', 2)
+
+    contestants = rng.integers(len(data), size=(number_best_candidates, tournament_size))
     if sim_params['maximum']:
-        data_sorted = np.array(sorted(data, key=lambda x: x[0], reverse=True))
+        winner = np.argmax(data[contestants, 0], axis=1)
     else:
-        data_sorted = np.array(sorted(data, key=lambda x: x[0]))
-    
-    fitness_inv = []
-    sorted_population = []
-    number_best_candidates = sim_params['number_best_candidates']
-    maximum = sim_params['maximum']
-    min_fitness = min(x[0] for x in data_sorted)
-    max_fitness = max(x[0] for x in data_sorted)
-    
-    for i, item in enumerate(data_sorted):
-        sorted_population.append(item[1:])
-        if not maximum:
-            if item[0] == 0:
-                fitness_inv.append(min_fitness)
-            else:
-                fitness_inv.append(1/item[0])
-        else:
-            if item[0] == 0:
-                fitness_inv.append(max_fitness)
-            else:
-                fitness_inv.append(item[0])
-
-    total_fit = np.sum(fitness_inv)
-    cumul_selection_prob = []
-    
-    for i, item in enumerate(fitness_inv):
-        if i == 0:
-            cumul_selection_prob.append(fitness_inv[i]/total_fit)
-        else:
-            cumul_selection_prob.append(cumul_selection_prob[i - 1] + fitness_inv[i]/total_fit)
-
-    best_candidates = []
-    fitness = []
-
-    while len(best_candidates) < number_best_candidates:
-        rand = random.random()
-        for i, prob in enumerate(cumul_selection_prob):
-            if rand < prob:
-                best_candidates.append(data_sorted[i][1:])
-                fitness.append(data_sorted[i][0])
-                break
+        winner = np.argmin(data[contestants, 0], axis=1)
+    selected = contestants[np.arange(number_best_candidates), winner]
+    best_candidates = data[selected, 1:]
+    fitness = data[selected, 0]
+
     logging.debug("{} parents have successfully been selected".format(number_best_candidates))
     logging.debug(pformat(best_candidates))
-    return best_candidates, fitness, sorted_population
+    return best_candidates, fitness, SortedPopulation(data, sim_params['maximum'])
 
 
-def mutate(data, set_param, sim_param, fitness, opt_step):
+def mutate(data, set_param, sim_param, fitness, opt_step, rng=None):
     """Generates small changes in the data. The mutation probability is
     determined by the fitness of the data point. Parameters in the data points
     are muated randomly. The mutations size of each parameter is determined by
@@ -138,8 +274,8 @@ def mutate(data, set_param, sim_param, fitness, opt_step):
 
     Parameters:
     ----------
-    data : list (arrays)
-        List of data points (arrays) to mutate.
+    data : list (arrays) or 2D array
+        Data points to mutate.
     set_param : :obj:`smartstopos.utils.parameters.set_parameters`
         Set parameters to be explored
     sim_param:  dict
@@ -148,10 +284,12 @@ def mutate(data, set_param, sim_param, fitness, opt_step):
         Fitness values of data
     opt_step: int
         Current optimization step
+    rng: numpy.random.Generator
+        Random generator, by default the stream of the operator at opt_step
 
     Returns
     -------
-    mutated_points : list (arrays)
+    mutated_points : 2D array
         Mutated data points.
     """
 
@@ -165,101 +303,95 @@ def mutate(data, set_param, sim_param, fitness, opt_step):
     else:
         population_size = sim_param['number_best_candidates']*number_parameters
 
-    if not isinstance(data, list):
-        raise TypeError("Data most be a list")
-
-    # FIXME: flag to avoid to many duplicated
-    mutated = True
-
-    random.seed(sim_param['seed'])
-    mutated_points = copy.deepcopy(data)
-    mutated_points = []    # copy.deepcopy(data)
-    proba_mutation = sim_param['proba_mutation']
+    data = _as_population(data)
+    rng = _generator(sim_param, rng, "mutation", opt_step)
+    scale, low, high, discrete = parameter_arrays(set_param)
+    strategy = sim_param.get('bound_strategy', 'resample')
 
     if number_parameters == 1:
-        while len(mutated_points) < population_size:
-            for k, point in enumerate(data):
-                param = list(set_param.parameters.values())[0]
-                while True:
-                    test_mutation = point + param.scale_factor*random.uniform(-1, 1)
-                    logging.debug("{} -->{}".format(point, test_mutation))
-                    if test_mutation > param.range[0] and test_mutation < param.range[1]:
-                        logging.debug("Mutation accepted")
-                        if param.data_type == 'discrete':
-                            mutated_points.append(np.array(test_mutation, dtype=int))
-                        else:
-                            mutated_points.append(np.array(test_mutation, dtype=float))
-                        break
+        # all data points are mutated, as many times as needed to fill the population
+        repeats = -(-population_size // len(data))
+        points = np.tile(data, (repeats, 1))
+        mutated_points = displace(rng, points, scale, low, high, strategy)
+        mutated_points[:, discrete] = np.trunc(mutated_points[:, discrete])
 
     elif number_parameters > 1:
-        for _ in range(population_size):
-            k = random.sample(range(len(data)), 1)[0]
-            point = data[k]
-            if k in range(len(fitness)):
-                if sim_param['maximum']:
-                    if fitness[k] >= np.average(fitness):
-                        proba_mutation = 0.5  # maybe higher?
-                    else:
-                        proba_mutation = 0.5*(fitness[k] - np.amin(fitness))/(np.average(fitness) - np.amin(fitness))
-                elif not sim_param['maximum']:
-                    if fitness[k] <= np.average(fitness):
-                        proba_mutation = 0.5  # maybe higher?
-                    else:
-                        proba_mutation = 0.5*(fitness[k] - np.amin(fitness))/(np.average(fitness) - np.amin(fitness))
-            for i, param in enumerate(set_param.parameters.values()):
-                if random.random() < proba_mutation:
-                    test_mutation = copy.copy(point)
-                    while True:
-                        test_mutation[i] = point[i] + (param.scale_factor)*random.uniform(-1, 1)
-                        # print("{} -->{}".format(point, test_mutation))
-                        if test_mutation[i] >= param.range[0] and test_mutation[i] <= param.range[1]:
-                            # print ("Mutation accepted")
-                            # TODO: check if add float or int?
-                            # TODO: if other constraints satisfied?
-                            mutated_points.append(test_mutation)
-                            break
-                else:
-                    mutated_points.append(point)
-                    mutated = False
-                if not mutated:
-                    proba_mutation = 1.0
-                    mutated = True
+        # Each chosen data point gives one new point per parameter, with only
+        # that parameter mutated (or not mutated)
+        chosen = rng.integers(len(data), size=population_size)
+
+        # Mutation probability of the chosen data points with a fitness, the
+        # previous probability is kept for the ones without
+        fitness = np.asarray(fitness, dtype=float)
+        has_fitness = chosen < len(fitness)
+        proba_fitness = np.zeros(len(fitness))
+        if len(fitness) > 0:
+            average, minimum = np.average(fitness), np.amin(fitness)
+            if sim_param['maximum']:
+                better = fitness >= average
+            else:
+                better = fitness <= average
+            with np.errstate(divide='ignore', invalid='ignore'):
+                proba_fitness = np.where(better, 0.5, 0.5*(fitness - minimum)/(average - minimum))
+        owner = np.maximum.accumulate(np.where(has_fitness, np.arange(population_size), -1))
+        proba = np.full(population_size, float(sim_param['proba_mutation']))
+        proba[owner >= 0] = proba_fitness[chosen[owner[owner >= 0]]]
+
+        # Once a parameter is not mutated, all following parameters are
+        # mutated until the probability is set again by a data point with a
+        # fitness (FIXME: flag to avoid to many duplicated)
+        not_mutated = (rng.random((population_size, number_parameters)) >= proba[:, None]).ravel()
+        segment_start = np.repeat(np.maximum(owner, 0)*number_parameters, number_parameters)
+        previous_not_mutated = np.cumsum(not_mutated) - not_mutated
+        forced = previous_not_mutated > previous_not_mutated[segment_start]
+        mutation = ~not_mutated | forced
+
+        # TODO: check if add float or int?
+        # TODO: if other constraints satisfied?
+        mutated_points = np.repeat(data[chosen], number_parameters, axis=0)
+        rows = np.flatnonzero(mutation)
+        columns = rows % number_parameters
+        mutated_points[rows, columns] = displace(rng, mutated_points[rows, columns],
+                                                 scale[columns], low[columns], high[columns], strategy)
+    else:
+        mutated_points = data
+
     logging.debug("Mutated data points from input data have been created")
     logging.debug("Size mutated points: {}".format(len(mutated_points)))
     logging.debug(pformat(mutated_points))
     return mutated_points
 
 
-def crossover(data, set_param, sim_param):
+def crossover(data, set_param, sim_param, rng=None):
     """Swaps parameter values between the data points in data.
 
     Parameters
     ----------
-    data : list (arrays)
-        Array with the data points corresponding to the fittest and their
-        mutations.
+    data : list (arrays) or 2D array
+        Data points corresponding to the fittest and their mutations.
     set_param : :obj:`smartstopos.utils.parameters.set_parameters`
         Set parameters to be explored
     sim_param: dict
         Simulation information read from input file
+    rng: numpy.random.Generator
+        Random generator, by default the stream of the operator at step 0
 
     Returns
     -------
-    crossover_points: list (arrays)
-        List with data points after crossover. If no population size defined, it
+    crossover_points: 2D array
+        Data points after crossover. If no population size defined, it
         creates N=number_best_candidates*number_parameters new points. The new
         points are created by randomly swapping parameters of the data points.
     """
-    if not isinstance(data, list):
-        raise TypeError("Data must be a list")
+    data = _as_population(data)
 
     number_parameters = len(set_param.parameters)
     if 'number_parameters' in sim_param.keys():
         if number_parameters != sim_param['number_parameters']:
             raise ValueError("The number of parameters seems inconsistent")
 
-    random.seed(sim_param['seed'])
-    crossover_points = copy.deepcopy(data)
+    rng = _generator(sim_param, rng, "crossover")
+    children = np.empty((0, data.shape[1]))
 
     if 'population_size' in sim_param.keys():
         number_of_crossover_children = int(sim_param['proba_crossover'] * sim_param['population_size'])
@@ -267,33 +399,30 @@ def crossover(data, set_param, sim_param):
         number_of_crossover_children = number_parameters*sim_param['number_best_candidates']
 
     if number_parameters > 1:
-        for i in range(number_of_crossover_children):
-            if (len(crossover_points) >= number_of_crossover_children):
-                break
-            if random.random() < sim_param['proba_crossover']:
-                i1, i2 = random.sample(range(len(data)), 2)
-                a = data[i1][:].copy()
-                b = data[i2][:].copy()
-                crossover_location = random.randrange(1, number_parameters)
-                a[crossover_location:] = b[crossover_location:]
-                crossover_points.append(a)
+        # each attempt succeeds with proba_crossover, until the data points
+        # and their children reach number_of_crossover_children
+        successes = rng.binomial(number_of_crossover_children, sim_param['proba_crossover'])
+        number_children = min(successes, max(0, number_of_crossover_children - len(data)))
+        if number_children > 0:
+            if len(data) < 2:
+                raise ValueError("At least two data points are needed for crossover")
+            first = rng.integers(len(data), size=number_children)
+            second = rng.integers(len(data) - 1, size=number_children)
+            second += second >= first
+            crossover_location = rng.integers(1, number_parameters, size=number_children)
+            swap = np.arange(number_parameters) >= crossover_location[:, None]
+            children = np.where(swap, data[second], data[first])
 
     # For one parameter, more mutations are added.
     if number_parameters == 1:
-        param = list(set_param.parameters.values())[0]
-        for k, point in enumerate(data):
-            if random.random() < sim_param['proba_crossover']:
-                while True:
-                    test_mutation = point + param.scale_factor*random.uniform(-1, 1)
-                    logging.debug("{} -->{}".format(point, test_mutation))
-                    if test_mutation > param.range[0] and test_mutation < param.range[1]:
-                        logging.debug("mutation accepted")
-                        # if other constraints satisfied?
-                        if param.data_type == 'discrete':
-                            crossover_points.append(np.array(test_mutation, dtype=int))
-                        else:
-                            crossover_points.append(np.array(test_mutation, dtype=float))
-                        break
+        # if other constraints satisfied?
+        scale, low, high, discrete = parameter_arrays(set_param)
+        selected = data[rng.random(len(data)) < sim_param['proba_crossover']]
+        strategy = sim_param.get('bound_strategy', 'resample')
+        children = displace(rng, selected, scale, low, high, strategy)
+        children[:, discrete] = np.trunc(children[:, discrete])
+
+    crossover_points = np.concatenate((data, children))
     logging.debug("Crossover data points from input data have been created")
     logging.debug("Size crossover points: {}".format(len(crossover_points)))
     logging.debug(pformat(crossover_points))
@@ -319,35 +448,53 @@ def check_constraints(sim_param, set_param, new_individuals):
     return clean_new_individuals
 
 
-def replace_population(sorted_data, new_individuals, population_size):
+def replace_population(sorted_data, new_individuals, population_size, rng, elite_count=1):
     """Creates the population for the next generation taking individuals generated through crossover and mutation
     and a) 'filling' the rest of the empty spots with the best elements from the
     previous generation, or b) removing some of the elements of the new_individuals.
-    Elitism is also implemented, i.e., the best solution from the previous generation is always passed on.
-    This can lead to duplicate data point as generations advance.
+    Elitism is also implemented, i.e., the elite_count best solutions from the previous generation are always
+    passed on. This can lead to duplicate data point as generations advance.
 
     Parameters
     ----------
-    sorted_data : list
-        List of sets of parameters ordered according to the corresponding value of the objective function.
-    new_individuals : list
-        List of sets of parameters generated from parents through crossover and mutation
+    sorted_data : SortedPopulation, list or 2D array
+        Sets of parameters ordered according to the corresponding value of the objective function.
+        Only the best ones and the others as a set are needed, unless all are kept.
+    new_individuals : list or 2D array
+        Sets of parameters generated from parents through crossover and mutation
     population_size : int
         Desired number of individuals in next generation
+    rng: numpy.random.Generator
+        Random generator, the replacement stream of the step (see
+        `qcgpilotnetsquid.utils.rng`)
+    elite_count: int
+        Number of best individuals of the previous generation always kept
+
+    Returns
+    -------
+    new_pop : 2D array
+        Individuals of the next generation
     """
+    elite_count = max(0, min(elite_count, len(sorted_data), population_size))
+    if isinstance(sorted_data, SortedPopulation):
+        elites, others = sorted_data.first(elite_count), sorted_data.others(elite_count)
+    else:
+        sorted_data = _as_population(sorted_data)
+        elites, others = sorted_data[:elite_count], sorted_data[elite_count:]
+    new_individuals = np.asarray(new_individuals, dtype=float).reshape(-1, elites.shape[1])
     number_of_new_individuals = len(new_individuals)
 
-    if number_of_new_individuals >= population_size:
-        new_pop = random.sample(new_individuals, population_size - 1)
-        new_pop.append(sorted_data[0])
+    if number_of_new_individuals > population_size - elite_count:
+        selected = rng.choice(number_of_new_individuals, population_size - elite_count, replace=False)
+        new_pop = np.concatenate((new_individuals[selected], elites))
         logging.debug("New generation of data points has been resized to the population size defined in input")
     elif len(sorted_data) > population_size - number_of_new_individuals:
-        sorted_data_clean = random.sample(sorted_data[1:], population_size - number_of_new_individuals - 1)
-        sorted_data_clean.append(sorted_data[0])
-        new_pop = np.concatenate((sorted_data_clean, new_individuals))
+        selected = rng.choice(len(others), population_size - number_of_new_individuals - elite_count,
+                              replace=False)
+        new_pop = np.concatenate((others[selected], elites, new_individuals))
         logging.debug("New generation of data points has been resized to the population size defined in input")
     else:
-        new_pop = np.concatenate(sorted_data, new_individuals)
+        new_pop = np.concatenate((np.asarray(sorted_data), new_individuals))
         logging.debug("WARNING: Not enough data points to keep population size.")
 
     return new_pop
@@ -390,7 +537,7 @@ def scale_probabilities(sim_param, factor, opt_step):
     sim_param['proba_crossover'] = 1 - sim_param['proba_crossover']/factor*(opt_step/sim_param['opt_steps'])
 
 
-def genetic_algorithm(data, set_param, sim_param, opt_step):
+def genetic_algorithm(data, set_param, sim_param, opt_step, history=None):
     """Creates a new generation of data points based on genetic algorithms.
 
     Parameters
@@ -403,44 +550,71 @@ def genetic_algorithm(data, set_param, sim_param, opt_step):
         Simulation information, parameters for algorithm
     opt_step : int
         The current generation being generated (step number)
+    history : list of arrays, optional
+        All results obtained so far. If given and a surrogate is defined
+        (sim_param['surrogate']), an offspring pool surrogate_oversampling times
+        larger is created and only the children most promising according to a
+        surrogate fitted on the history are kept
 
     Returns
     -------
-    new_generation : list of arrays
+    new_generation : 2D array
         New set of data points to be explored. Each data point is a set of
         parameters values.
     """
-    if not isinstance(data, list):
+    if not isinstance(data, (list, np.ndarray)):
         raise TypeError("Data is not a list")
+    # independent stream of every operator at this step
+    selection_rng = generator(sim_param, opt_step, "selection")
+    crossover_rng = generator(sim_param, opt_step, "crossover")
+    mutation_rng = generator(sim_param, opt_step, "mutation")
+    replacement_rng = generator(sim_param, opt_step, "replacement")
 
     # choose parents according to specified scheme
     if 'roulette' in sim_param.keys() and sim_param['roulette']:
-        parents, fitness, sorted_data = get_parents_roulette(data, sim_param)
+        parents, fitness, sorted_data = get_parents_roulette(data, sim_param, rng=selection_rng)
+    elif 'sus' in sim_param.keys() and sim_param['sus']:
+        parents, fitness, sorted_data = get_parents_sus(data, sim_param, rng=selection_rng)
+    elif 'tournament' in sim_param.keys() and sim_param['tournament']:
+        parents, fitness, sorted_data = get_parents_tournament(data, sim_param, rng=selection_rng)
     else:
         parents, fitness, sorted_data = get_parents(data, sim_param)
 
+    # with a surrogate, the operators create a larger offspring pool
+    screening = sim_param.get('surrogate') and history is not None and len(history) > 0
+    operator_param = sim_param
+    if screening:
+        operator_param = dict(sim_param)
+        operator_param['population_size'] = int(np.ceil(sim_param.get('surrogate_oversampling', 5)
+                                                        * sim_param['population_size']))
+
     # scale the mutation size. Size gets smaller with simulation step
     if opt_step > 1:
         scale_mutation_sizes(set_param, opt_step, sim_param['opt_steps'])
     # Either first mutation or first crossover
     if 'c' in sim_param.keys() and sim_param["c"]:
-        crossover_parents = crossover(parents, set_param, sim_param)
-        mutated_parents = mutate(crossover_parents, set_param, sim_param, fitness, opt_step)
-        clean_mutated_parents = check_constraints(sim_param, set_param, mutated_parents)
-        new_generation = replace_population(sorted_data, clean_mutated_parents, sim_param['population_size'])
-        # new_generation = mutated_parents
-        logging.debug("New generation, length {}".format(len(new_generation)))
-        logging.debug(pformat(new_generation))
+        crossover_parents = crossover(parents, set_param, operator_param, rng=crossover_rng)
+        mutated_parents = mutate(crossover_parents, set_param, operator_param, fitness, opt_step, rng=mutation_rng)
+        offspring = check_constraints(sim_param, set_param, mutated_parents)
 
     if 'm' in sim_param.keys() and sim_param["m"]:
-        mutated_parents = mutate(parents, set_param, sim_param, fitness, opt_step)
-        crossover_parents = crossover(mutated_parents, set_param, sim_param)
-        clean_crossover_parents = check_constraints(sim_param, set_param, crossover_parents)
-        new_generation = replace_population(sorted_data, clean_crossover_parents, sim_param['population_size'])
-        logging.debug("New generation, length {}".format(len(new_generation)))
-        logging.debug(pformat(new_generation))
+        mutated_parents = mutate(parents, set_param, operator_param, fitness, opt_step, rng=mutation_rng)
+        crossover_parents = crossover(mutated_parents, set_param, operator_param, rng=crossover_rng)
+        offspring = check_constraints(sim_param, set_param, crossover_parents)
+
+    if screening:
+        # keep only the children the surrogate expects to be the best
+        number = sim_param['population_size'] - sim_param.get('elite_count', 1)
+        offspring = screen(offspring, history, set_param, sim_param, number)
+        print("{} children selected by the surrogate".format(len(offspring)))
+
+    new_generation = replace_population(sorted_data, offspring, sim_param['population_size'],
+                                        rng=replacement_rng, elite_count=sim_param.get('elite_count', 1))
+    logging.debug("New generation, length {}".format(len(new_generation)))
+    logging.debug(pformat(new_generation))
+
     # Check for duplicates
-    unique_data = [list(x) for x in set(tuple(x) for x in new_generation)]
+    unique_data = np.unique(new_generation, axis=0)
     # Remove duplicates? Uncomment line below
     # new_generation = unique_data
     logging.debug("New generation created. In total {} new data points to explore".format(len(new_generation)))
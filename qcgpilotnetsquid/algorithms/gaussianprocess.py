@@ -0,0 +1,69 @@
+""" Batch Bayesian optimization with a Gaussian process surrogate."""
+import logging
+import numpy as np
+from qcgpilotnetsquid.algorithms.batch import best_first, finish_points, results_array, unevaluated
+from qcgpilotnetsquid.algorithms.bounds import displace, parameter_arrays
+from qcgpilotnetsquid.algorithms.surrogate import GaussianProcess, acquisition
+from qcgpilotnetsquid.utils.rng import generator
+
+
+def gaussian_process(data, set_param, sim_param, step):
+    """Proposes a batch of data points maximizing the upper (lower when
+    minimizing) confidence bound of a Gaussian process fitted on the results.
+
+    A pool of candidates is drawn uniformly in the parameter ranges and around
+    the best results. The batch is selected greedily; after each selection the
+    score of the candidates close to it (on the length scale of the Gaussian
+    process) is penalized, so the batch explores several promising regions at
+    once.
+
+    Parameters
+    ----------
+    data : list of arrays
+        Results obtained so far (fitness followed by the parameter values)
+    set_param : :obj:`smartstopos.utils.parameters.set_parameters`
+        Set parameters explored
+    sim_param : dict
+        Simulation information read from the input file: population_size
+        (batch size), candidates (pool size), kappa and surrogate_max_points
+    step : int
+        Optimization step
+
+    Returns
+    -------
+    new_points : 2D array
+        New set of data points to be explored, one per row
+    """
+    data = results_array(data, set_param)
+    if len(data) == 0:
+        raise ValueError("No results to fit the Gaussian process")
+    rng = generator(sim_param, step, "candidates")
+    scale, low, high, _discrete = parameter_arrays(set_param)
+    width = np.where(high > low, high - low, 1.0)
+    batch_size = sim_param['population_size']
+    number_candidates = sim_param.get('candidates', 100*batch_size)
+
+    # candidates: half uniform, half around the best tenth of the results
+    uniform = low + (high - low)*rng.random((number_candidates//2, len(low)))
+    best = data[best_first(data, sim_param['maximum'])[:max(1, len(data)//10)], 1:]
+    centres = best[rng.integers(len(best), size=number_candidates - len(uniform))]
+    local = displace(rng, centres, scale, low, high, "truncnormal")
+    candidates = finish_points(np.concatenate((uniform, local)), set_param, sim_param)
+    candidates = unevaluated(candidates, data)
+    if len(candidates) <= batch_size:
+        return candidates
+
+    surrogate = GaussianProcess(set_param, sim_param.get('surrogate_max_points', 500))
+    surrogate.fit(data[:, 1:], data[:, 0])
+    score = acquisition(surrogate, candidates, sim_param['maximum'], sim_param.get('kappa', 2.0))
+    score = score - np.amin(score) + 1e-12
+
+    scaled = candidates/width
+    selected = []
+    for _ in range(batch_size):
+        i = int(np.argmax(score))
+        selected.append(i)
+        distances = np.sum((scaled - scaled[i])**2, axis=1)
+        score *= 1 - np.exp(-0.5*distances/surrogate.length_scale**2)
+    logging.debug("{} data points selected from {} candidates".format(batch_size, len(candidates)))
+    return candidates[selected]
@@ -0,0 +1,97 @@
+""" Gradient based optimization with finite-difference stencils and a line
+search evaluated in parallel."""
+import logging
+import numpy as np
+from qcgpilotnetsquid.algorithms.batch import best_first, finish_points, results_array, unevaluated
+from qcgpilotnetsquid.algorithms.bounds import parameter_arrays
+
+
+def local_gradient(points, values, centre, radius):
+    """Gradient at centre of a linear fit of the results within radius.
+
+    Parameters
+    ----------
+    points : 2D array
+        Parameter values of the results (scaled coordinates)
+    values : array
+        Fitness of the results
+    centre : array
+        Point where the gradient is estimated
+    radius : float
+        Only the results closer than radius are fitted
+
+    Returns
+    -------
+    gradient : array or None
+        None if the results around centre do not determine the gradient
+    """
+    near = np.sum((points - centre)**2, axis=1) <= radius**2
+    offsets = points[near] - centre
+    if len(offsets) < points.shape[1] + 1:
+        return None
+    design = np.column_stack((np.ones(len(offsets)), offsets))
+    coefficients, _residuals, rank, _singular = np.linalg.lstsq(design, values[near], rcond=None)
+    if rank < design.shape[1]:
+        return None
+    return coefficients[1:]
+
+
+def gradient_based(data, set_param, sim_param, step):
+    """Proposes a line search along the estimated gradient from the best result,
+    together with a central finite-difference stencil around it.
+
+    The gradient at the best result is estimated by a linear fit of the
+    results around it (the stencil of the previous step), so no state is kept
+    between steps. All points of the line search (steps growing by a factor 2)
+    and of the stencil are evaluated in the same step. When all of them have
+    been evaluated already, the stencil and the steps are halved.
+
+    Parameters
+    ----------
+    data : list of arrays
+        Results obtained so far (fitness followed by the parameter values)
+    set_param : :obj:`smartstopos.utils.parameters.set_parameters`
+        Set parameters explored
+    sim_param : dict
+        Simulation information read from the input file: fd_step (stencil
+        size) and step_size (first line search step), both relative to the
+        parameter ranges, and line_points
+    step : int
+        Optimization step
+
+    Returns
+    -------
+    new_points : 2D array
+        New set of data points to be explored, one per row
+    """
+    data = results_array(data, set_param)
+    if len(data) == 0:
+        raise ValueError("No results to start the gradient search from")
+    _scale, low, high, _discrete = parameter_arrays(set_param)
+    width = np.where(high > low, high - low, 1.0)
+    number_parameters = len(low)
+
+    scaled = (data[:, 1:] - low)/width
+    best = scaled[best_first(data, sim_param['maximum'])[0]]
+    fd_step = sim_param.get('fd_step', 0.01)
+    step_size = sim_param.get('step_size', 0.05)
+    line_points = sim_param.get('line_points', 4)
+
+    new_points = np.empty((0, number_parameters))
+    factor = 1.0
+    while len(new_points) == 0 and factor > 1e-6:
+        h = fd_step*factor
+        stencil = best + h*np.concatenate((np.eye(number_parameters), -np.eye(number_parameters)))
+        proposals = [stencil]
+        gradient = local_gradient(scaled, data[:, 0], best, 3*h)
+        if gradient is not None and np.any(gradient != 0):
+            direction = gradient/np.linalg.norm(gradient)
+            if not sim_param['maximum']:
+                direction = -direction
+            lengths = step_size*factor*2.0**np.arange(line_points)
+            proposals.insert(0, best + lengths[:, None]*direction)
+        candidates = low + width*np.concatenate(proposals)
+        new_points = unevaluated(finish_points(candidates, set_param, sim_param), data)
+        factor *= 0.5
+    logging.debug("Gradient step {}: {} new data points".format(step, len(new_points)))
+    return new_points
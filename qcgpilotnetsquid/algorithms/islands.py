@@ -0,0 +1,124 @@
+""" Island model: sub-populations evolving independently and periodically
+exchanging their best individuals (migration)."""
+import logging
+import os
+import numpy as np
+from qcgpilotnetsquid.utils.resultstore import RESULTS_FILE, ResultStore
+from qcgpilotnetsquid.utils.rng import generator
+
+TOPOLOGIES = ("ring", "fully_connected", "random")
+
+
+def neighbours(island, islands, topology="ring", rng=None):
+    """Islands sending migrants to an island.
+
+    Parameters
+    ----------
+    island : int
+        Island receiving the migrants
+    islands : int
+        Number of islands
+    topology : str
+        ring (from the previous island), fully_connected (from all the other
+        islands) or random (from one other island drawn at every migration)
+    rng : numpy.random.Generator
+        Random generator, needed for the random topology
+
+    Returns
+    -------
+    sources : list of int
+    """
+    if topology not in TOPOLOGIES:
+        raise ValueError("migration_topology should be one of {}".format(", ".join(TOPOLOGIES)))
+    others = [k for k in range(islands) if k != island]
+    if not others:
+        return []
+    if topology == "ring":
+        return [(island - 1) % islands]
+    if topology == "fully_connected":
+        return others
+    return [others[rng.integers(len(others))]]
+
+
+def best_individuals(data, number, maximum):
+    """The number best results (fitness followed by the parameter values)."""
+    if len(data) == 0:
+        return []
+    data = np.asarray(data, dtype=float).reshape(len(data), -1)
+    data = data[np.isfinite(data[:, 0])]
+    order = np.argsort(-data[:, 0] if maximum else data[:, 0], kind='stable')
+    return list(data[order[:number]])
+
+
+def island_share(chunks, island, islands):
+    """Data points of an island in the initial data points of the
+    optimization: every islands-th data point, starting at the island, so the
+    islands start from different data points and together evaluate the
+    initial data points once.
+
+    Parameters
+    ----------
+    chunks : iterable of 2D arrays
+        Initial data points in chunks, one per row
+    island : int
+        Island
+    islands : int
+        Number of islands
+
+    Yields
+    ------
+    chunk : 2D array
+        Data points of the island in the chunk
+    """
+    offset = 0
+    for chunk in chunks:
+        chunk = np.asarray(chunk)
+        yield chunk[(island - offset) % islands::islands]
+        offset += len(chunk)
+
+
+def migrants(rundirs, island, sim_param, step):
+    """Individuals migrating to an island before a step.
+
+    Every migration_interval steps, the island receives the migration_size
+    best results of the last step stored by each of its neighbours. The
+    neighbours are not waited for, their last step may be older or still
+    running.
+
+    Parameters
+    ----------
+    rundirs : list of str
+        Run directories of the islands, with their result stores
+    island : int
+        Island receiving the migrants
+    sim_param : dict
+        Simulation information read from the input file: migration_interval,
+        migration_size and migration_topology
+    step : int
+        Optimization step of the island
+
+    Returns
+    -------
+    migrants : list of arrays
+        Results (fitness followed by the parameter values)
+    """
+    interval = sim_param.get('migration_interval', 5)
+    if step == 0 or step % interval != 0:
+        return []
+    rng = generator(sim_param, step, "migration")
+    sources = neighbours(island, len(rundirs), sim_param.get('migration_topology', "ring"), rng)
+    number = sim_param.get('migration_size', 2)
+    individuals = []
+    for source in sources:
+        database = rundirs[source] + RESULTS_FILE
+        if not os.path.exists(database):
+            continue
+        store = ResultStore(database)
+        try:
+            steps = store.steps()
+            if steps:
+                individuals += best_individuals(store.get(steps[-1], cached=False), number, sim_param['maximum'])
+        finally:
+            store.close()
+    logging.debug("{} migrants to island {} at step {}".format(len(individuals), island, step))
+    return individuals
@@ -0,0 +1,65 @@
+""" Parallel Nelder-Mead simplex method."""
+import logging
+import numpy as np
+from qcgpilotnetsquid.algorithms.batch import best_first, finish_points, results_array, unevaluated
+
+# Coefficients of reflection, expansion, contraction and shrink
+REFLECTION = 1.0
+EXPANSION = 2.0
+CONTRACTION = 0.5
+SHRINK = 0.5
+
+
+def nelder_mead(data, set_param, sim_param, step):
+    """Proposes the Nelder-Mead moves of the parallel_vertices worst vertices
+    of the simplex at once.
+
+    The simplex is formed by the number_parameters + 1 best results obtained
+    so far, so accepted moves enter the simplex of the next step without
+    keeping any state. For each of the worst vertices, its reflection,
+    expansion and outside and inside contractions through the centroid of the
+    other vertices are proposed, all evaluated in the same step. If all of
+    them have been evaluated already, the simplex is shrunk towards the best
+    vertex.
+
+    Parameters
+    ----------
+    data : list of arrays
+        Results obtained so far (fitness followed by the parameter values)
+    set_param : :obj:`smartstopos.utils.parameters.set_parameters`
+        Set parameters explored
+    sim_param : dict
+        Simulation information read from the input file: parallel_vertices
+    step : int
+        Optimization step
+
+    Returns
+    -------
+    new_points : 2D array
+        New set of data points to be explored, one per row
+    """
+    data = results_array(data, set_param)
+    number_parameters = data.shape[1] - 1
+    if len(data) < number_parameters + 1:
+        raise ValueError("Nelder-Mead needs at least {} results".format(number_parameters + 1))
+
+    simplex = data[best_first(data, sim_param['maximum'])[:number_parameters + 1], 1:]
+    parallel_vertices = min(sim_param.get('parallel_vertices', number_parameters), number_parameters)
+    worst = simplex[-parallel_vertices:]
+    centroid = np.mean(simplex[:-parallel_vertices], axis=0)
+
+    direction = centroid - worst
+    moves = np.concatenate((centroid + REFLECTION*direction,
+                            centroid + EXPANSION*direction,
+                            centroid + CONTRACTION*direction,
+                            centroid - CONTRACTION*direction))
+    new_points = unevaluated(finish_points(moves, set_param, sim_param), data)
+
+    # all moves known: shrink towards the best vertex until a new simplex is found
+    factor = SHRINK
+    while len(new_points) == 0 and factor > 1e-6:
+        shrunk = simplex[0] + factor*(simplex[1:] - simplex[0])
+        new_points = unevaluated(finish_points(shrunk, set_param, sim_param), data)
+        factor *= SHRINK
+    logging.debug("Nelder-Mead step {}: {} new data points".format(step, len(new_points)))
+    return new_points
@@ -1,10 +1,7 @@
 """ Implmentation of random displacements"""
-import os
-import logging
-import random
-import copy
-from pprint import pformat
 import numpy as np
+from qcgpilotnetsquid.algorithms.bounds import displace, parameter_arrays
+from qcgpilotnetsquid.utils.rng import generator
 
 def random_displacement(data, set_param, sim_param, step):
     """
@@ -22,10 +19,10 @@ def random_displacement(data, set_param, sim_param, step):
 
     Returns
     -------
-    test_points: list of arrays
-        New set of data points to be explored. Each data point is a set of parameter values
+    test_points: 2D array
+        New set of data points to be explored, one per row. Each data point is a set of parameter values
     """
-    if not isinstance(data, list):
+    if not isinstance(data, (list, np.ndarray)):
         raise TypeError("Data must be a list")
     
     #if sim_params['maximum']:
@@ -33,39 +30,16 @@ def random_displacement(data, set_param, sim_param, step):
     #else:
     #    data_sorted = np.array(sorted(data, key=lambda x: x[0]))
 
-    datapoints = []
-    for item in data:
-        datapoints.append(item[1:])
+    data = np.asarray(data, dtype=float).reshape(len(data), -1)
+    datapoints = data[:, 1:]
 
-    random.seed(sim_param['seed'])
-    test_points = []
+    rng = generator(sim_param, step, "displacement")
     number_parameters = sim_param['number_parameters']
+    if datapoints.shape[1] != number_parameters:
+        raise ValueError("The number of parameters is inconsistent")
 
-    if number_parameters == 1:
-        param = set_param.parameters[0]
-        for point in current_points:
-            while True:
-                delta = random.random.uniform(-1,1)*param.scale_factor   
-                testpoint = point + delta
-                if testpoint > param.range[0] and testpoint < param.range[1]:
-                    if param.data_type == 'discrete':
-                        test_points.append(np.array(testpoint, dtype=int))
-                    else:
-                        test_points.append(np.array(testpoint, dtype=float))
-                    break
-
-    elif number_parameters > 1:
-        for point in datapoints: 
-            testpoint = []
-            for i, param in enumerate(set_param.parameters.values()):
-                while True:
-                    delta = random.uniform(-1,1)*param.scale_factor
-                    test = point[i] + delta
-                    if test > param.range[0] and test < param.range[1]:
-                        if param.data_type == 'discrete':
-                            testpoint.append(np.array(test, dtype=int))
-                        else:
-                            testpoint.append(np.array(test, dtype=float))
-                        break
-            test_points.append(np.array(testpoint, dtype=float))
+    # every parameter of every data point is displaced at once
+    scale, low, high, discrete = parameter_arrays(set_param)
+    test_points = displace(rng, datapoints, scale, low, high, sim_param.get('bound_strategy', 'resample'))
+    test_points[:, discrete] = np.trunc(test_points[:, discrete])
     return test_points
@@ -0,0 +1,160 @@
+""" Gaussian process surrogate of the figure of merit, used to screen
+candidate data points before they are simulated."""
+import logging
+import numpy as np
+
+# Hyperparameters tried when fitting (in coordinates scaled to [0, 1])
+LENGTH_SCALES = (0.05, 0.1, 0.2, 0.5, 1.0)
+NOISE_LEVELS = (1e-4, 1e-2, 1e-1)
+
+
+class GaussianProcess:
+    """Gaussian process regression with a squared exponential kernel.
+
+    The parameters are scaled to [0, 1] with their ranges and the figure of
+    merit is standardized. The length scale and the noise level are chosen by
+    maximizing the marginal likelihood over a small grid.
+
+    Parameters
+    ----------
+    set_param : :obj:`smartstopos.utils.parameters.set_parameters`
+        Set parameters explored, their ranges scale the inputs
+    max_points : int
+        Maximum number of results used for fitting (the last ones given), the
+        cost of fitting grows with the cube of this number
+    """
+    def __init__(self, set_param, max_points=500):
+        params = list(set_param.parameters.values())
+        self.low = np.array([param.range[0] for param in params], dtype=float)
+        width = np.array([param.range[1] - param.range[0] for param in params], dtype=float)
+        self.width = np.where(width > 0, width, 1.0)
+        self.max_points = int(max_points)
+        self.length_scale = None
+        self.noise = None
+
+    def _scale(self, points):
+        return (np.asarray(points, dtype=float).reshape(len(points), -1) - self.low)/self.width
+
+    def _kernel(self, a, b):
+        distances = (np.sum(a**2, axis=1)[:, None] + np.sum(b**2, axis=1)[None, :] - 2*a @ b.T)
+        return np.exp(-0.5*np.maximum(distances, 0)/self.length_scale**2)
+
+    def fit(self, points, values):
+        """Fits the surrogate to the results.
+
+        Parameters
+        ----------
+        points : 2D array
+            Parameter values of the evaluated data points, one per row
+        values : array
+            Figure of merit of the data points
+        """
+        points = self._scale(points)[-self.max_points:]
+        values = np.asarray(values, dtype=float)[-self.max_points:]
+        finite = np.isfinite(values)
+        points, values = points[finite], values[finite]
+        if len(values) == 0:
+            raise ValueError("No results to fit the surrogate")
+
+        self.mean = np.mean(values)
+        self.std = np.std(values) if np.std(values) > 0 else 1.0
+        targets = (values - self.mean)/self.std
+
+        best = None
+        for length_scale in LENGTH_SCALES:
+            self.length_scale = length_scale
+            kernel = self._kernel(points, points)
+            for noise in NOISE_LEVELS:
+                try:
+                    cholesky = np.linalg.cholesky(kernel + noise*np.eye(len(points)))
+                except np.linalg.LinAlgError:
+                    continue
+                inverse = np.linalg.inv(cholesky)
+                alpha = inverse.T @ (inverse @ targets)
+                likelihood = -0.5*targets @ alpha - np.sum(np.log(np.diag(cholesky)))
+                if best is None or likelihood > best[0]:
+                    best = (likelihood, length_scale, noise, inverse, alpha)
+        if best is None:
+            raise ValueError("The surrogate could not be fitted")
+        _likelihood, self.length_scale, self.noise, self._inverse, self._alpha = best
+        self._points = points
+        logging.debug("Surrogate fitted on {} results, length scale {}, noise {}"
+                      .format(len(points), self.length_scale, self.noise))
+        return self
+
+    def predict(self, points):
+        """Predicted figure of merit and its standard deviation.
+
+        Parameters
+        ----------
+        points : 2D array
+            Parameter values of the data points, one per row
+
+        Returns
+        -------
+        mean, std : arrays
+        """
+        cross = self._kernel(self._scale(points), self._points)
+        mean = cross @ self._alpha
+        projection = self._inverse @ cross.T
+        variance = np.maximum(1.0 - np.sum(projection**2, axis=0), 0)
+        return self.mean + self.std*mean, self.std*np.sqrt(variance)
+
+
+def acquisition(surrogate, points, maximum, kappa=1.0):
+    """Upper (lower when minimizing) confidence bound of the figure of merit,
+    higher is more promising.
+
+    Parameters
+    ----------
+    surrogate : GaussianProcess
+        Fitted surrogate
+    points : 2D array
+        Candidate data points, one per row
+    maximum : bool
+        True if the figure of merit is maximized
+    kappa : float
+        Weight of the uncertainty (exploration)
+    """
+    mean, std = surrogate.predict(points)
+    if maximum:
+        return mean + kappa*std
+    return -mean + kappa*std
+
+
+def screen(candidates, history, set_param, sim_param, number):
+    """Selects the number most promising candidates according to a surrogate
+    fitted on the results obtained so far.
+
+    Parameters
+    ----------
+    candidates : 2D array
+        Candidate data points, one per row
+    history : list or 2D array
+        Results obtained so far (fitness followed by the parameter values)
+    set_param : :obj:`smartstopos.utils.parameters.set_parameters`
+        Set parameters explored
+    sim_param : dict
+        Simulation information read from the input file (maximum,
+        surrogate_kappa, surrogate_max_points)
+    number : int
+        Number of candidates to keep
+
+    Returns
+    -------
+    selected : 2D array
+        The selected candidates, most promising first
+    """
+    candidates = np.asarray(candidates, dtype=float).reshape(len(candidates), -1)
+    if number >= len(candidates):
+        return candidates
+    if number <= 0:
+        return candidates[:0]
+    history = np.asarray(history, dtype=float).reshape(len(history), -1)
+    surrogate = GaussianProcess(set_param, sim_param.get('surrogate_max_points', 500))
+    surrogate.fit(history[:, 1:], history[:, 0])
+    score = acquisition(surrogate, candidates, sim_param['maximum'], sim_param.get('surrogate_kappa', 1.0))
+    selected = np.argpartition(-score, number - 1)[:number]
+    selected = selected[np.argsort(-score[selected], kind='stable')]
+    logging.debug("{} of {} candidates selected by the surrogate".format(number, len(candidates)))
+    return candidates[selected]
@@ -0,0 +1,79 @@
+"""
+Streaming aggregation of the results of the jobs of an optimization step into
+the csvfile of the step.
+
+Every call only handles the result files that appeared since the previous
+call: each file is first moved (atomically) to the archive directory, so it is
+collected exactly once even when the aggregation runs in several processes at
+the same time (e.g. the workflow while the jobs run and the analysis job at
+the end), and then appended line by line to the csvfile of the step.
+"""
+import fcntl
+import logging
+import os
+
+
+def is_complete(filename):
+    """True if the file is not empty and ends with a newline, i.e. the job
+    has finished writing it."""
+    try:
+        with open(filename, "rb") as resultfile:
+            resultfile.seek(0, os.SEEK_END)
+            if resultfile.tell() == 0:
+                return False
+            resultfile.seek(-1, os.SEEK_END)
+            return resultfile.read(1) == b"\n"
+    except FileNotFoundError:
+        return False
+
+
+def aggregate_results(workdir, csv_output_filename, archive="output", file_extension="csv"):
+    """Append the results of the new result files in workdir to the csvfile of
+    the step and move the result files to the archive directory.
+
+    Parameters
+    ----------
+    workdir : str
+        Directory where the jobs of the step write their result files
+    csv_output_filename : str
+        csvfile of the step (relative to workdir), results are appended
+    archive : str
+        Directory (relative to workdir) where the collected result files are moved
+    file_extension : str
+        Extension of the result files
+
+    Returns
+    -------
+    collected : int
+        Number of result files collected
+    """
+    archivedir = os.path.join(workdir, archive)
+    os.makedirs(archivedir, exist_ok=True)
+    outputpath = os.path.join(workdir, csv_output_filename)
+
+    collected = 0
+    with open(outputpath, "a") as output:
+        for entry in os.scandir(workdir):
+            if not entry.is_file() or not entry.name.endswith("." + file_extension):
+                continue
+            if entry.name == os.path.basename(csv_output_filename) or not is_complete(entry.path):
+                continue
+            archived = os.path.join(archivedir, entry.name)
+            try:
+                os.rename(entry.path, archived)
+            except FileNotFoundError:
+                # collected meanwhile by another process
+                continue
+
+            fcntl.flock(output, fcntl.LOCK_EX)
+            try:
+                with open(archived) as resultfile:
+                    for line in resultfile:
+                        if line.strip():
+                            output.write(line.rstrip("\r\n") + "\n")
+                output.flush()
+            finally:
+                fcntl.flock(output, fcntl.LOCK_UN)
+            collected += 1
+    logging.debug("{} result files collected in {}".format(collected, csv_output_filename))
+    return collected
@@ -0,0 +1,207 @@
+"""
+Evaluates a chunk of data points in a single process (runmode module).
+
+The program is imported once as a module and its function is called for every
+data point of the chunk, avoiding the start up of one python process (and the
+imports of the program) per data point.
+
+Usage:
+    python3 -m qcgpilotnetsquid.utils.batchworker --program wobbly_function.py --function function
+        --pointsfile points_0_0 --outputfile chunk_0_0.csv --variables x y
+
+With --database job_results.db --step 0 --job 0 the results are inserted in the
+result database of the optimization (jobs numbered from --job on) instead of
+written to the outputfile.
+
+The step (--step) and the counter value of the data point (--job and the
+position in the chunk) are passed as arguments step and job to a function
+having them.
+
+The programfixargs and programvariableargs of the input file are given with
+--fixargs and --variableargs (key:value) and passed as str keyword arguments,
+the value of a variable argument followed by the step and the counter value of
+the data point (as on the command line of the other runmodes).
+
+With --seed, the data points of the chunk get independent seeds derived from
+it: passed as keyword argument seed if the function accepts it, otherwise the
+random generators of numpy and random are seeded before every data point.
+"""
+import csv
+import importlib.util
+import inspect
+import logging
+import os
+import random
+from argparse import ArgumentParser
+import numpy as np
+from qcgpilotnetsquid.utils.resultstore import ResultStore
+
+
+def load_program(program):
+    """Imports the program as a module.
+
+    Parameters
+    ----------
+    program : str
+        Path to the python file of the program
+
+    Returns
+    -------
+    module : module
+        The imported program. Code under `if __name__ == "__main__"` is not run.
+    """
+    name = os.path.splitext(os.path.basename(program))[0]
+    spec = importlib.util.spec_from_file_location(name, program)
+    if spec is None:
+        raise ImportError("Program {} can not be imported".format(program))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def point_seeds(seed, number_points):
+    """Independent seeds of the data points of a chunk, derived from the
+    seed of the job."""
+    return [int(value) for value in np.random.SeedSequence(seed).generate_state(number_points)]
+
+
+def function_parameters(function):
+    """Parameters of the signature of the function, empty if not known."""
+    try:
+        return inspect.signature(function).parameters
+    except (TypeError, ValueError):
+        return {}
+
+
+def accepts_seed(function):
+    """True if the function has a seed argument."""
+    parameters = function_parameters(function)
+    return 'seed' in parameters or any(p.kind == p.VAR_KEYWORD for p in parameters.values())
+
+
+def parse_args_list(items):
+    """Pairs (key, value) of a list of key:value items."""
+    pairs = []
+    for item in items:
+        key, value = item.split(":")
+        pairs.append((key, value))
+    return pairs
+
+
+def evaluate_chunk(function, variables, points, discrete=(), seed=None, fixargs=(), variableargs=(),
+                   step=0, job=0):
+    """Evaluates the function for all the data points of the chunk.
+
+    Parameters
+    ----------
+    function : callable
+        Function of the program, called with the variables as keyword arguments
+    variables : list of str
+        Names of the variables, same order as the columns of points
+    points : 2D array
+        Data points to evaluate, one per row
+    discrete : list of str
+        Variables passed to the function as int
+    seed : int, optional
+        Seed of the job, see `point_seeds`
+    fixargs : list of (str, str)
+        Keyword arguments passed to the function for all the data points
+    variableargs : list of (str, str)
+        Keyword arguments whose value is followed by the step and the counter
+        value of the data point
+    step : int
+        Optimization step, passed as argument step if the function has one
+    job : int
+        Counter value of the first data point of the chunk, the counter value
+        of the data point is passed as argument job if the function has one
+
+    Returns
+    -------
+    rows : list of lists
+        Output of the function followed by the values of the variables
+        (same format as the csvfiles of the commandline runmode)
+    """
+    rows = []
+    seeds = None if seed is None else point_seeds(seed, len(points))
+    pass_seed = seeds is not None and accepts_seed(function)
+    parameters = function_parameters(function)
+    for i, point in enumerate(points):
+        kwargs = {}
+        for name, value in zip(variables, point):
+            kwargs[name] = int(value) if name in discrete else float(value)
+        arguments = dict(fixargs)
+        for key, value in variableargs:
+            arguments[key] = value + str(step) + str(job + i)
+        if 'step' in parameters:
+            arguments['step'] = step
+        if 'job' in parameters:
+            arguments['job'] = job + i
+        arguments.update(kwargs)
+        if pass_seed:
+            output = function(seed=seeds[i], **arguments)
+        else:
+            if seeds is not None:
+                np.random.seed(seeds[i])
+                random.seed(seeds[i])
+            output = function(**arguments)
+        rows.append(list(np.atleast_1d(output)) + [kwargs[name] for name in variables])
+    return rows
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument('--program', required=True, type=str,
+                        help='Python file with the function to evaluate')
+    parser.add_argument('--function', required=True, type=str,
+                        help='Name of the function to evaluate')
+    parser.add_argument('--pointsfile', required=True, type=str,
+                        help='File with the data points of the chunk, one per line')
+    parser.add_argument('--outputfile', required=False, type=str,
+                        help='csvfile where the results are written')
+    parser.add_argument('--variables', required=True, nargs='+', type=str,
+                        help='Names of the variables, same order as in the pointsfile')
+    parser.add_argument('--discrete', required=False, nargs='*', default=[], type=str,
+                        help='Variables that are passed as int')
+    parser.add_argument('--database', required=False, type=str,
+                        help='Result database where the results are inserted instead')
+    parser.add_argument('--step', required=False, type=int, default=0,
+                        help='Optimization step, used with --database and --variableargs and passed to the '
+                             'function')
+    parser.add_argument('--job', required=False, type=int, default=0,
+                        help='Counter value of the first data point of the chunk, used with --database '
+                             'and --variableargs')
+    parser.add_argument('--fixargs', required=False, nargs='*', default=[], type=str,
+                        help='Fixed keyword arguments of the function, key:value')
+    parser.add_argument('--variableargs', required=False, nargs='*', default=[], type=str,
+                        help='Keyword arguments of the function whose value is followed by the step and the '
+                             'counter value of the data point, key:value')
+    parser.add_argument('--seed', required=False, type=int,
+                        help='Seed of the random stream of the job')
+    args = parser.parse_args()
+    if args.outputfile is None and args.database is None:
+        parser.error("--outputfile or --database is required")
+
+    program = load_program(args.program)
+    function = getattr(program, args.function)
+    points = np.loadtxt(args.pointsfile, ndmin=2)
+    rows = evaluate_chunk(function, args.variables, points, args.discrete, args.seed,
+                          parse_args_list(args.fixargs), parse_args_list(args.variableargs), args.step, args.job)
+
+    if args.database is not None:
+        store = ResultStore(args.database)
+        store.insert(args.step, args.job, rows)
+        store.close()
+        logging.debug("{} data points evaluated".format(len(rows)))
+        return
+
+    # write to a temporary file first, the csvfile only appears when it is complete
+    tmpfile = args.outputfile + ".tmp"
+    with open(tmpfile, mode='w') as csv_file:
+        csv_writer = csv.writer(csv_file, delimiter=',')
+        csv_writer.writerows(rows)
+    os.replace(tmpfile, args.outputfile)
+    logging.debug("{} data points evaluated".format(len(rows)))
+
+
+if __name__ == "__main__":
+    main()
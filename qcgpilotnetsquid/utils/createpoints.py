@@ -9,13 +9,21 @@ import numpy as np
 import pandas as pd
 import pprint
 from argparse import ArgumentParser
-from qcgpilotnetsquid.algorithms.ga import genetic_algorithm 
-from qcgpilotnetsquid.algorithms.randomdisplacement import random_displacement
-from qcgpilotnetsquid.utils.readcsv import readcsvfiles
-from qcgpilotnetsquid.utils.readinput import read_input_json
+from qcgpilotnetsquid.algorithms import ALL_STEPS, get_algorithm
+from qcgpilotnetsquid.algorithms.bounds import BOUND_STRATEGIES
+from qcgpilotnetsquid.algorithms.islands import island_share, migrants
+from qcgpilotnetsquid.utils.readcsv import read_job_results, readcsvfiles
+from qcgpilotnetsquid.utils.resultstore import JOB_RESULTS_FILE, ResultStore
 from qcgpilotnetsquid.utils.makedatapoints import make_data_points
 from qcgpilotnetsquid.utils.makedatapoints_random import make_init_datapoints_random
+from qcgpilotnetsquid.utils.makedatapoints_quasirandom import QUASIRANDOM_DESIGNS, make_init_datapoints_quasirandom
 from qcgpilotnetsquid.utils.parserconstraints import evaluate_constraints
+from qcgpilotnetsquid.utils.parserconstraints import parse_constraints
+from qcgpilotnetsquid.utils.rng import generator, random_streams
+
+# Maximum number of grid points held in memory at once
+GRID_CHUNK_SIZE = 10000
+
 
 def str2bool(v):
     return v.lower() in ("True", "yes", "true", "t", "1")
@@ -26,46 +34,141 @@ def run_param_to_sim_param(run_param, opt):
     sim_parameters['number_parameters'] = int(run_param['number_parameters'])
     sim_parameters['seed'] = float(run_param['seed'])
     if 'constraints' in run_param.keys():
-        sim_parameters['constraints'] = compile(run_param['constraints'], 'constraints', 'eval')
+        sim_parameters['constraints'] = parse_constraints(run_param['constraints'])
+    if 'bound_strategy' in run_param.keys():
+        if run_param['bound_strategy'] not in BOUND_STRATEGIES:
+            raise ValueError("bound_strategy should be one of {}".format(", ".join(BOUND_STRATEGIES)))
+        sim_parameters['bound_strategy'] = run_param['bound_strategy']
    
     if run_param['type'] == "optimization":
         sim_parameters['run_type']='optimization'
         sim_parameters['algorithm'] = run_param['algorithm'][opt]['name']
         sim_parameters['opt_steps'] = int(run_param['algorithm'][opt]['steps'])
         sim_parameters['maximum'] = str2bool(run_param['maximum'])
-        if sim_parameters['algorithm'] == "GA":
-            sim_parameters['proba_mutation'] = float(run_param['algorithm'][opt]['parameters']['probability_mutation'])
-            sim_parameters['proba_crossover']= float(run_param['algorithm'][opt]['parameters']['probability_crossover'])
-            sim_parameters['number_best_candidates']=int(run_param['algorithm'][opt]['parameters']['number_best_candidates'])
-            sim_parameters['population_size']=int(run_param['algorithm'][opt]['parameters']['population_size'])
-
-            # optimization algorithm
-            if run_param['algorithm'][opt]['parameters']['order']:
-                order = run_param['algorithm'][opt]['parameters']['order']
-                if order == 'c':
-                    sim_parameters['c'] = True
-                elif order == 'm':
-                    sim_parameters['m'] = True
-                elif order == 'cr':
-                    sim_parameters['c'] = True
-                    sim_parameters['roulette'] = True
-                elif order == 'mr':
-                    sim_parameters['m'] = True
-                    sim_parameters['roulette'] = True
-                else:
-                    sim_parameters['c'] = True
-                    if 'roulette' not in sim_parameters:
-                        sim_parameters['roulette'] = False
+        algorithm = get_algorithm(sim_parameters['algorithm'])
+        sim_parameters.update(algorithm.parse_parameters(run_param['algorithm'][opt].get('parameters', {})))
         sim_parameters['distribution']= run_param['distribution']
         
-    elif 'single' in run_param['type'].keys(): 
+    elif run_param['type'] == "single":
         sim_parameters['run_type']='single'
+        sim_parameters['distribution'] = run_param.get('distribution', 'uniform')
+        if 'maximum' in run_param.keys():
+            sim_parameters['maximum'] = str2bool(run_param['maximum'])
+        sweep = run_param.get('sweep', 'grid')
+        if sweep == "adaptive":
+            if sim_parameters['distribution'] != 'uniform':
+                raise ValueError("The adaptive sweep refines the grid of the uniform distribution")
+            sim_parameters['algorithm'] = 'adaptive_grid'
+            sim_parameters['opt_steps'] = int(run_param.get('levels', 3)) + 1
+            algorithm = get_algorithm(sim_parameters['algorithm'])
+            sim_parameters.update(algorithm.parse_parameters(run_param.get('parameters', {})))
+        elif sweep != "grid":
+            raise ValueError("sweep should be grid or adaptive")
     else:
         raise ValueError("Run type error. Please chose between single or optimization")
     return sim_parameters
 
 
-def create_datapoints(simparameters, step, opt):
+def load_results(simparameters, step, depth, data=None):
+    """Results of the previous steps needed by an algorithm.
+    Parameters
+    ----------
+    simparameters : class InputParam()
+        Simulation information read from input file
+    step: int
+        Current optimization step
+    depth: int or None
+        Number of previous steps, None (ALL_STEPS) for all of them
+    data: list of arrays, optional
+        Results of the previous step, see `create_datapoints`
+
+    Returns
+    -------
+    results : list of arrays
+        Results (fitness + parameters) of the previous steps, oldest first
+    """
+    if depth is ALL_STEPS or depth > step:
+        depth = max(step, 1)
+    if data is None:
+        totaldata = readcsvfiles(simparameters, step, depth, subsample=None)
+    else:
+        # the older steps may not be analysed yet (pipelined workflow)
+        totaldata = [available_results(simparameters, s) for s in range(step - depth, step - 1)] + [data]
+    return [row for stepdata in totaldata for row in stepdata]
+
+
+def available_results(simparameters, step):
+    """Results of a step found so far: in the result store if the step is
+    stored, otherwise the results inserted by the jobs already finished in the
+    job result database and their result files.
+    Parameters
+    ----------
+    simparameters : class InputParam()
+        Simulation information read from input file
+    step: int
+        Optimization step
+
+    Returns
+    -------
+    results : list of arrays
+        Results (fitness + parameters), empty if no job has finished
+    """
+    store = simparameters.resultstore
+    if store is not None and store.has_step(step):
+        return store.get(step, cached=False)
+    results = []
+    database = simparameters.rundir + JOB_RESULTS_FILE
+    if os.path.exists(database):
+        jobstore = ResultStore(database)
+        try:
+            results += jobstore.get(step, cached=False)
+        finally:
+            jobstore.close()
+    workdir = simparameters.rundir + "opt_step_" + str(step) + "/"
+    if os.path.isdir(workdir):
+        results += read_job_results(workdir, simparameters.csvprefix)
+    return results
+
+
+def pad_results(simparameters, step, opt, data, size):
+    """Results of a partially finished step completed up to the size of the
+    population by resampling them (pipelined workflow), so the algorithms
+    creating one data point per result of the previous step (history of one
+    step, e.g. random) keep the size of the population. The results of the
+    other algorithms are returned unchanged.
+    Parameters
+    ----------
+    simparameters : class InputParam()
+        Simulation information read from input file
+    step: int
+        Optimization step of the new data points
+    opt: int
+        When many optimization algorithms, the number associated to the
+optimization
+    data: list of arrays
+        Results (fitness + parameters) found so far
+    size: int
+        Size of the population
+
+    Returns
+    -------
+    data : list of arrays
+        Results, resampled with replacement up to size
+    """
+    if len(data) == 0 or len(data) >= size:
+        return data
+    sim_param = run_param_to_sim_param(simparameters.run, opt)
+    algorithm = get_algorithm(simparameters.algorithm)
+    if algorithm.history_depth(sim_param) != 1 or algorithm.context_arguments(sim_param):
+        return data
+    sim_param['random_streams'] = random_streams(simparameters)
+    rng = generator(sim_param, step, "padding")
+    extra = rng.integers(len(data), size=size - len(data))
+    logging.debug("{} results resampled to a population of {}".format(len(data), size))
+    return list(data) + [data[i] for i in extra]
+
+
+def create_datapoints(simparameters, step, opt, data=None):
     """Create data points to explore, either based on input file or using
     previous csvfiles
     Parameters
@@ -77,6 +180,10 @@ def create_datapoints(simparameters, step, opt):
     opt: int
         When many optimization algorithms, the number associated to the
 optimization
+    data: list of arrays, optional
+        Results (fitness + parameters) to create the new data points from.
+        If given, the csvfiles of the previous steps are not read, e.g. when
+        only part of the previous step has finished (pipelined workflow)
 
     Returns
     -------
@@ -84,71 +191,133 @@ optimization
         New set of data points to be explored. Each data point is a set of
         parameters values of length = number parameters.
     """
+    newdatapoints = []
+    for chunk in iter_datapoints(simparameters, step, opt, data=data):
+        newdatapoints.extend(chunk)
+    return newdatapoints
+
+
+def iter_datapoints(simparameters, step, opt, data=None, chunk_size=GRID_CHUNK_SIZE):
+    """Create data points to explore in chunks, either based on input file or using
+    previous csvfiles. Each chunk is written to the param_set file of the step
+    before it is yielded, so the data points can be submitted while the rest is
+    being created; an initial Cartesian grid is never fully held in memory.
+    Parameters
+    ----------
+    simparameters : class InputParam()
+        Simulation information read from input file
+    step: int
+        Previous optimization step
+    opt: int
+        When many optimization algorithms, the number associated to the
+optimization
+    data: list of arrays, optional
+        Results (fitness + parameters) to create the new data points from,
+        see `create_datapoints`
+    chunk_size: int
+        Maximum number of data points per chunk of the initial grid
+
+    Yields
+    ------
+    chunk : list or array
+        Chunk of new data points to be explored. Each data point is a set of
+        parameters values of length = number parameters.
+    """
     # current fix for GA implementation
     sim_param = run_param_to_sim_param(simparameters.run, opt)
+    if simparameters.population_size is not None and 'population_size' in sim_param:
+        # population size adapted by the workflow to the allocation
+        sim_param['population_size'] = simparameters.population_size
     set_param = simparameters.param
+    # independent random streams of the optimization (and island)
+    sim_param['random_streams'] = random_streams(simparameters)
 
-    backsteps = 0 
     if step == 0 and simparameters.restart == False:
         print("Simulation not restarted from a previous csvfile, creating initial data points based on input file information")
         if sim_param['distribution'] == 'fully_random':
-            newdatapoints  = make_data_points_random(sim_param, set_param)
+            chunks = [make_init_datapoints_random(sim_param, set_param)]
+        elif sim_param['distribution'] in QUASIRANDOM_DESIGNS:
+            chunks = [make_init_datapoints_quasirandom(sim_param, set_param)]
         else:
-            make_data_points(set_param)
-            newdatapoints = create_init_datapoints(sim_param, set_param)
-
-    # create data points based on csvfile(s)
-    # backsteps: how many previous opt steps csv_files should be read,
-    elif step == 0 and simparameters.restartcsvfile == True:
-        if simparameters.restartcsvfile is None:
-            raise NameError('You need to give a path to a directory containing \
-                           a csv file to restart from')
-        else:
-            print("Simulation restarted from: {}, reading\
-                 csvfile".format(restartcsvfile))
-
-    elif step == 1:
-        backsteps = 1
-
-    elif step == 2:
-        backsteps = 2
-
-    elif step > 2:
-        backsteps = 3
-
-    totaldata = readcsvfiles(simparameters, step, backsteps, subsample=None)
-
-    # create data points based on information read from csvfiles
-    algorithm = simparameters.algorithm
-    if step > 0 or simparameters.restart == True:
-        if algorithm == 'random':
-            # todo random check req.
-            # algorithm self check?
-            newdatapoints = random_displacement(totaldata[0], set_param, sim_param, step)
-        elif algorithm == 'GA':
-            # todo GA check req.
-            print("Calling {} algorithm...".format(algorithm))
-            newdatapoints = genetic_algorithm(totaldata[0], set_param, sim_param, step)
-        elif algorithm == 'Gaussians':
-            newdatapoints = gaussian(totaldata, set_param, sim_param, step)
-        elif algorithm == 'NM':
-            newdatapoints = NelderMead(totaldata, set_param, sim_param, step)
-        elif algorithm == 'gradient':
-            newdatapoints = GradientBased(totaldata, set_param, sim_param, step)
-        else:
-            raise TypeError("no algorithm defined")
+            make_data_points(set_param, rng=generator(sim_param, 0, "initial"))
+            chunks = iter_init_datapoints(sim_param, set_param, chunk_size)
+        if simparameters.island is not None:
+            # the islands share the initial data points
+            chunks = island_share(chunks, simparameters.island, len(simparameters.island_rundirs))
+
+    elif step == 0 and simparameters.restartcsvfile is None:
+        raise NameError('You need to give a path to a directory containing \
+                       a csv file to restart from')
+
+    # create data points based on the results of the previous steps, as many
+    # as the algorithm needs
+    else:
+        algorithm = get_algorithm(simparameters.algorithm)
+        results = load_results(simparameters, step, algorithm.history_depth(sim_param), data)
+        if simparameters.island is not None:
+            results += migrants(simparameters.island_rundirs, simparameters.island, sim_param, step)
+        context = {}
+        for name in algorithm.context_arguments(sim_param):
+            if name == "history":
+                context[name] = load_results(simparameters, step, ALL_STEPS, data)
+            elif name == "statedir":
+                context[name] = simparameters.rundir
+        print("Calling {} algorithm...".format(algorithm.name))
+        chunks = [algorithm(results, set_param, sim_param, step, **context)]
 
     # Create a new param_set_optstep file 
     with open(simparameters.rundir + "param_set_" + str(step), "w") as paramfile:
-        for point in newdatapoints:
-            for item in point:
-                paramfile.write("{} ".format(item))
-            paramfile.write("\n")
-    return newdatapoints
+        for chunk in chunks:
+            for point in chunk:
+                for item in point:
+                    paramfile.write("{} ".format(item))
+                paramfile.write("\n")
+            paramfile.flush()
+            yield chunk
 
 
-def create_init_datapoints(sim_param, set_param):
-    """Creates initial data points.
+def iter_grid_chunks(set_param, chunk_size=GRID_CHUNK_SIZE):
+    """Generates the Cartesian product of the data points of all parameters in
+    chunks, in the same order as itertools.product.
+
+    Parameters
+    ----------
+    set_param : smartstopos.utils.parameters.SetParameters
+        Set of parameters with their data points.
+    chunk_size : int
+        Maximum number of grid points per chunk.
+
+    Yields
+    ------
+    chunk : 2D array
+        Grid points, one per row. If any parameter is discrete the array has
+        dtype object, with python int for the discrete and float for the
+        continuous parameters.
+    """
+    axes = []
+    discrete = False
+    for param in set_param.parameters.values():
+        if param.data_type == "discrete":
+            axes.append(np.asarray(param.data_points, dtype=int))
+            discrete = True
+        else:
+            axes.append(np.asarray(param.data_points, dtype=float))
+    shape = tuple(len(axis) for axis in axes)
+    total = int(np.prod(shape, dtype=np.int64))
+
+    for start in range(0, total, chunk_size):
+        indices = np.unravel_index(np.arange(start, min(total, start + chunk_size)), shape)
+        if discrete:
+            chunk = np.empty((len(indices[0]), len(axes)), dtype=object)
+            for p, (axis, index) in enumerate(zip(axes, indices)):
+                chunk[:, p] = axis[index].tolist()
+        else:
+            chunk = np.column_stack([axis[index] for axis, index in zip(axes, indices)])
+        yield chunk
+
+
+def iter_init_datapoints(sim_param, set_param, chunk_size=GRID_CHUNK_SIZE):
+    """Creates initial data points (Cartesian grid) in chunks.
 
     Parameters
     ----------
@@ -157,27 +326,43 @@ def create_init_datapoints(sim_param, set_param):
     set_param : smartstopos.utils.parameters.SetParameters
         Set of parameters to be explored during the simulations. Data points of
         the simulation are created from these parameters.
+    chunk_size : int
+        Maximum number of data points per chunk.
+
+    Yields
+    ------
+    chunk : 2D array
+        Data points, one per row, see `iter_grid_chunks`
     """
-    all_data_points = []
     for _key, param in set_param.parameters.items():
         if param.data_type == "discrete":
             param.data_points = list(map(int, param.data_points))
-            all_data_points.append(param.data_points)
-        elif param.data_type == 'continuous':
-            all_data_points.append(param.data_points)
-        else:
+        elif param.data_type != 'continuous':
             raise ValueError("data type of one of the parameters does not exist")
-    points = []
-    for item in itertools.product(*all_data_points):
-        points.append(item)
+
     if 'constraints' in sim_param.keys():
         print("Checking constraints...")
-        new_points = evaluate_constraints(sim_param, set_param, points)
-        if len(new_points) != len(points):
-            raise ValueError("Some global constraints are not satisfied, check your initial parameter settings")
-            
-    else:
-        new_points = points
+    for chunk in iter_grid_chunks(set_param, chunk_size):
+        if 'constraints' in sim_param.keys():
+            if len(evaluate_constraints(sim_param, set_param, chunk)) != len(chunk):
+                raise ValueError("Some global constraints are not satisfied, check your initial parameter settings")
+        yield chunk
+
+
+def create_init_datapoints(sim_param, set_param):
+    """Creates initial data points.
+
+    Parameters
+    ----------
+    sim_params : dict
+        Dictionary with the simulation details read from the input file.
+    set_param : smartstopos.utils.parameters.SetParameters
+        Set of parameters to be explored during the simulations. Data points of
+        the simulation are created from these parameters.
+    """
+    new_points = []
+    for chunk in iter_init_datapoints(sim_param, set_param):
+        new_points.extend(chunk)
     return new_points
 
 #def main():
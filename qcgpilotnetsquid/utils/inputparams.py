@@ -46,6 +46,11 @@ job"""
         self.restartcsvfile = None
         self.restart = False
         self.csvfiledir = None
+        self.resultstore = None
+        self.population_size = None
+        self.chunk_size = None
+        self.island = None
+        self.island_rundirs = None
         self.check()
         
         
@@ -78,7 +83,7 @@ job"""
         if self.run["type"] == "optimization":
             if self.run["maximum"] not in self.run.keys():
                 ValueError("no maximum defined")
-        if self.general["runmode"] not in ("commandline", "files"):
+        if self.general["runmode"] not in ("commandline", "files", "module"):
             ValueError("no run mode defined")
         if self.general["runmode"] == "files":
             if "configfile" and "paramfile" not in self.general.keys():
@@ -122,4 +127,16 @@ class InputParamsSingle(InputParams):
     """ Input parameters needed to run a nlblueprint single run workflow"""
     def __init__(self, data, projectdir):
         InputParams.__init__(self, data, projectdir)
+        # the grid is evaluated in one step, the adaptive sweep refines it
+        # once per level
+        self.algorithm = None
+        self.optsteps = 1
+        if self.run.get("sweep", "grid") == "adaptive":
+            self.algorithm = "adaptive_grid"
+            self.optsteps = int(self.run.get("levels", 3)) + 1
+
+    def print_info_algorithm(self):
+        print("\n---------------------------")
+        print("Starting single run\nsweep: {},\nsteps: {}".format(
+              self.run.get("sweep", "grid"), self.optsteps))
 
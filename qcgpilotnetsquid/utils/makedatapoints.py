@@ -1,18 +1,22 @@
 """Defines functions to create parameters data points based on number points and distribution selected."""
 import numpy as np
 import math
-import random
 import sys
 
 
-def make_data_points(set_param):
+def make_data_points(set_param, rng=None):
     """Based on the type of distribution, parameter type, range and number of points it
     creates an intitial set of data points to be explored.
 
     Parameters
     ----------
     set_param : smartstopos.utils.SetParameters object
+    rng : numpy.random.Generator, optional
+        Random generator of the random and normal distributions, see
+        `qcgpilotnetsquid.utils.rng`
     """
+    if rng is None:
+        rng = np.random.default_rng()
     for param in set_param.parameters.values():
         del param.data_points[:]
 
@@ -38,19 +42,19 @@ def make_data_points(set_param):
 
             elif param.distribution == 'random':
                 for i in range(0, param.number_points):
-                    value = random.random()*(param.range[1] - param.range[0]) + param.range[0]
+                    value = rng.random()*(param.range[1] - param.range[0]) + param.range[0]
                     param.data_points.append(value)
 
             # any distribution can be added like this
             elif param.distribution == 'normal':
-                mean = 0.5*(param.range[1] - param.range[0])
+                mean = param.range[0] + 0.5*(param.range[1] - param.range[0])
                 size = (param.range[1] - param.range[0])/5.0
                 # print ("mean normal: {}".format(mean))
                 # print ("variance normal: {}".format(size))
                 for i in range(0, param.number_points):
                     while True:
-                        value = float(np.random.normal(loc=mean, scale=size, size=1))
-                        if value > param.range[1] or value < param.range[0]:
+                        value = float(rng.normal(loc=mean, scale=size))
+                        if param.range[0] <= value <= param.range[1]:
                             break
                     param.data_points.append(value)
             else:
@@ -79,19 +83,19 @@ def make_data_points(set_param):
                         param.data_points.append(param.range[0])
             elif param.distribution == 'random':
                 for i in range(0, param.number_points):
-                    value = int(random.random()*(param.range[1] - param.range[0]) + param.range[0])
+                    value = int(rng.random()*(param.range[1] - param.range[0]) + param.range[0])
                     param.data_points.append(value)
 
             # any distribution can be added like this
             elif param.distribution == 'normal':
-                mean = 0.5*(param.range[1] - param.range[0])
+                mean = param.range[0] + 0.5*(param.range[1] - param.range[0])
                 size = (param.range[1] - param.range[0])/5.0
                 # print("mean normal: {}".format(mean))
                 # print("variance normal: {}".format(size))
                 for i in range(0, param.number_points):
                     while True:
-                        value = int(np.random.normal(loc=mean, scale=size, size=1))
-                        if value < param.range[1] or value > param.range[0]:
+                        value = int(rng.normal(loc=mean, scale=size))
+                        if param.range[0] <= value <= param.range[1]:
                             break
                     param.data_points.append(value)
             else:
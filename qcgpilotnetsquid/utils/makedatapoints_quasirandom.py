@@ -0,0 +1,236 @@
+"""
+Defines functions to create space-filling initial data points: Sobol and
+scrambled Halton sequences and Latin hypercube designs
+"""
+import logging
+import numpy as np
+from qcgpilotnetsquid.utils.parserconstraints import evaluate_constraints
+from qcgpilotnetsquid.utils.rng import generator
+
+QUASIRANDOM_DESIGNS = ("sobol", "halton", "lhs")
+
+# Direction numbers of Joe and Kuo (new-joe-kuo-6.21201) of dimensions 2-21:
+# degree s and coefficients a of the primitive polynomial, initial m_1..m_s
+SOBOL_DIRECTIONS = (
+    (1, 0, (1,)),
+    (2, 1, (1, 3)),
+    (3, 1, (1, 3, 1)),
+    (3, 2, (1, 1, 1)),
+    (4, 1, (1, 1, 3, 3)),
+    (4, 4, (1, 3, 5, 13)),
+    (5, 2, (1, 1, 5, 5, 17)),
+    (5, 4, (1, 1, 5, 5, 5)),
+    (5, 7, (1, 1, 7, 11, 19)),
+    (5, 11, (1, 1, 5, 1, 1)),
+    (5, 13, (1, 1, 1, 3, 11)),
+    (5, 14, (1, 3, 5, 5, 31)),
+    (6, 1, (1, 3, 3, 9, 7, 49)),
+    (6, 13, (1, 1, 1, 15, 21, 21)),
+    (6, 16, (1, 3, 1, 13, 27, 49)),
+    (6, 19, (1, 1, 1, 15, 7, 5)),
+    (6, 22, (1, 3, 1, 15, 13, 25)),
+    (6, 25, (1, 1, 5, 5, 19, 61)),
+    (7, 1, (1, 3, 7, 11, 23, 15, 103)),
+    (7, 4, (1, 3, 7, 13, 13, 15, 69)),
+)
+SOBOL_BITS = 32
+HALTON_PRIMES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41, 43, 47, 53, 59, 61, 67, 71, 73,
+                 79, 83, 89, 97, 101, 103, 107, 109, 113)
+# Tries to find enough data points satisfying the constraints
+MAX_ROUNDS = 1000
+
+
+def sobol_directions(dimensions):
+    """Direction numbers V (scaled to SOBOL_BITS bits) of the first dimensions
+    of the Sobol sequence, one row per dimension."""
+    if dimensions > len(SOBOL_DIRECTIONS) + 1:
+        raise ValueError("Sobol sequences are defined up to {} parameters".format(len(SOBOL_DIRECTIONS) + 1))
+    directions = np.zeros((dimensions, SOBOL_BITS), dtype=np.uint64)
+    # first dimension: van der Corput sequence in base 2
+    directions[0] = [1 << (SOBOL_BITS - 1 - i) for i in range(SOBOL_BITS)]
+    for d in range(1, dimensions):
+        s, a, m = SOBOL_DIRECTIONS[d - 1]
+        v = [m[i] << (SOBOL_BITS - 1 - i) for i in range(s)]
+        for i in range(s, SOBOL_BITS):
+            value = v[i - s] ^ (v[i - s] >> s)
+            for k in range(1, s):
+                if (a >> (s - 1 - k)) & 1:
+                    value ^= v[i - k]
+            v.append(value)
+        directions[d] = v
+    return directions
+
+
+def sobol(number_points, dimensions, rng=None, skip=0):
+    """Points of the Sobol sequence in [0, 1)^dimensions, randomized by a
+    digital shift if rng is given.
+
+    Parameters
+    ----------
+    number_points : int
+        Number of points
+    dimensions : int
+        Number of dimensions, at most 21
+    rng : numpy.random.Generator, optional
+        Random generator of the digital shift
+    skip : int
+        Index of the first point in the sequence
+
+    Returns
+    -------
+    points : 2D array
+    """
+    directions = sobol_directions(dimensions)
+    index = np.arange(skip, skip + number_points, dtype=np.uint64)
+    points = np.zeros((number_points, dimensions), dtype=np.uint64)
+    for bit in range(SOBOL_BITS):
+        set_bit = ((index >> np.uint64(bit)) & np.uint64(1)).astype(bool)
+        points[set_bit] ^= directions[:, bit]
+    if rng is not None:
+        points ^= rng.integers(0, 1 << SOBOL_BITS, size=dimensions, dtype=np.uint64)
+    return points.astype(float)/2.0**SOBOL_BITS
+
+
+def halton(number_points, dimensions, rng=None, skip=0):
+    """Points of the Halton sequence in [0, 1)^dimensions, scrambled with
+    random permutations of the digits (one per dimension and digit) if rng is
+    given.
+
+    Parameters
+    ----------
+    number_points : int
+        Number of points
+    dimensions : int
+        Number of dimensions, at most 30
+    rng : numpy.random.Generator, optional
+        Random generator of the permutations
+    skip : int
+        Index of the first point in the sequence
+
+    Returns
+    -------
+    points : 2D array
+    """
+    if dimensions > len(HALTON_PRIMES):
+        raise ValueError("Halton sequences are defined up to {} parameters".format(len(HALTON_PRIMES)))
+    index = np.arange(skip, skip + number_points, dtype=np.int64)
+    points = np.zeros((number_points, dimensions))
+    for d, base in enumerate(HALTON_PRIMES[:dimensions]):
+        # enough digits for double precision
+        digits = int(np.ceil(53*np.log(2)/np.log(base)))
+        remaining = index.copy()
+        factor = 1.0/base
+        for _ in range(digits):
+            digit = remaining % base
+            if rng is not None:
+                digit = rng.permutation(base)[digit]
+            points[:, d] += digit*factor
+            remaining //= base
+            factor /= base
+    return points
+
+
+def latin_hypercube(number_points, dimensions, rng):
+    """Latin hypercube design in [0, 1)^dimensions: every dimension is
+    divided in number_points strata with one point each.
+
+    Parameters
+    ----------
+    number_points : int
+        Number of points
+    dimensions : int
+        Number of dimensions
+    rng : numpy.random.Generator
+        Random generator of the strata permutations and of the points within
+        the strata
+
+    Returns
+    -------
+    points : 2D array
+    """
+    strata = np.argsort(rng.random((number_points, dimensions)), axis=0)
+    return (strata + rng.random((number_points, dimensions)))/number_points
+
+
+def scale_unit_points(points, set_param):
+    """Maps points of [0, 1)^number_parameters to the parameter ranges:
+    logarithmically for the parameters with a log distribution, and to
+    integers (all values of the range equally likely) for the discrete
+    parameters.
+
+    Parameters
+    ----------
+    points : 2D array
+        Points in the unit hypercube, one per row
+    set_param : smartstopos.utils.SetParameters object
+
+    Returns
+    -------
+    points : 2D array
+    """
+    points = np.array(points, dtype=float)
+    for index, param in enumerate(set_param.parameters.values()):
+        low, high = param.range[0], param.range[1]
+        if param.data_type == 'discrete':
+            values = np.floor(low + points[:, index]*(np.floor(high) - low + 1))
+            points[:, index] = np.minimum(values, np.floor(high))
+        elif param.distribution == 'log':
+            if low <= 0 or high <= 0:
+                raise ValueError("Logarithm of one of the range boundaries is not defined")
+            points[:, index] = low*(high/low)**points[:, index]
+        else:
+            points[:, index] = low + points[:, index]*(high - low)
+    return points
+
+
+def make_init_datapoints_quasirandom(sim_param, set_param):
+    """Make a space-filling sample of points with the design given as
+    distribution of the run (sobol, halton or lhs).
+
+    The number of points is the product of the number_points of the
+    parameters, as for the Cartesian grid. Points not satisfying the
+    constraints are replaced by the next points of the sequence (new designs
+    for lhs).
+
+    Parameters
+    ----------
+    sim_param : dict
+        Dictionary with the simulation details read from the input file
+    set_params : smartstopos.utils.SetParameters object
+
+    Returns
+    -------
+    points : 2D array
+        Data points, one per row
+    """
+    design = sim_param['distribution']
+    if design not in QUASIRANDOM_DESIGNS:
+        raise ValueError("distribution should be one of {}".format(", ".join(QUASIRANDOM_DESIGNS)))
+    logging.debug("Making {} set of initial points".format(design))
+    for param in set_param.parameters.values():
+        del param.data_points[:]
+
+    number_points = 1
+    for param in set_param.parameters.values():
+        number_points = param.number_points * number_points
+    dimensions = len(set_param.parameters)
+    rng = generator(sim_param, 0, "initial")
+    # the same randomization for all the parts of the sequence
+    scrambling = rng.integers(2**63)
+
+    population = np.empty((0, dimensions))
+    skip = 0
+    for _ in range(MAX_ROUNDS):
+        missing = number_points - len(population)
+        if design == "sobol":
+            unit_points = sobol(missing, dimensions, np.random.default_rng(scrambling), skip)
+        elif design == "halton":
+            unit_points = halton(missing, dimensions, np.random.default_rng(scrambling), skip)
+        else:
+            unit_points = latin_hypercube(number_points, dimensions, rng)[:missing]
+        skip += missing
+        points = evaluate_constraints(sim_param, set_param, scale_unit_points(unit_points, set_param))
+        population = np.concatenate((population, points))
+        if len(population) >= number_points:
+            return population
+    raise ValueError("Not enough initial data points satisfy the constraints")
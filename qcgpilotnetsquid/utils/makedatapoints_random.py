@@ -2,9 +2,9 @@
 Defines functions to create parameters data points for fully random distribution
 """
 import logging
-import random
 import numpy as np
 from qcgpilotnetsquid.utils.parserconstraints import evaluate_constraints
+from qcgpilotnetsquid.utils.rng import generator
 
 
 def make_init_datapoints_random(sim_param, set_param):
@@ -21,6 +21,7 @@ def make_init_datapoints_random(sim_param, set_param):
     -------
     list_points
     """
+    rng = generator(sim_param, 0, "initial")
     logging.debug("Making random set of initial points")
     for param in set_param.parameters.values():
         del param.data_points[:]
@@ -31,7 +32,7 @@ def make_init_datapoints_random(sim_param, set_param):
 
     population = []
     while len(population) < number_points:
-        points = np.random.random((number_points, len(set_param.parameters)))
+        points = rng.random((number_points, len(set_param.parameters)))
 
         for index, param in enumerate(set_param.parameters.values()):
             points[:, index] = points[:, index] * (param.range[1] - param.range[0]) + param.range[0]
@@ -42,6 +43,6 @@ def make_init_datapoints_random(sim_param, set_param):
         population.extend(points.tolist())
 
     if len(population) > number_points:
-        population = random.sample(population, number_points)
+        population = [population[i] for i in rng.choice(len(population), number_points, replace=False)]
 
     return population
@@ -1,27 +1,175 @@
-"""Define a parser of constraints."""
+"""Define a parser of constraints.
+
+Constraints are arithmetic comparisons between the parameters, e.g. "x+y<8, x+5>10".
+Comma separated constraints must all be satisfied. The expression is parsed once
+into a syntax tree which only may contain arithmetic, comparisons, logical
+operators and a few mathematical functions; it is evaluated at once over the
+columns (one array per parameter) of a whole population.
+"""
+import ast
 import numpy as np
 
+_BINARY_OPERATORS = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: np.true_divide,
+    ast.FloorDiv: np.floor_divide,
+    ast.Mod: np.mod,
+    ast.Pow: np.float_power,
+}
 
-def evaluate_constraints(sim_param, set_param, population):
-    """Remove from the given population all individuals not satisfying the constraints."""
-    if 'constraints' in sim_param.keys():
-        params = {}
-        for key, item in set_param.parameters.items():
-            params[key] = 0
+_UNARY_OPERATORS = {
+    ast.UAdd: np.positive,
+    ast.USub: np.negative,
+    ast.Not: np.logical_not,
+}
+
+_COMPARISONS = {
+    ast.Lt: np.less,
+    ast.LtE: np.less_equal,
+    ast.Gt: np.greater,
+    ast.GtE: np.greater_equal,
+    ast.Eq: np.equal,
+    ast.NotEq: np.not_equal,
+}
+
+_FUNCTIONS = {
+    'abs': np.abs,
+    'sqrt': np.sqrt,
+    'exp': np.exp,
+    'log': np.log,
+    'log10': np.log10,
+    'sin': np.sin,
+    'cos': np.cos,
+    'tan': np.tan,
+    'min': np.minimum,
+    'max': np.maximum,
+}
+
+_CONSTANTS = {
+    'pi': np.pi,
+    'e': np.e,
+}
+
+_ALLOWED_NODES = (ast.Expression, ast.Tuple, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.BinOp,
+                  ast.Compare, ast.Call, ast.Name, ast.Load, ast.Constant) \
+    + tuple(_BINARY_OPERATORS) + tuple(_UNARY_OPERATORS) + tuple(_COMPARISONS)
+
+
+def parse_constraints(constraints):
+    """Parse the constraints and check that they only contain arithmetic.
+
+    Parameters
+    ----------
+    constraints : str
+        Constraints as given in the input file, e.g. "x+y<8, x+5>10"
 
-        conditions = sim_param['constraints']
-        # new_population = copy.copy(population)
-        to_keep = []
-        for index, item in enumerate(population):
-            for p, name in enumerate(set_param.parameters.keys()):
-                params[name] = item[p]
+    Returns
+    -------
+    tree : ast.Expression
+        Syntax tree of the constraints, to be evaluated with `constraints_mask`
 
-            if eval(conditions, params):
-                to_keep.append(index)
+    Raises
+    ------
+    ValueError
+        If the constraints are not a valid arithmetic expression
+    """
+    try:
+        tree = ast.parse(constraints.strip(), mode='eval')
+    except SyntaxError as error:
+        raise ValueError("Constraints '{}' are not a valid expression: {}".format(constraints, error.msg))
 
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise ValueError("'{}' is not allowed in constraints '{}'".format(type(node).__name__, constraints))
+        if isinstance(node, ast.Constant) and (isinstance(node.value, bool)
+                                               or not isinstance(node.value, (int, float))):
+            raise ValueError("Only numbers are allowed as constants in constraints '{}'".format(constraints))
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in _FUNCTIONS or node.keywords:
+                raise ValueError("Only the functions {} are allowed in constraints '{}'"
+                                 .format(", ".join(_FUNCTIONS), constraints))
+    return tree
+
+
+def _evaluate(node, columns):
+    """Evaluate a node of the syntax tree over the parameter columns."""
+    if isinstance(node, ast.Expression):
+        return _evaluate(node.body, columns)
+    if isinstance(node, ast.Tuple):
+        # comma separated constraints are all required
+        mask = True
+        for element in node.elts:
+            mask = np.logical_and(mask, _evaluate(element, columns))
+        return mask
+    if isinstance(node, ast.BoolOp):
+        combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+        result = _evaluate(node.values[0], columns)
+        for value in node.values[1:]:
+            result = combine(result, _evaluate(value, columns))
+        return result
+    if isinstance(node, ast.UnaryOp):
+        return _UNARY_OPERATORS[type(node.op)](_evaluate(node.operand, columns))
+    if isinstance(node, ast.BinOp):
+        return _BINARY_OPERATORS[type(node.op)](_evaluate(node.left, columns), _evaluate(node.right, columns))
+    if isinstance(node, ast.Compare):
+        # chained comparisons, e.g. 0 < x < 1
+        result = True
+        left = _evaluate(node.left, columns)
+        for op, comparator in zip(node.ops, node.comparators):
+            right = _evaluate(comparator, columns)
+            result = np.logical_and(result, _COMPARISONS[type(op)](left, right))
+            left = right
+        return result
+    if isinstance(node, ast.Call):
+        return _FUNCTIONS[node.func.id](*[_evaluate(arg, columns) for arg in node.args])
+    if isinstance(node, ast.Name):
+        if node.id in columns:
+            return columns[node.id]
+        if node.id in _CONSTANTS:
+            return _CONSTANTS[node.id]
+        raise ValueError("Unknown parameter '{}' in constraints".format(node.id))
+    if isinstance(node, ast.Constant):
+        return node.value
+    raise ValueError("'{}' is not allowed in constraints".format(type(node).__name__))
+
+
+def constraints_mask(constraints, set_param, points):
+    """Evaluate the constraints for all the data points at once.
+
+    Parameters
+    ----------
+    constraints : ast.Expression or str
+        Constraints parsed with `parse_constraints` (or the string to parse)
+    set_param : smartstopos.utils.parameters.SetParameters
+        Parameters explored, same order as the columns of points
+    points : 2D array
+        Data points, one per row
+
+    Returns
+    -------
+    mask : 1D array of bool
+        True for the data points satisfying all constraints
+    """
+    if isinstance(constraints, str):
+        constraints = parse_constraints(constraints)
+    points = np.asarray(points, dtype=float).reshape(len(points), -1)
+    columns = {}
+    for p, name in enumerate(set_param.parameters.keys()):
+        columns[name] = points[:, p]
+    with np.errstate(all='ignore'):
+        mask = _evaluate(constraints, columns)
+    return np.broadcast_to(np.asarray(mask, dtype=bool), (len(points),))
+
+
+def evaluate_constraints(sim_param, set_param, population):
+    """Remove from the given population all individuals not satisfying the constraints."""
+    if 'constraints' in sim_param.keys() and len(population) > 0:
+        mask = constraints_mask(sim_param['constraints'], set_param, population)
         if isinstance(population, np.ndarray):
-            return population[to_keep]
+            return population[mask]
         else:
-            return [population[i] for i in to_keep]
+            return [population[i] for i in np.flatnonzero(mask)]
 
     return population
@@ -1,9 +1,17 @@
 import glob
 import os
 import random
+import re
 import logging
 import shutil
 import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+FINISHED_STATES = ('SUCCEED', 'FAILED', 'CANCELED', 'OMITTED')
+# Largest population adapted to the allocation, relative to the input file
+MAX_POPULATION_FACTOR = 4
 
 
 def copyfiles(workdir, simparameters):
@@ -29,6 +37,240 @@ def copyfiles(workdir, simparameters):
         else:
             shutil.copy(projectdir +"/" + f, workdir +'/'+f)
 
+def finished_jobs(manager, names):
+    """ Get the jobs that are not running anymore
+    Parameters
+    ----------
+        manager: qcgpilot object LocalManager()
+            Manager of the qcgpilot workflow
+        names: list of str
+            Names of the submitted jobs
+    Return
+    ------
+        finished: list of str
+            Names of the jobs that reached a final state (succeeded or not)
+    """
+    status = manager.status(names)
+    finished = []
+    for name, job in status['jobs'].items():
+        if job.get('data', {}).get('status') in FINISHED_STATES:
+            finished.append(name)
+    return finished
+
+class JobsFinished:
+    """ Condition of a workflow: a fraction of the jobs has finished
+    Parameters
+    ----------
+        names: list of str
+            Names of the submitted jobs
+        fraction: float
+            Fraction (0-1] of the jobs that has to be finished
+        callback: callable
+            Called without arguments after every status request, e.g. to
+            collect the results of the finished jobs
+    """
+    def __init__(self, names, fraction=1.0, callback=None):
+        self.names = list(names)
+        self.needed = min(len(self.names), max(1, int(round(fraction*len(self.names)))))
+        self.callback = callback
+        self.finished = []
+
+    def poll(self, manager):
+        """ Request the status of the jobs, True if the condition is met"""
+        if self.names:
+            self.finished = finished_jobs(manager, self.names)
+        if self.callback is not None:
+            self.callback()
+        return len(self.finished) >= self.needed
+
+
+def wait4_fraction(manager, names, fraction, poll_delay=2.0, callback=None):
+    """ Wait until a fraction of the jobs has finished
+    Parameters
+    ----------
+        manager: qcgpilot object LocalManager()
+            Manager of the qcgpilot workflow
+        names: list of str
+            Names of the submitted jobs
+        fraction: float
+            Fraction (0-1] of the jobs that has to be finished
+        poll_delay: float
+            Seconds between two status requests to the manager
+        callback: callable
+            Called without arguments after every status request, e.g. to
+            collect the results of the finished jobs
+    Return
+    ------
+        finished: list of str
+            Names of the finished jobs
+    """
+    condition = JobsFinished(names, fraction, callback)
+    while not condition.poll(manager):
+        time.sleep(poll_delay)
+    return condition.finished
+
+
+class AnyFinished:
+    """ Condition of a workflow: one of several conditions is met
+    Parameters
+    ----------
+        conditions: list
+            Conditions (JobsFinished or AnyFinished)
+    """
+    def __init__(self, conditions):
+        self.conditions = list(conditions)
+        self.ready = [False]*len(self.conditions)
+        self.finished = []
+
+    def poll(self, manager):
+        """ Poll all the conditions, True if one of them is met"""
+        self.ready = [condition.poll(manager) for condition in self.conditions]
+        self.finished = [name for condition, ready in zip(self.conditions, self.ready) if ready
+                         for name in condition.finished]
+        return any(self.ready)
+
+
+def parallel_workflows(workflows):
+    """ Workflow running several workflows concurrently: it waits for any of
+    their conditions and resumes the workflows whose condition is met. A
+    workflow is a generator submitting jobs and yielding the condition
+    (JobsFinished) it has to wait for; it is resumed with the names of the
+    finished jobs.
+    Parameters
+    ----------
+        workflows: list of generators
+            Workflows to run
+    """
+    waiting = []
+    for workflow in workflows:
+        try:
+            waiting.append((workflow, next(workflow)))
+        except StopIteration:
+            pass
+    while waiting:
+        condition = AnyFinished([condition for _workflow, condition in waiting])
+        yield condition
+        resumed = []
+        for (workflow, condition), ready in zip(waiting, condition.ready):
+            if not ready:
+                resumed.append((workflow, condition))
+                continue
+            try:
+                resumed.append((workflow, workflow.send(condition.finished)))
+            except StopIteration:
+                pass
+        waiting = resumed
+
+
+def run_workflows(manager, workflows, poll_delay=2.0):
+    """ Drive several workflows concurrently on the same manager, so the jobs
+    of all workflows share the allocation (see parallel_workflows)
+    Parameters
+    ----------
+        manager: qcgpilot object LocalManager()
+            Manager of the qcgpilot workflow
+        workflows: list of generators
+            Workflows to run
+        poll_delay: float
+            Seconds between two rounds of status requests to the manager
+    """
+    workflow = parallel_workflows(workflows)
+    for condition in workflow:
+        while not condition.poll(manager):
+            time.sleep(poll_delay)
+
+def free_cores(manager):
+    """ Number of cores of the allocation not used by running jobs
+    Parameters
+    ----------
+        manager: qcgpilot object LocalManager()
+            Manager of the qcgpilot workflow
+    Return
+    ------
+        cores: int
+    """
+    return int(manager.resources()['free_cores'])
+
+def job_walltime(manager, names):
+    """ Mean walltime of the finished jobs, measured by qcgpilot (without the
+    time waiting for resources)
+    Parameters
+    ----------
+        manager: qcgpilot object LocalManager()
+            Manager of the qcgpilot workflow
+        names: list of str
+            Names of the jobs
+    Return
+    ------
+        job_time: float or None
+            Walltime in seconds, None if no job has finished
+    """
+    if not names:
+        return None
+    try:
+        infos = manager.info_parsed(list(names))
+    except ValueError as error:
+        # run time not in the format expected (e.g. longer than a day)
+        logging.warning("Walltime of the jobs not available: {}".format(error))
+        return None
+    times = [info.time.total_seconds() for info in infos.values() if info.time is not None]
+    if not times:
+        return None
+    return sum(times)/len(times)
+
+def wave_points_per_job(population_size, slots, points_per_job=1):
+    """ Number of data points per job (chunk_size in runmode module) such that
+    one wave of jobs on all the slots is not (much) larger than the population
+    Parameters
+    ----------
+        population_size: int
+            Population size defined in the input file
+        slots: int
+            Number of jobs that can run at the same time
+        points_per_job: int
+            Largest number of data points evaluated by a job
+    Return
+    ------
+        points_per_job: int
+    """
+    slots = max(1, int(slots))
+    return max(1, min(int(points_per_job), -(-int(population_size) // slots)))
+
+def wave_population_size(population_size, slots, points_per_job=1, job_time=None, target_time=None,
+                         max_factor=MAX_POPULATION_FACTOR):
+    """ Population size filling the job slots of the allocation in whole waves
+    Parameters
+    ----------
+        population_size: int
+            Population size defined in the input file
+        slots: int
+            Number of jobs that can run at the same time
+        points_per_job: int
+            Number of data points evaluated by a job (chunk_size in runmode
+            module), reduced with `wave_points_per_job` if a wave would be too
+            large
+        job_time: float
+            Measured walltime of a job, in seconds
+        target_time: float
+            Walltime wanted for a generation, in seconds. If given together with
+            job_time, the number of waves is chosen to match it, otherwise the
+            population size is rounded up to whole waves
+        max_factor: float
+            The population size is at most max_factor times population_size,
+            it fills the slots partly if a whole wave is larger
+    Return
+    ------
+        population_size: int
+    """
+    slots = max(1, int(slots))
+    max_population = max(1, int(max_factor*int(population_size)))
+    points_per_wave = slots*wave_points_per_job(population_size, slots, points_per_job)
+    if job_time is not None and target_time is not None and job_time > 0:
+        waves = max(1, int(round(target_time/job_time)))
+    else:
+        waves = max(1, -(-int(population_size) // points_per_wave))
+    return min(waves*points_per_wave, max_population)
+
 def commandline_qcgpilot(j, point, step, general):
     """Create command line to run jobs
     Parameters
@@ -98,8 +340,30 @@ def commandline_args_qcgpilot(j, point, step, general):
             instruction.append(point[i])
     return tuple(instruction)
 
+def commandline_database_qcgpilot(j, step, database):
+    """Create command line arguments for a program storing its result in the
+    result database of the optimization instead of writing a csvfile. The
+    program has to accept the arguments --database, --step and --job and store
+    its result with `ResultStore(database).insert(step, job, row)`
+    Parameters
+    ----------
+        j: int
+            Counter value of datapoints to be explore in optimization step
+        step: int
+            Optimization step
+        database: str
+            Result database of the optimization
+    Return
+    ------
+        instruction: list
+            Command line arguments to be added to job
+    """
+    return ["--database", database, "--step", str(step), "--job", str(j)]
+
 def commandline_files_qcgpilot(j, point, step, general):
-    """Create command line using configfile and paramfile to run jobs
+    """Create command line using configfile and paramfile to run jobs. The
+    paramfile and configfile of the data point have to be written with
+    `write_paramfiles`
     Parameters
     ----------
         j: int
@@ -116,27 +380,192 @@ def commandline_files_qcgpilot(j, point, step, general):
             Command line instruction to be added to job
     
     """
-    variables = general['programsweepargs'] 
     if "paramfile" not in general.keys():
         raise ValueError("No paramfile defined")
     if "configfile" not in general.keys():
         raise ValueError("No configfile defined")
         
-    paramfilename = general['paramfile']
     paramfilename_new = general['paramfile'] + "_" + str(j)
-    configfilename = general['configfile']
-    shutil.copyfile(paramfilename, paramfilename_new)
-    for i,v in enumerate(variables):
-        line1 = 's/' + str(v) + '\:.*/' + str(v) + ':' +'/g'
-        subprocess.call(["sed", "-i ", line1, paramfilename_new])
-        old = str(v) + ":" 
-        new = str(v) + ": " + str(point[i])
-        line2 = 's/' + str(v) + '\:*/' + new + '/g'
-        subprocess.call(["sed", "-i ", line2, paramfilename_new])
-
-    line3 = 's/' + paramfilename + '.*/' + paramfilename_new + '/g'
-    subprocess.call(["sed", "-i ", line3 , configfilename])
-    line = ["--paramfile ", str(paramfilename_new), "--configfile ",
-str(general['configfile'])]
+    configfilename_new = general['configfile'] + "_" + str(j)
+    line = ["--paramfile", str(paramfilename_new), "--configfile", str(configfilename_new)]
     instruction = (line)
     return instruction
+
+def load_paramfile_template(paramfilename, variables):
+    """Read a paramfile (key: value per line, e.g. yaml) once and find the
+    lines of the variables to be explored
+    Parameters
+    ----------
+        paramfilename: str
+            Paramfile to use as template
+        variables: list of str
+            Names of the variables to be explored
+    Return
+    ------
+        template: tuple (list of str, dict)
+            Lines of the paramfile and, per variable, the numbers and
+            indentation of the lines where the variable is defined
+    """
+    with open(paramfilename) as paramfile:
+        lines = paramfile.readlines()
+
+    positions = {}
+    for n, line in enumerate(lines):
+        key, sep, _value = line.partition(":")
+        if sep and key.strip() in variables:
+            indent = key[:len(key) - len(key.lstrip())]
+            positions.setdefault(key.strip(), []).append((n, indent))
+    for v in variables:
+        if v not in positions:
+            raise ValueError("Variable {} not found in paramfile {}".format(v, paramfilename))
+    return lines, positions
+
+def render_paramfile(template, variables, point):
+    """Fill in the values of a data point in the paramfile template
+    Parameters
+    ----------
+        template: tuple
+            Template read with `load_paramfile_template`
+        variables: list of str
+            Names of the variables to be explored
+        point: array
+            Array with variable values to be explored
+    Return
+    ------
+        content: str
+            Content of the paramfile of the data point
+    """
+    lines, positions = template
+    lines = list(lines)
+    for i, v in enumerate(variables):
+        for n, indent in positions[v]:
+            lines[n] = indent + str(v) + ": " + str(point[i]) + "\n"
+    return "".join(lines)
+
+def write_paramfiles(datapoints, general, workdir, offset=0, threads=None):
+    """Write the paramfile and configfile of all the data points of an
+    optimization step (runmode files). Each job gets its own pair of files, so
+    the jobs can run concurrently. The paramfile and configfile are parsed only
+    once, the files of the data points are written in bulk, optionally by a
+    pool of threads.
+    Parameters
+    ----------
+        datapoints: list of arrays
+            Data points to be explored in optimization step
+        general: dict
+            Information read form json input file
+        workdir: string
+            Directory where the simulations are run, containing a copy of
+            the paramfile and configfile
+        offset: int
+            Counter value of the first data point in optimization step
+        threads: int
+            Number of threads writing the files, default writes serially
+    Return
+    ------
+        paramfiles: list of str
+            Names of the paramfiles written (relative to workdir)
+    """
+    if "paramfile" not in general.keys():
+        raise ValueError("No paramfile defined")
+    if "configfile" not in general.keys():
+        raise ValueError("No configfile defined")
+
+    variables = general['programsweepargs']
+    paramfilename = general['paramfile']
+    configfilename = general['configfile']
+    template = load_paramfile_template(os.path.join(workdir, paramfilename), variables)
+    with open(os.path.join(workdir, configfilename)) as configfile:
+        config = configfile.read()
+    if paramfilename not in config:
+        raise ValueError("Paramfile {} not found in configfile {}".format(paramfilename, configfilename))
+    config_pattern = re.compile(re.escape(paramfilename) + ".*")
+
+    def write(item):
+        j, point = item
+        paramfilename_new = paramfilename + "_" + str(j)
+        with open(os.path.join(workdir, paramfilename_new), "w") as paramfile:
+            paramfile.write(render_paramfile(template, variables, point))
+        with open(os.path.join(workdir, configfilename + "_" + str(j)), "w") as configfile:
+            configfile.write(config_pattern.sub(paramfilename_new, config))
+        return paramfilename_new
+
+    items = list(enumerate(datapoints, offset))
+    if threads:
+        with ThreadPoolExecutor(max_workers=int(threads)) as executor:
+            paramfiles = list(executor.map(write, items))
+    else:
+        paramfiles = [write(item) for item in items]
+    logging.debug("{} paramfiles and configfiles written in {}".format(len(paramfiles), workdir))
+    return paramfiles
+
+def write_chunks(datapoints, chunk_size, workdir, step, offset=0):
+    """Split the data points in chunks and write one file per chunk (runmode module)
+    Parameters
+    ----------
+        datapoints: list of arrays
+            Data points to be explored in optimization step
+        chunk_size: int
+            Maximum number of data points per chunk
+        workdir: string
+            Directory where the simulations are run
+        step: int
+            Optimization step
+        offset: int
+            Counter value of the first data point in optimization step, when
+            the data points of the step are written in several calls
+    Return
+    ------
+        chunks: list of (int, str)
+            Counter value of the first data point of each chunk, used to name the
+            chunk, and name (relative to workdir) of the file with its data points
+    """
+    chunk_size = int(chunk_size)
+    if chunk_size < 1:
+        raise ValueError("chunk_size should be at least 1")
+    points = np.array(datapoints, dtype=float, ndmin=2)
+    chunks = []
+    for start in range(0, len(points), chunk_size):
+        pointsfile = "points_" + str(step) + "_" + str(offset + start)
+        np.savetxt(workdir + "/" + pointsfile, points[start:start + chunk_size], fmt='%.17g')
+        chunks.append((offset + start, pointsfile))
+    return chunks
+
+def commandline_module_qcgpilot(k, pointsfile, step, general, set_param):
+    """Create command line to run a chunk of data points in a single process (runmode module)
+    Parameters
+    ----------
+        k: int
+            Counter value of the (first data point of the) chunk in optimization step
+        pointsfile: str
+            File with the data points of the chunk
+        step: int
+            Optimization step
+        general: dict
+            Information read form json input file
+        set_param: smartstopos.utils.parameters.SetParameters
+            Parameters explored, used to pass discrete variables as int
+    Return
+    ------
+        instruction: list
+            Arguments of python3 to be added to job
+    """
+    if "programfunction" not in general.keys():
+        raise ValueError("No programfunction defined")
+    variables = general['programsweepargs']
+    discrete = [v for v, param in zip(variables, set_param.parameters.values()) if param.data_type == "discrete"]
+    instruction = ["-m", "qcgpilotnetsquid.utils.batchworker",
+                   "--program", str(general["program"]),
+                   "--function", str(general["programfunction"]),
+                   "--pointsfile", pointsfile,
+                   "--outputfile", "chunk_" + str(step) + "_" + str(k) + ".csv",
+                   "--variables"] + list(variables)
+    if discrete:
+        instruction += ["--discrete"] + discrete
+    # same extra arguments as commandline_qcgpilot, passed to the function
+    if general.get('programfixargs'):
+        instruction += ["--fixargs"] + list(general["programfixargs"])
+    if general.get('programvariableargs'):
+        instruction += ["--variableargs"] + list(general["programvariableargs"])
+    instruction += ["--step", str(step), "--job", str(k)]
+    return instruction
@@ -1,6 +1,10 @@
 """ utils"""
+import csv
+import glob
 import logging
-import pandas as pd
+import os
+import numpy as np
+from qcgpilotnetsquid.utils.resultstore import read_csvfile
 
 
 def get_subsample_csvfile(data, sim_params, samplesize=10):
@@ -50,7 +54,9 @@ def get_subsample_csvfile(data, sim_params, samplesize=10):
 
 
 def readcsvfiles(simparameters, step, backsteps=1,subsample=None):
-    """Reads the results obtained in previous steps.
+    """Reads the results obtained in previous steps. The results are taken
+    from the result store of the optimization (simparameters.resultstore) if
+    available, otherwise they are read from the csvfiles.
     Parameters
     ----------
     simparameters: class InputParam
@@ -72,29 +78,70 @@ def readcsvfiles(simparameters, step, backsteps=1,subsample=None):
     csvprefix = simparameters.csvprefix
     rundir = simparameters.rundir
     restartcsv = simparameters.restartcsvfile
+    store = simparameters.resultstore
 
     csvdata = []
     csvfiles =[]
     
     if restartcsv is not None and step == 0:
-        csvfiles += [restartcsv] 
+        csvfiles += [(None, restartcsv)]
 
     else:
         if csvfiledir == None:
             for i in range(0, backsteps):
                 temp= rundir + "opt_step_" + str(step - i - 1) + "/" + csvprefix + str(step - i - 1) + ".csv"
-                csvfiles += [temp]
+                csvfiles += [(step - i - 1, temp)]
         else:
             for i in range(0, backsteps):
                 temp = csvfiledir + "/" + csvprefix + str(step - i - 1) + ".csv"
-                csvfiles += [temp]
+                csvfiles += [(step - i - 1, temp)]
     
     totaldata = [] 
 
-    for f in csvfiles:
-        csvdata = list(pd.read_csv(f, engine='python', dtype=float).values)
+    for csvstep, f in csvfiles:
+        if store is not None and csvstep is not None and store.has_step(csvstep):
+            csvdata = store.get(csvstep)
+        else:
+            csvdata = read_csvfile(f)
         if subsample:
             candidates, fitness, sorted_data = get_subsample_csvfiles(csvdata, sim_param)
             csvdata = candidates
         totaldata.insert(0, csvdata)
     return totaldata
+
+
+def read_job_results(workdir, csvprefix):
+    """Reads the results of the jobs of an optimization step that have
+    already finished, before the analysis program has collected them.
+
+    Parameters
+    ----------
+    workdir: str
+        Directory of the optimization step where the jobs are run
+    csvprefix: str
+        Prefix of the csvfile of the optimization step, this file is not read
+
+    Returns
+    -------
+    jobdata: list of arrays
+        Data (fitness + parameters) found in the csvfiles of the finished jobs
+    """
+    # the analysis program may already be moving the files to output/
+    csvfiles = glob.glob(os.path.join(workdir, "*.csv")) + glob.glob(os.path.join(workdir, "output", "*.csv"))
+
+    jobdata = []
+    seen = set()
+    for f in csvfiles:
+        name = os.path.basename(f)
+        if name.startswith(csvprefix) or name in seen:
+            continue
+        try:
+            with open(f) as csvfile:
+                rows = [np.array(row, dtype=float) for row in csv.reader(csvfile) if row]
+        except (FileNotFoundError, ValueError):
+            # moved meanwhile or still being written by a running job
+            continue
+        seen.add(name)
+        jobdata.extend(rows)
+    logging.debug("{} results read from finished jobs in {}".format(len(jobdata), workdir))
+    return jobdata
@@ -0,0 +1,146 @@
+"""
+Defines class ResultCache, a persistent cache of the results of data points
+already evaluated, to avoid running the same simulation again.
+"""
+import csv
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import numpy as np
+
+
+class ResultCache:
+    """Results of evaluated data points stored in a sqlite database.
+
+    A data point is identified by a hash of its parameter values, rounded to
+    `decimals`, together with the program and its fixed arguments; the results of
+    a different program (or different fixed arguments) are never mixed up.
+
+    Parameters
+    ----------
+        filename: str
+            Database file, created if it does not exist
+        general: dict
+            Information read form json input file
+        decimals: int
+            Number of decimals the parameter values are rounded to
+    """
+    def __init__(self, filename, general, decimals=10):
+        self.filename = filename
+        self.decimals = int(decimals)
+        self.number_parameters = len(general['programsweepargs'])
+        context = {}
+        for key in ('program', 'programfunction', 'programsweepargs', 'programfixargs'):
+            context[key] = general.get(key)
+        self._context = json.dumps(context, sort_keys=True).encode()
+        self._connection = sqlite3.connect(filename)
+        self._connection.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, result TEXT)")
+        self._connection.commit()
+
+    def key(self, point):
+        """Hash identifying a data point
+
+        Parameters
+        ----------
+            point: array
+                Parameter values of the data point
+        """
+        values = np.round(np.asarray(point, dtype=float).ravel(), self.decimals) + 0.0  # no -0.0
+        return hashlib.sha1(self._context + values.tobytes()).hexdigest()
+
+    def lookup(self, datapoints):
+        """Find the data points already evaluated
+
+        Parameters
+        ----------
+            datapoints: list of arrays
+                Data points to be explored
+
+        Returns
+        -------
+            uncached: list of arrays
+                Data points not evaluated yet
+            cachedrows: list of lists
+                Results of the data points already evaluated, in the format of
+                the csvfiles (output followed by the parameter values)
+        """
+        uncached = []
+        cachedrows = []
+        for point in datapoints:
+            row = self._connection.execute("SELECT result FROM results WHERE key = ?",
+                                           (self.key(point),)).fetchone()
+            if row is None:
+                uncached.append(point)
+            else:
+                output = json.loads(row[0])
+                cachedrows.append(output + [float(value) for value in np.asarray(point).ravel()])
+        logging.debug("{} of {} data points found in result cache".format(len(cachedrows), len(datapoints)))
+        return uncached, cachedrows
+
+    def add(self, rows):
+        """Store results
+
+        Parameters
+        ----------
+            rows: list of arrays
+                Results in the format of the csvfiles (output followed by the
+                parameter values)
+        """
+        entries = []
+        for row in rows:
+            row = [float(value) for value in row]
+            if len(row) <= self.number_parameters:
+                continue
+            output, point = row[:-self.number_parameters], row[-self.number_parameters:]
+            entries.append((self.key(point), json.dumps(output)))
+        self._connection.executemany("INSERT OR REPLACE INTO results (key, result) VALUES (?, ?)", entries)
+        self._connection.commit()
+
+    def add_csvfile(self, csvfilename):
+        """Store the results of a csvfile (e.g. of an optimization step)
+
+        Parameters
+        ----------
+            csvfilename: str
+                csvfile with one result per line, lines that are not numeric
+                (comments) are skipped
+        """
+        rows = []
+        with open(csvfilename) as csvfile:
+            for row in csv.reader(csvfile):
+                try:
+                    rows.append([float(value) for value in row])
+                except ValueError:
+                    continue
+        self.add(rows)
+
+    def filter_datapoints(self, datapoints, workdir, step):
+        """Remove the data points already evaluated and write their results to
+        a csvfile in workdir, where the analysis program collects them together
+        with the results of the jobs of the step
+
+        Parameters
+        ----------
+            datapoints: list of arrays
+                Data points to be explored
+            workdir: str
+                Directory where the simulations of the step are run
+            step: int
+                Optimization step
+
+        Returns
+        -------
+            uncached: list of arrays
+                Data points that still have to be evaluated
+        """
+        uncached, cachedrows = self.lookup(datapoints)
+        if cachedrows:
+            with open(os.path.join(workdir, "cached_" + str(step) + ".csv"), mode='a') as csvfile:
+                csv.writer(csvfile, delimiter=',').writerows(cachedrows)
+            print("{} data points found in the result cache".format(len(cachedrows)))
+        return uncached
+
+    def close(self):
+        self._connection.close()
@@ -0,0 +1,178 @@
+"""
+Defines class ResultStore, an append-only store of the results of the
+optimization steps, kept in memory and in a sqlite database on disk.
+
+The database is opened in WAL mode, so the jobs of a step can insert their
+results (`ResultStore.insert`) concurrently while the workflow reads them. The
+jobs insert them in their own database (JOB_RESULTS_FILE in the run
+directory), the store of the workflow (RESULTS_FILE) is filled from the
+csvfiles of the finished steps.
+"""
+import csv
+import logging
+import sqlite3
+import numpy as np
+
+# Seconds a connection waits for the lock of another writer (job)
+BUSY_TIMEOUT = 60
+# Databases in the run directory: results of the steps and results inserted by the jobs
+RESULTS_FILE = "results.db"
+JOB_RESULTS_FILE = "job_results.db"
+
+
+def read_csvfile(csvfilename):
+    """Reads a csvfile with results.
+
+    Parameters
+    ----------
+    csvfilename: str
+        csvfile with one result per line (output followed by the parameter
+        values); lines that are not numeric (e.g. a comment line) are skipped
+
+    Returns
+    -------
+    data: list of arrays
+        One array per result
+    """
+    data = []
+    with open(csvfilename) as csvfile:
+        for row in csv.reader(csvfile):
+            try:
+                data.append(np.array(row, dtype=float))
+            except ValueError:
+                continue
+    return data
+
+
+class ResultStore:
+    """Append-only store of the results of the optimization steps.
+
+    The results of each step are appended once; they are kept in memory and in
+    a sqlite table (one row per result, indexed by step), so the algorithms can
+    query the history by step range without reading the csvfiles again.
+
+    Parameters
+    ----------
+        filename: str
+            Database file, created if it does not exist
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        self._steps = {}
+        self._connection = sqlite3.connect(filename, timeout=BUSY_TIMEOUT)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("CREATE TABLE IF NOT EXISTS results "
+                                 "(step INTEGER, job INTEGER, fitness REAL, data BLOB)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS results_step ON results (step)")
+        self._connection.commit()
+
+    def append(self, step, data):
+        """Store the results of a step
+
+        Parameters
+        ----------
+            step: int
+                Optimization step
+            data: list of arrays
+                Results (output followed by the parameter values)
+        """
+        data = [np.asarray(row, dtype=float) for row in data]
+        self._connection.execute("DELETE FROM results WHERE step = ?", (step,))
+        self._connection.executemany("INSERT INTO results (step, job, fitness, data) VALUES (?, ?, ?, ?)",
+                                     [(step, j, float(row[0]), row.tobytes()) for j, row in enumerate(data)])
+        self._connection.commit()
+        self._steps[step] = data
+        logging.debug("{} results of step {} stored".format(len(data), step))
+
+    def insert(self, step, job, rows):
+        """Store the results of jobs, e.g. from the jobs themselves; previous
+        results of the same jobs are replaced
+
+        Parameters
+        ----------
+            step: int
+                Optimization step
+            job: int
+                Counter value of the (first) data point in the optimization step
+            rows: array or list of arrays
+                Result of the job (output followed by the parameter values), or
+                results of consecutive data points starting at job
+        """
+        if np.size(rows) == 0:
+            return
+        rows = np.atleast_2d(np.asarray(rows, dtype=float))
+        entries = [(step, j, float(row[0]), row.tobytes()) for j, row in enumerate(rows, job)]
+        with self._connection:
+            self._connection.execute("DELETE FROM results WHERE step = ? AND job >= ? AND job < ?",
+                                     (step, job, job + len(rows)))
+            self._connection.executemany("INSERT INTO results (step, job, fitness, data) VALUES (?, ?, ?, ?)",
+                                         entries)
+        self._steps.pop(step, None)
+
+    def append_csvfile(self, step, csvfilename):
+        """Store the results of a step read from its csvfile
+
+        Parameters
+        ----------
+            step: int
+                Optimization step
+            csvfilename: str
+                csvfile of the step
+        """
+        self.append(step, read_csvfile(csvfilename))
+
+    def has_step(self, step):
+        """True if the results of the step are stored"""
+        if step in self._steps:
+            return True
+        return self._connection.execute("SELECT 1 FROM results WHERE step = ? LIMIT 1",
+                                        (step,)).fetchone() is not None
+
+    def steps(self):
+        """Optimization steps with stored results, in increasing order"""
+        return [row[0] for row in self._connection.execute("SELECT DISTINCT step FROM results ORDER BY step")]
+
+    def get(self, step, cached=True):
+        """Results of a step
+
+        Parameters
+        ----------
+            step: int
+                Optimization step
+            cached: bool
+                If False, the results are read from the database, e.g. while
+                the jobs of the step are still inserting results
+
+        Returns
+        -------
+            data: list of arrays
+                Results (output followed by the parameter values)
+        """
+        if not cached or step not in self._steps:
+            rows = self._connection.execute("SELECT data FROM results WHERE step = ? ORDER BY job",
+                                            (step,)).fetchall()
+            data = [np.frombuffer(row[0], dtype=float).copy() for row in rows]
+            if not cached:
+                return data
+            self._steps[step] = data
+        return self._steps[step]
+
+    def query(self, first_step, last_step):
+        """Results of a range of steps
+
+        Parameters
+        ----------
+            first_step: int
+                First optimization step
+            last_step: int
+                Last optimization step (included)
+
+        Returns
+        -------
+            totaldata: list of (list of arrays)
+                Results per step, from first_step to last_step
+        """
+        return [self.get(step) for step in range(first_step, last_step + 1)]
+
+    def close(self):
+        self._connection.close()
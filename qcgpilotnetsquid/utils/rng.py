@@ -0,0 +1,157 @@
+"""
+Defines class RandomStreams, the independent streams of random numbers of an
+optimization. All streams derive from the seed of the input file with a NumPy
+SeedSequence: the stream of an operator (selection, mutation, ...) at a step,
+of an island, or of a job of a step is the SeedSequence child with the spawn
+key (island, step, operator[, job]). Streams never overlap, do not depend on
+the order in which they are requested, and are recorded in the run directory
+so any of them can be regenerated.
+"""
+import json
+import os
+import zlib
+import numpy as np
+
+RANDOM_STREAMS_FILE = "random_streams.jsonl"
+
+
+def operator_key(operator):
+    """Integer identifying an operator name in the spawn keys."""
+    return zlib.crc32(operator.encode())
+
+
+class RandomStreams:
+    """ Random number streams of an optimization
+
+    Parameters
+    ----------
+        seed: int, optional
+            Seed of the input file. If None, fresh entropy is drawn and
+            recorded, so the run can still be reproduced
+        island: int, optional
+            Island of the optimization (island model), 0 if no islands
+        rundir: str, optional
+            Run directory where the streams used are recorded
+    """
+    def __init__(self, seed=None, island=None, rundir=None):
+        self.entropy = np.random.SeedSequence(None if seed is None else int(seed)).entropy
+        self.island = 0 if island is None else int(island)
+        self.rundir = rundir
+
+    def spawn_key(self, step, operator, worker=None):
+        """Spawn key of a stream"""
+        if step is None or int(step) < 0:
+            raise ValueError("The step of a random stream should be a non negative integer")
+        key = (self.island, int(step), operator_key(operator))
+        if worker is not None:
+            key += (int(worker),)
+        return key
+
+    def seed_sequence(self, step, operator, worker=None):
+        """SeedSequence of a stream, equal to the child spawned from the
+        SeedSequence of the seed along the spawn key"""
+        return np.random.SeedSequence(self.entropy, spawn_key=self.spawn_key(step, operator, worker))
+
+    def generator(self, step, operator, worker=None):
+        """ Random generator of a stream, recorded in the run directory
+
+        Parameters
+        ----------
+            step: int
+                Optimization step
+            operator: str
+                Name of the operator using the stream (e.g. mutation)
+            worker: int, optional
+                Worker (e.g. job) of the step using the stream
+        Returns
+        -------
+            rng: numpy.random.Generator
+        """
+        self.record(step, operator, worker)
+        return np.random.default_rng(self.seed_sequence(step, operator, worker))
+
+    def worker_seeds(self, step, operator, workers):
+        """ Seeds of the streams of the workers of a step, e.g. to pass to the
+        jobs. Only the stream of the step is recorded, the one of worker k is its
+        child k
+
+        Parameters
+        ----------
+            step: int
+                Optimization step
+            operator: str
+                Name of the stream of the workers (e.g. jobs)
+            workers: iterable of int
+                Workers (e.g. job counters)
+        Returns
+        -------
+            seeds: list of int
+                32-bit seeds, one per worker
+        """
+        self.record(step, operator)
+        return [int(self.seed_sequence(step, operator, worker).generate_state(1)[0]) for worker in workers]
+
+    def record(self, step, operator, worker=None):
+        """ Append a stream to the record in the run directory"""
+        if not self.rundir:
+            return
+        entry = {"step": int(step), "operator": operator, "island": self.island,
+                 "entropy": self.entropy, "spawn_key": list(self.spawn_key(step, operator, worker))}
+        if worker is not None:
+            entry["worker"] = int(worker)
+        with open(os.path.join(self.rundir, RANDOM_STREAMS_FILE), "a") as recordfile:
+            recordfile.write(json.dumps(entry) + "\n")
+
+
+def regenerate(entry):
+    """ Random generator of a recorded stream
+
+    Parameters
+    ----------
+        entry: dict
+            Line of the record of the random streams
+    Returns
+    -------
+        rng: numpy.random.Generator
+    """
+    return np.random.default_rng(np.random.SeedSequence(entry["entropy"], spawn_key=tuple(entry["spawn_key"])))
+
+
+def random_streams(simparameters):
+    """ Random streams of the optimization of the simulation parameters
+
+    Parameters
+    ----------
+        simparameters: class InputParam
+            Simulation parameters read from input file
+    Returns
+    -------
+        streams: class RandomStreams
+    """
+    seed = simparameters.run.get('seed')
+    return RandomStreams(None if seed is None else float(seed), simparameters.island, simparameters.rundir)
+
+
+def generator(sim_param, step, operator, worker=None):
+    """ Random generator of a stream of an algorithm: from the streams of the
+    optimization (sim_param['random_streams']) if set, otherwise derived from
+    sim_param['seed'] without being recorded
+
+    Parameters
+    ----------
+        sim_param: dict
+            Simulation information read from the input file
+        step: int
+            Optimization step
+        operator: str
+            Name of the operator using the stream
+        worker: int, optional
+            Worker using the stream
+    Returns
+    -------
+        rng: numpy.random.Generator
+    """
+    streams = sim_param.get('random_streams')
+    if streams is None:
+        streams = RandomStreams(sim_param.get('seed'))
+    return streams.generator(step, operator, worker)
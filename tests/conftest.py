@@ -0,0 +1,19 @@
+""" Fixtures shared by the unit tests."""
+import pytest
+from qcgpilotnetsquid.utils.parameters import Parameter, SetParameters
+
+
+@pytest.fixture
+def make_set_param():
+    """Factory of SetParameters from (name, low, high, number_points) tuples,
+    optionally followed by data_type, distribution and scale_factor."""
+    def make(*specs):
+        params = []
+        for spec in specs:
+            name, low, high, number_points = spec[:4]
+            data_type = spec[4] if len(spec) > 4 else "continuous"
+            distribution = spec[5] if len(spec) > 5 else "uniform"
+            scale_factor = spec[6] if len(spec) > 6 else 0.1*(high - low)
+            params.append(Parameter(name, [low, high], number_points, data_type, distribution, scale_factor))
+        return SetParameters(*params)
+    return make
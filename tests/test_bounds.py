@@ -0,0 +1,63 @@
+""" Tests of the bound strategies of the random displacements."""
+import numpy as np
+import pytest
+from qcgpilotnetsquid.algorithms.bounds import BOUND_STRATEGIES, apply_bounds, displace
+
+
+def test_apply_bounds():
+    values = np.array([-0.25, 0.5, 1.25, 2.5])
+    np.testing.assert_allclose(apply_bounds(values, 0.0, 1.0, "clip"), [0.0, 0.5, 1.0, 1.0])
+    np.testing.assert_allclose(apply_bounds(values, 0.0, 1.0, "reflect"), [0.25, 0.5, 0.75, 0.5])
+    np.testing.assert_allclose(apply_bounds(values, 0.0, 1.0, "wrap"), [0.75, 0.5, 0.25, 0.5])
+    with pytest.raises(ValueError):
+        apply_bounds(values, 0.0, 1.0, "bounce")
+
+
+@pytest.mark.parametrize("strategy", ["reflect", "wrap"])
+def test_apply_bounds_zero_width(strategy):
+    np.testing.assert_array_equal(apply_bounds(np.array([0.5, 3.0]), 2.0, 2.0, strategy), [2.0, 2.0])
+
+
+@pytest.mark.parametrize("strategy", BOUND_STRATEGIES)
+def test_displace_in_range(strategy):
+    rng = np.random.default_rng(1)
+    centre = np.array([0.0, 0.05, 0.5, 0.95, 1.0, 0.3])
+    scale = np.array([0.2, 0.2, 0.2, 0.2, 0.2, 0.0])
+    values = displace(rng, np.tile(centre, (2000, 1)), scale, 0.0, 1.0, strategy)
+    assert values.shape == (2000, len(centre))
+    assert np.all((values >= 0.0) & (values <= 1.0))
+    # no scale, no displacement
+    np.testing.assert_array_equal(values[:, -1], 0.3)
+
+
+def test_displace_unknown_strategy():
+    with pytest.raises(ValueError):
+        displace(np.random.default_rng(), [0.5], 0.1, 0.0, 1.0, "bounce")
+
+
+def test_resample_is_uniform_on_the_range_part():
+    rng = np.random.default_rng(2)
+    values = displace(rng, np.full(100000, 0.05), 0.2, 0.0, 1.0, "resample")
+    assert values.min() >= 0.0 and values.max() <= 0.25
+    assert values.mean() == pytest.approx(0.125, abs=0.002)
+    assert values.var() == pytest.approx(0.25**2/12, rel=0.02)
+
+
+def test_truncnormal_moments():
+    rng = np.random.default_rng(3)
+    values = displace(rng, np.full(100000, 0.5), 0.1, 0.0, 1.0, "truncnormal")
+    assert values.mean() == pytest.approx(0.5, abs=0.002)
+    assert values.std() == pytest.approx(0.1, rel=0.02)
+    # truncated at the mean: half-normal
+    values = displace(rng, np.full(100000, 0.0), 0.1, 0.0, 1.0, "truncnormal")
+    assert values.min() >= 0.0
+    assert values.mean() == pytest.approx(0.1*np.sqrt(2/np.pi), rel=0.02)
+
+
+def test_truncnormal_far_tail():
+    rng = np.random.default_rng(4)
+    values = displace(rng, np.full(1000, -5.0), 0.1, 0.0, 1.0, "truncnormal")
+    assert np.all(np.isfinite(values))
+    # the tail is (almost) exponential with mean scale**2/distance
+    assert np.all((values >= 0.0) & (values <= 0.05))
+    assert values.mean() == pytest.approx(0.002, rel=0.1)
@@ -0,0 +1,42 @@
+""" Tests of the creation of the grid data points in chunks."""
+import itertools
+import numpy as np
+import pytest
+from qcgpilotnetsquid.utils.createpoints import iter_grid_chunks, iter_init_datapoints
+
+
+@pytest.fixture
+def set_param(make_set_param):
+    set_param = make_set_param(("x", 0.0, 1.0, 3), ("n", 1.0, 4.0, 4, "discrete"), ("y", -1.0, 1.0, 5))
+    set_param.parameters["x"].data_points = [0.0, 0.5, 1.0]
+    set_param.parameters["n"].data_points = [1, 2, 3, 4]
+    set_param.parameters["y"].data_points = list(np.linspace(-1.0, 1.0, 5))
+    return set_param
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 60, 1000])
+def test_grid_chunks_are_the_cartesian_product(set_param, chunk_size):
+    chunks = list(iter_grid_chunks(set_param, chunk_size))
+    assert all(len(chunk) == chunk_size for chunk in chunks[:-1])
+    assert 0 < len(chunks[-1]) <= chunk_size
+    grid = [tuple(point) for chunk in chunks for point in chunk]
+    axes = [param.data_points for param in set_param.parameters.values()]
+    assert grid == list(itertools.product(*axes))
+
+
+def test_grid_chunks_types(set_param):
+    chunk = next(iter_grid_chunks(set_param, 10))
+    assert chunk.dtype == object
+    assert all(type(value) is int for value in chunk[:, 1])
+    assert all(type(value) is float for value in chunk[:, 0])
+
+    del set_param.parameters["n"]
+    chunk = next(iter_grid_chunks(set_param, 10))
+    assert chunk.dtype == float and chunk.shape == (10, 2)
+
+
+def test_init_datapoints_check_constraints(set_param):
+    chunks = list(iter_init_datapoints({'constraints': "x <= 1"}, set_param, 16))
+    assert sum(len(chunk) for chunk in chunks) == 60
+    with pytest.raises(ValueError):
+        list(iter_init_datapoints({'constraints': "x < 1"}, set_param, 16))
@@ -0,0 +1,115 @@
+""" Tests of the vectorized operators of the genetic algorithm."""
+import numpy as np
+import pytest
+from qcgpilotnetsquid.algorithms.ga import (crossover, get_parents_roulette, get_parents_sus,
+                                            get_parents_tournament, mutate, replace_population)
+
+FITNESS = np.array([1.0, 2.0, 3.0, 4.0])
+
+
+def population(fitness=FITNESS):
+    """Data points whose first parameter identifies them."""
+    return np.column_stack((fitness, np.arange(len(fitness)), np.zeros(len(fitness))))
+
+
+def selection_frequencies(select, maximum, number=40000, seed=1):
+    sim_params = {'number_best_candidates': number, 'maximum': maximum}
+    parents, fitness, _ = select(population(), sim_params, rng=np.random.default_rng(seed))
+    np.testing.assert_array_equal(fitness, FITNESS[parents[:, 0].astype(int)])
+    return np.bincount(parents[:, 0].astype(int), minlength=len(FITNESS))/number
+
+
+@pytest.mark.parametrize("maximum, weights", [(True, FITNESS), (False, 1/FITNESS)])
+def test_roulette_proportional_to_fitness(maximum, weights):
+    frequencies = selection_frequencies(get_parents_roulette, maximum)
+    np.testing.assert_allclose(frequencies, weights/weights.sum(), atol=0.01)
+
+
+def test_sus_selects_the_expected_number_of_times():
+    number = 25
+    sim_params = {'number_best_candidates': number, 'maximum': True}
+    for seed in range(20):
+        parents, _, _ = get_parents_sus(population(), sim_params, rng=np.random.default_rng(seed))
+        counts = np.bincount(parents[:, 0].astype(int), minlength=len(FITNESS))
+        expected = number*FITNESS/FITNESS.sum()
+        assert np.all(counts >= np.floor(expected)) and np.all(counts <= np.ceil(expected))
+
+
+@pytest.mark.parametrize("maximum", [True, False])
+def test_tournament_of_two(maximum):
+    frequencies = selection_frequencies(get_parents_tournament, maximum)
+    # the data point of rank r (0 the worst) wins when the best of both
+    # contestants has rank r
+    rank = np.arange(len(FITNESS)) if maximum else np.arange(len(FITNESS))[::-1]
+    expected = ((rank + 1)**2 - rank**2)/len(FITNESS)**2
+    np.testing.assert_allclose(frequencies, expected, atol=0.01)
+
+
+def test_mutate_one_parameter(make_set_param):
+    set_param = make_set_param(("x", 0.0, 1.0, 5))
+    sim_param = {'population_size': 1000, 'proba_mutation': 0.5, 'maximum': True}
+    data = np.array([[0.0], [0.5], [1.0]])
+    points = mutate(data, set_param, sim_param, [], 1, rng=np.random.default_rng(2))
+    assert points.shape == (1002, 1)
+    centre = np.tile(data, (334, 1))
+    assert np.all((points >= 0.0) & (points <= 1.0))
+    assert np.all(np.abs(points - centre) <= 0.1 + 1e-12)
+
+
+def test_mutate_changes_one_parameter_per_point(make_set_param):
+    set_param = make_set_param(("x", 0.0, 1.0, 5), ("y", -1.0, 1.0, 5))
+    sim_param = {'population_size': 20000, 'proba_mutation': 0.5, 'maximum': True}
+    data = np.array([[0.2, -0.5], [0.4, 0.0], [0.6, 0.5]])
+    points = mutate(data, set_param, sim_param, [1.0, 1.0, 1.0], 1, rng=np.random.default_rng(3))
+    assert points.shape == (40000, 2)
+    assert np.all((points[:, 0] >= 0.0) & (points[:, 0] <= 1.0))
+    assert np.all((points[:, 1] >= -1.0) & (points[:, 1] <= 1.0))
+    # every new point is a data point with at most the parameter of its row
+    # (in the block of the data point) displaced
+    changed = ~np.isin(points, data)
+    assert not np.any(changed[0::2, 1]) and not np.any(changed[1::2, 0])
+    # all fitness values are equal: each parameter is kept with probability
+    # 0.5, but only the first kept parameter of a data point stays unchanged
+    unchanged = np.mean(~np.any(changed, axis=1))
+    assert unchanged == pytest.approx(0.375, abs=0.01)
+
+
+def test_crossover_swaps_the_tails(make_set_param):
+    number_parameters = 4
+    set_param = make_set_param(*[("p{}".format(i), 0.0, 100.0, 2) for i in range(number_parameters)])
+    sim_param = {'population_size': 5000, 'proba_crossover': 0.8}
+    # parameter j of data point i is 10*i + j
+    data = 10.0*np.arange(50)[:, None] + np.arange(number_parameters)
+    points = crossover(data, set_param, sim_param, rng=np.random.default_rng(4))
+    np.testing.assert_array_equal(points[:len(data)], data)
+    children = points[len(data):]
+    assert len(children) == pytest.approx(5000*0.8*0.8 - len(data), abs=150)
+
+    parents = children // 10
+    np.testing.assert_array_equal(children % 10, np.tile(np.arange(number_parameters), (len(children), 1)))
+    location = np.argmax(parents != parents[:, :1], axis=1)
+    assert np.all(location >= 1)
+    # the head comes from the first parent, the tail from the second
+    swap = np.arange(number_parameters) >= location[:, None]
+    first = parents[np.arange(len(parents)), 0]
+    second = parents[np.arange(len(parents)), -1]
+    assert np.all(first != second)
+    np.testing.assert_array_equal(parents, np.where(swap, second[:, None], first[:, None]))
+    frequencies = np.bincount(location, minlength=number_parameters)[1:]/len(children)
+    np.testing.assert_allclose(frequencies, 1/(number_parameters - 1), atol=0.03)
+
+
+def test_replace_population_keeps_elites():
+    sorted_data = np.arange(20, dtype=float).reshape(10, 2)
+    new_individuals = 100 + np.arange(30, dtype=float).reshape(15, 2)
+    rng = np.random.default_rng(5)
+    new_pop = replace_population(sorted_data, new_individuals, 8, rng, elite_count=2)
+    assert new_pop.shape == (8, 2)
+    np.testing.assert_array_equal(new_pop[-2:], sorted_data[:2])
+    assert np.all(np.isin(new_pop[:-2], new_individuals))
+    assert len(np.unique(new_pop[:, 0])) == 8
+
+    new_pop = replace_population(sorted_data, new_individuals[:3], 8, rng, elite_count=2)
+    assert new_pop.shape == (8, 2)
+    assert np.all(np.isin(sorted_data[:2], new_pop))
+    assert np.all(np.isin(new_individuals[:3], new_pop))
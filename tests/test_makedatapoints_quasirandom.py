@@ -0,0 +1,61 @@
+""" Tests of the stratification of the quasi-random designs."""
+import numpy as np
+import pytest
+from qcgpilotnetsquid.utils.makedatapoints_quasirandom import (HALTON_PRIMES, halton, latin_hypercube,
+                                                               scale_unit_points, sobol)
+
+
+def strata(values, number):
+    """Sorted stratum of each value in number equal strata of [0, 1); the
+    unscrambled sequences have points on the lower boundaries of the strata."""
+    return np.sort(np.floor(values*number + 1e-9).astype(int))
+
+
+@pytest.mark.parametrize("seed", [None, 1])
+def test_sobol_stratification(seed):
+    rng = None if seed is None else np.random.default_rng(seed)
+    points = sobol(256, 5, rng)
+    assert points.shape == (256, 5)
+    assert np.all((points >= 0.0) & (points < 1.0))
+    for k in range(1, 9):
+        # every block of 2**k points has one point per stratum of size 2**-k
+        for block in points[:256].reshape(-1, 2**k, 5)[:2]:
+            for d in range(5):
+                np.testing.assert_array_equal(strata(block[:, d], 2**k), np.arange(2**k))
+    # (0, m, 2)-net: 2**m points, one in each elementary box of the first two dimensions
+    boxes = np.floor(points[:, 0]*16).astype(int)*16 + np.floor(points[:, 1]*16).astype(int)
+    np.testing.assert_array_equal(np.sort(boxes), np.arange(256))
+
+
+def test_sobol_skip():
+    np.testing.assert_array_equal(sobol(64, 3)[16:], sobol(48, 3, skip=16))
+
+
+@pytest.mark.parametrize("seed", [None, 2])
+def test_halton_stratification(seed):
+    rng = None if seed is None else np.random.default_rng(seed)
+    points = halton(125, 3, rng)
+    assert np.all((points >= 0.0) & (points < 1.0))
+    for d, base in enumerate(HALTON_PRIMES[:3]):
+        k = int(np.floor(np.log(125)/np.log(base) + 1e-9))
+        number = base**k
+        np.testing.assert_array_equal(strata(points[:number, d], number), np.arange(number))
+
+
+def test_halton_sequence():
+    np.testing.assert_allclose(halton(4, 2)[:, 0], [0.0, 0.5, 0.25, 0.75])
+    np.testing.assert_allclose(halton(4, 2)[:, 1], [0.0, 1/3, 2/3, 1/9])
+
+
+def test_latin_hypercube_stratification():
+    points = latin_hypercube(50, 4, np.random.default_rng(3))
+    assert np.all((points >= 0.0) & (points < 1.0))
+    for d in range(4):
+        np.testing.assert_array_equal(strata(points[:, d], 50), np.arange(50))
+
+
+def test_scale_unit_points(make_set_param):
+    set_param = make_set_param(("x", -1.0, 1.0, 2), ("n", 1.0, 4.0, 2, "discrete"),
+                               ("l", 1.0, 100.0, 2, "continuous", "log"))
+    points = scale_unit_points(np.array([[0.0, 0.0, 0.0], [0.5, 0.5, 0.5], [0.999, 0.999, 1.0]]), set_param)
+    np.testing.assert_allclose(points, [[-1.0, 1.0, 1.0], [0.0, 3.0, 10.0], [0.998, 4.0, 100.0]])
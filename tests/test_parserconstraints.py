@@ -0,0 +1,59 @@
+""" Tests of the parser of constraints."""
+import numpy as np
+import pytest
+from qcgpilotnetsquid.utils.parserconstraints import constraints_mask, evaluate_constraints, parse_constraints
+
+POINTS = np.array([[1.0, 2.0], [4.0, 5.0], [0.25, 0.5], [3.0, 0.0]])
+
+
+@pytest.fixture
+def set_param(make_set_param):
+    return make_set_param(("x", 0.0, 10.0, 2), ("y", 0.0, 10.0, 2))
+
+
+@pytest.mark.parametrize("constraints, expected", [
+    ("x+y<8", [True, False, True, True]),
+    ("x+y<8, x>0.5", [True, False, False, True]),
+    ("x<y or y==0", [True, True, True, True]),
+    ("0 < y <= 2", [True, False, True, False]),
+    ("not x > 1", [True, False, True, False]),
+    ("sqrt(x) + abs(-y) >= 3", [True, True, False, False]),
+    ("max(x, y) < 2*pi", [True, True, True, True]),
+    ("x % 2 == 1 and y // 2 == 1", [True, False, False, False]),
+])
+def test_constraints_mask(set_param, constraints, expected):
+    np.testing.assert_array_equal(constraints_mask(constraints, set_param, POINTS), expected)
+
+
+def test_negative_power(set_param):
+    # integer powers with a negative exponent are not integers
+    np.testing.assert_array_equal(constraints_mask("x < 2**-1", set_param, POINTS), [False, False, True, False])
+    np.testing.assert_array_equal(constraints_mask("x**-2 > 1", set_param, POINTS), [False, False, True, False])
+
+
+def test_constant_constraints_broadcast(set_param):
+    np.testing.assert_array_equal(constraints_mask("1 < 2", set_param, POINTS), [True]*4)
+
+
+@pytest.mark.parametrize("constraints", [
+    "x +",
+    "__import__('os')",
+    "x.real > 0",
+    "'a' < x",
+    "[x][0] > 0",
+    "lambda: x",
+    "x < True",
+])
+def test_invalid_constraints(constraints):
+    with pytest.raises(ValueError):
+        parse_constraints(constraints)
+
+
+def test_unknown_parameter(set_param):
+    with pytest.raises(ValueError):
+        constraints_mask("z > 0", set_param, POINTS)
+
+
+def test_evaluate_constraints_removes_points(set_param):
+    population = evaluate_constraints({'constraints': "x+y<8"}, set_param, POINTS)
+    np.testing.assert_array_equal(population, POINTS[[0, 2, 3]])
@@ -0,0 +1,89 @@
+""" Tests of the result store of the steps and of the result cache."""
+import numpy as np
+import pytest
+from qcgpilotnetsquid.utils.resultcache import ResultCache
+from qcgpilotnetsquid.utils.resultstore import ResultStore
+
+GENERAL = {'program': "wobbly.py", 'programfunction': "wobbly", 'programsweepargs': ["x", "y"],
+           'programfixargs': []}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ResultStore(str(tmp_path/"results.db"))
+    yield store
+    store.close()
+
+
+def test_store_round_trip(tmp_path, store):
+    step0 = [np.array([1.0, 0.1, 0.2]), np.array([2.0, 0.3, 0.4])]
+    step1 = [np.array([3.0, 0.5, 0.6])]
+    store.append(0, step0)
+    store.append(1, step1)
+    assert store.has_step(1) and not store.has_step(2)
+    assert store.steps() == [0, 1]
+    np.testing.assert_array_equal(store.get(0), step0)
+    np.testing.assert_array_equal(store.get(0, cached=False), step0)
+    totaldata = store.query(0, 1)
+    assert len(totaldata) == 2
+    np.testing.assert_array_equal(totaldata[1], step1)
+
+    # appending a step again replaces its results
+    store.append(1, step0)
+    np.testing.assert_array_equal(store.get(1, cached=False), step0)
+
+    reopened = ResultStore(store.filename)
+    assert reopened.steps() == [0, 1]
+    np.testing.assert_array_equal(reopened.get(0), step0)
+    reopened.close()
+
+
+def test_store_insert(store):
+    store.insert(2, 3, [[5.0, 0.1, 0.2], [6.0, 0.3, 0.4]])
+    other = ResultStore(store.filename)
+    other.insert(2, 0, np.array([4.0, 0.0, 0.0]))
+    other.insert(2, 3, [7.0, 0.1, 0.2])
+    other.insert(2, 9, [])
+    other.close()
+    np.testing.assert_array_equal(store.get(2, cached=False),
+                                  [[4.0, 0.0, 0.0], [7.0, 0.1, 0.2], [6.0, 0.3, 0.4]])
+    assert store.steps() == [2]
+
+
+def test_store_csvfile(tmp_path, store):
+    csvfilename = tmp_path/"step0.csv"
+    csvfilename.write_text("fitness,x,y\n1.0,0.1,0.2\n2.0,0.3,0.4\n")
+    store.append_csvfile(0, str(csvfilename))
+    np.testing.assert_array_equal(store.get(0, cached=False), [[1.0, 0.1, 0.2], [2.0, 0.3, 0.4]])
+
+
+def test_cache_round_trip(tmp_path):
+    cache = ResultCache(str(tmp_path/"cache.db"), GENERAL)
+    cache.add([[1.5, 0.1, 0.2], [2.5, 0.3, 0.4], [9.0]])
+    cache.close()
+
+    cache = ResultCache(str(tmp_path/"cache.db"), GENERAL)
+    points = [np.array([0.1, 0.2]), np.array([0.5, 0.6]), np.array([0.3 + 1e-13, 0.4])]
+    uncached, cachedrows = cache.lookup(points)
+    np.testing.assert_array_equal(uncached, [points[1]])
+    np.testing.assert_allclose(cachedrows, [[1.5, 0.1, 0.2], [2.5, 0.3, 0.4]])
+    cache.close()
+
+    # results of another program are not used
+    other = ResultCache(str(tmp_path/"cache.db"), dict(GENERAL, programfixargs=[1]))
+    uncached, cachedrows = other.lookup(points)
+    assert len(uncached) == 3 and cachedrows == []
+    other.close()
+
+
+def test_cache_filter_datapoints(tmp_path):
+    csvfilename = tmp_path/"step0.csv"
+    csvfilename.write_text("fitness,x,y\n1.5,0.1,0.2\n")
+    cache = ResultCache(str(tmp_path/"cache.db"), GENERAL)
+    cache.add_csvfile(str(csvfilename))
+    assert cache.key([0.0, 0.1]) == cache.key([-0.0, 0.1])
+
+    uncached = cache.filter_datapoints([np.array([0.1, 0.2]), np.array([0.7, 0.8])], str(tmp_path), 1)
+    np.testing.assert_array_equal(uncached, [[0.7, 0.8]])
+    assert (tmp_path/"cached_1.csv").read_text().strip() == "1.5,0.1,0.2"
+    cache.close()
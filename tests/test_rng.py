@@ -0,0 +1,59 @@
+""" Tests of the random number streams."""
+import json
+import os
+import numpy as np
+import pytest
+from qcgpilotnetsquid.utils.rng import RANDOM_STREAMS_FILE, RandomStreams, generator, regenerate
+
+
+def read_record(rundir):
+    with open(os.path.join(rundir, RANDOM_STREAMS_FILE)) as recordfile:
+        return [json.loads(line) for line in recordfile]
+
+
+def test_streams_are_reproducible():
+    first = RandomStreams(7).generator(2, "mutation").random(5)
+    np.testing.assert_array_equal(first, RandomStreams(7).generator(2, "mutation").random(5))
+    # independent of the order in which the streams are requested
+    streams = RandomStreams(7)
+    streams.generator(3, "crossover")
+    np.testing.assert_array_equal(first, streams.generator(2, "mutation").random(5))
+
+
+def test_streams_are_distinct():
+    streams = RandomStreams(7)
+    generators = [streams.generator(2, "mutation"), streams.generator(3, "mutation"),
+                  streams.generator(2, "crossover"), RandomStreams(7, island=1).generator(2, "mutation"),
+                  RandomStreams(8).generator(2, "mutation"), streams.generator(2, "mutation", 0)]
+    values = [rng.random(5) for rng in generators]
+    assert len({tuple(value) for value in values}) == len(values)
+
+
+def test_regenerate_recorded_streams(tmp_path):
+    streams = RandomStreams(None, island=2, rundir=str(tmp_path))
+    values = streams.generator(4, "selection").random(10)
+    worker_values = streams.generator(4, "jobs", 3).integers(1 << 30, size=10)
+    seeds = streams.worker_seeds(5, "jobs", range(4))
+
+    record = read_record(tmp_path)
+    assert [(entry["step"], entry["operator"], entry["island"]) for entry in record] == \
+        [(4, "selection", 2), (4, "jobs", 2), (5, "jobs", 2)]
+    np.testing.assert_array_equal(regenerate(record[0]).random(10), values)
+    np.testing.assert_array_equal(regenerate(record[1]).integers(1 << 30, size=10), worker_values)
+    # the seed of a worker is the one of the child of the recorded stream
+    for worker, seed in enumerate(seeds):
+        entry = dict(record[2], spawn_key=record[2]["spawn_key"] + [worker])
+        sequence = np.random.SeedSequence(entry["entropy"], spawn_key=tuple(entry["spawn_key"]))
+        assert seed == int(sequence.generate_state(1)[0])
+
+
+def test_invalid_step():
+    with pytest.raises(ValueError):
+        RandomStreams(1).generator(-1, "mutation")
+
+
+def test_generator_of_sim_param(tmp_path):
+    streams = RandomStreams(3, rundir=str(tmp_path))
+    values = generator({'random_streams': streams}, 1, "mutation").random(3)
+    np.testing.assert_array_equal(values, generator({'seed': 3}, 1, "mutation").random(3))
+    assert len(read_record(tmp_path)) == 1